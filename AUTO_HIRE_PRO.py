@@ -3,15 +3,32 @@ import streamlit as st
 import pandas as pd
 import os
 import textwrap
-from pypdf import PdfReader
 from docx import Document
 import google.generativeai as genai
 import datetime
 import time
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import functools
+import io
+import sqlite3
+import storage
+import scoring_queue
+import score_cache
+import extraction
+import resume_store
+import mailer
+import job_search
+import credential_index
+import question_bank
+import question_gen
+import common_pool
+import mcq_dedup
+import proctor_events
+import warning_channel
+import attempt_store
+import grading
+import screening
+import json
+import random
 
 # ---------------- SAFE IMPORTS FOR CV ----------------
 try:
@@ -20,6 +37,8 @@ try:
     import av
     from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, WebRtcMode
     import numpy as np
+    import proctoring
+    import evidence
     PROCTORING_AVAILABLE = True
 except ImportError as e:
     PROCTORING_AVAILABLE = False
@@ -45,6 +64,9 @@ RESUMES_DIR = os.path.join(BASE_DIR, "resumes")
 JOBS_DIR = os.path.join(BASE_DIR, "job_descriptions")
 QUESTIONS_DIR = os.path.join(BASE_DIR, "questions")
 
+# Scoring / screening settings live in screening.py (shared with bulk_ingest)
+RESUME_CHARS = screening.RESUME_CHARS
+
 # Ensure directories exist
 for d in [RESUMES_DIR, JOBS_DIR, QUESTIONS_DIR, DATA_DIR]:
     if not os.path.exists(d):
@@ -58,391 +80,259 @@ except FileNotFoundError:
 # ---------------- CV PROCTORING LOGIC ----------------
 if PROCTORING_AVAILABLE:
     try:
-        mp_face_mesh = mp.solutions.face_mesh
-        face_mesh = mp_face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        mp.solutions.face_mesh # Each session builds its own FaceMesh (the graph is stateful and not thread-safe)
     except Exception as e:
         PROCTORING_AVAILABLE = False
         print(f"⚠️ MediaPipe Init Error: {e}")
 
+try:
+    PROCTOR_BUDGET_MS = float(st.secrets.get("PROCTOR_BUDGET_MS", 120.0)) # Inference CPU ms per second of video, per candidate
+except Exception:
+    PROCTOR_BUDGET_MS = 120.0
+
+try:
+    PROCTOR_MODE = st.secrets.get("PROCTOR_MODE", "inline") # "inline": FaceMesh in the webrtc thread, "service": worker processes
+    PROCTOR_WORKERS = int(st.secrets.get("PROCTOR_WORKERS", 0)) or None # 0 = one per CPU core minus one
+    PROCTOR_DETECTOR = st.secrets.get("PROCTOR_DETECTOR", "mesh") # "tiered": FaceDetection count, FaceMesh only for yaw; "cascade": no MediaPipe
+except Exception:
+    PROCTOR_MODE, PROCTOR_WORKERS, PROCTOR_DETECTOR = "inline", None, "mesh"
+
+try:
+    WARNING_CHANNEL_PORT = int(st.secrets.get("WARNING_CHANNEL_PORT", warning_channel.PORT)) # Long-poll endpoint for the warnings widget
+    WARNING_CHANNEL_URL = st.secrets.get("WARNING_CHANNEL_URL", "") # Public base URL, e.g. "/warnings" proxied on Streamlit's origin; default http://<host>:PORT
+    WARNING_CHANNEL_HOST = st.secrets.get("WARNING_CHANNEL_HOST", warning_channel.HOST) # Bind address; loopback unless exposed on purpose
+except Exception:
+    WARNING_CHANNEL_PORT, WARNING_CHANNEL_URL, WARNING_CHANNEL_HOST = warning_channel.PORT, "", warning_channel.HOST
+
+def on_proctor_terminated(session_id, app_id):
+    # Decided server-side when the 5th warning is counted, so it holds even if the page never reruns
+    if app_id is not None:
+        storage.update_app(app_id, {'TestStatus': 'Terminated (Malpractice)'})
+        attempt_store.close_open(app_id)
+        proctor_events.record(session_id, "terminated", app_id=app_id, counted=True)
+
+@functools.lru_cache(maxsize=1)
+def warnings_channel():
+    channel = warning_channel.get_channel(WARNING_CHANNEL_PORT, WARNING_CHANNEL_HOST)
+    channel.add_terminate_listener(on_proctor_terminated)
+    if not WARNING_CHANNEL_URL and WARNING_CHANNEL_HOST in ("127.0.0.1", "localhost", "::1"):
+        print(f"⚠️ Warning channel has no WARNING_CHANNEL_URL and binds {WARNING_CHANNEL_HOST}: only a browser on this machine "
+              f"over plain HTTP can reach it. Proxy it on Streamlit's origin and set WARNING_CHANNEL_URL (see warning_channel.py)")
+    return channel
+
+def log_proctor_event(proctor, event_type, assessment=None, counted=False):
+    # Buffered; written to SQLite in batches by the event log's own thread
+    proctor_events.record(
+        proctor.session_id, event_type, app_id=proctor.app_id, counted=counted,
+        face_count=assessment.face_count if assessment else None,
+        yaw_ratio=assessment.pose[2] if assessment and assessment.pose else None,
+    )
+    # Pushed to the candidate's warnings widget (no script rerun)
+    if assessment is not None:
+        warnings_channel().publish(proctor.session_id, proctor.warn_count, assessment.status)
+
 class ProctoringProcessor(VideoTransformerBase):
     def __init__(self):
-        self.warn_count = 0
-        self.last_warn = time.time()
-        self.frame_count = 0
+        # Adaptive pipeline: downscaled inference at a budgeted rate, last result reused on skipped frames
+        if PROCTOR_MODE == "service":
+            import proctor_service
+            self.proctor = proctoring.Proctor(None, budget_ms=PROCTOR_BUDGET_MS, on_event=log_proctor_event)
+            proctor_service.get_service(PROCTOR_WORKERS or proctor_service.WORKERS, PROCTOR_DETECTOR).open(self.proctor)
+        else:
+            self.proctor = proctoring.Proctor(proctoring.make_detector(PROCTOR_DETECTOR), budget_ms=PROCTOR_BUDGET_MS, on_event=log_proctor_event)
+        # Frames around each violation are kept as JPEG evidence (encoded off the video thread)
+        self.proctor.recorder = evidence.EvidenceRecorder(self.proctor.session_id)
+
+    @property
+    def warn_count(self):
+        return self.proctor.warn_count
 
     def recv(self, frame):
         img = frame.to_ndarray(format="bgr24")
-        
-        # Performance: Process every 2nd frame to reduce lag
-        self.frame_count += 1
-        if self.frame_count % 2 != 0:
-             return av.VideoFrame.from_ndarray(img, format="bgr24")
-
         try:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            results = face_mesh.process(img_rgb)
-            
-            h, w, _ = img.shape
-            face_count = 0
-            status_text = "Secure"
-            color = (0, 255, 0)
-            violation = False
-            
-            if results.multi_face_landmarks:
-                face_count = len(results.multi_face_landmarks)
-                
-                if face_count > 1:
-                    status_text = "MULTIPLE FACES DETECTED!"
-                    color = (0, 0, 255)
-                    violation = True
-                elif face_count == 1:
-                    for face_landmarks in results.multi_face_landmarks:
-                        # Head Pose Estimation (Simple Nose vs Ear X-coord check)
-                        nose = face_landmarks.landmark[1]
-                        left_ear = face_landmarks.landmark[234]
-                        right_ear = face_landmarks.landmark[454]
-                        
-                        # Convert to pixel coords
-                        nx, ny = int(nose.x * w), int(nose.y * h)
-                        lx, _ = int(left_ear.x * w), int(left_ear.y * h)
-                        rx, _ = int(right_ear.x * w), int(right_ear.y * h)
-                        
-                        # Check deviation
-                        dist_l = abs(nx - lx)
-                        dist_r = abs(nx - rx)
-                        
-                        # Avoid division by zero
-                        ratio = dist_l / (dist_r + 1e-6)
-                        
-                        if ratio < 0.5: # Looking Left
-                            status_text = "LOOKING AWAY (LEFT)"
-                            color = (0, 165, 255)
-                            violation = True
-                        elif ratio > 2.0: # Looking Right
-                            status_text = "LOOKING AWAY (RIGHT)"
-                            color = (0, 165, 255)
-                            violation = True
-                            
-                        # Draw Nose
-                        cv2.circle(img, (nx, ny), 5, (255, 0, 0), -1)
-            else:
-                status_text = "NO FACE DETECTED"
-                color = (0, 0, 255)
-                # violation = True # Optional: Strict no-face
-                
-            # Cooldown & Increment
-            if violation:
-                now = time.time()
-                if now - self.last_warn > 4.0: # 4 Seconds Cooldown
-                    self.warn_count += 1
-                    self.last_warn = now
-            
-            # Draw Status & Warnings
-            cv2.putText(img, f"Status: {status_text}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-            cv2.putText(img, f"WARNINGS: {self.warn_count}/5", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-            
-            # Visual Alarm
-            if color != (0, 255, 0):
-                cv2.rectangle(img, (0,0), (w,h), color, 10)
-                
+            self.proctor.process(img, frame.pts)
         except Exception as e:
             print(f"Proctor Loop Error: {e}")
              
         return av.VideoFrame.from_ndarray(img, format="bgr24")
 
+    def on_ended(self):
+        # Stream closed (candidate left or submitted): free the session's FaceMesh / service slot
+        try:
+            self.proctor.close()
+            warnings_channel().close(self.proctor.session_id)
+        except Exception as e:
+            print(f"Proctor Cleanup Error: {e}")
+
 # Configure Gemini
 genai.configure(api_key=API_KEY)
 
 # ---------------- Data Handling ----------------
 def load_data():
-    if os.path.exists(COMPANIES_FILE):
-        try:
-            df = pd.read_excel(COMPANIES_FILE)
-            required_cols = ["Company", "Role", "JD", "JD_File_Path", "ResumeThreshold", "AptitudeThreshold", "Job_ID", "HasQuestions"]
-            for col in required_cols:
-                if col not in df.columns:
-                    df[col] = "Pending" # Default to pending for new fields
-            df = df.fillna("")
-            return df
-        except Exception as e:
-            st.error(f"❌ Error loading data: {e}")
-            return pd.DataFrame(columns=["Company", "Role", "JD", "JD_File_Path", "ResumeThreshold", "AptitudeThreshold", "Job_ID", "HasQuestions"])
-    else:
-        print(f"ℹ️ File not found: {COMPANIES_FILE}, creating new.")
-        df = pd.DataFrame(columns=["Company", "Role", "JD", "JD_File_Path", "ResumeThreshold", "AptitudeThreshold", "Job_ID", "HasQuestions"])
-        return df
+    try:
+        storage.migrate_jobs_from_xlsx(COMPANIES_FILE) # One-time import of the legacy workbook
+        return storage.load_jobs_df() # Cached snapshot, re-read only when a job changes
+    except Exception as e:
+        st.error(f"❌ Error loading data: {e}")
+        return pd.DataFrame(columns=storage.JOB_COLUMNS)
 
-def save_data(df):
+def add_job(job):
     try:
-        if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
-        df.to_excel(COMPANIES_FILE, index=False)
-        st.toast("✅ Jobs Database Saved!", icon="💾") 
+        storage.insert_job(job)
+        st.toast("✅ Jobs Database Saved!", icon="💾")
+        return True
+    except sqlite3.IntegrityError:
+        st.error(f"❌ A listing with Job ID '{job.get('Job_ID')}' already exists.")
     except Exception as e:
         st.error(f"❌ CRITICAL ERROR SAVING DATA: {e}")
+    return False
 
-def load_apps():
-    if os.path.exists(APPS_FILE):
-        try:
-            df = pd.read_excel(APPS_FILE)
-            cols = ["Name", "Email", "Score", "Company", "Role", "Status", "Resume_Text", "TestPassword", "TokenTime", "TestScore", "TestStatus", "Resume_Path", "Timestamp", "Job_ID", "ApplicantName"]
-            for col in cols:
-                if col not in df.columns: df[col] = ""
-            return df
-        except Exception:
-            return pd.DataFrame(columns=["Name", "Email", "Score", "Company", "Role", "Status", "Resume_Text", "TestPassword", "TokenTime", "TestScore", "TestStatus", "Resume_Path", "Timestamp", "Job_ID", "ApplicantName"])
-    else:
-        return pd.DataFrame(columns=["Name", "Email", "Score", "Company", "Role", "Status", "Resume_Text", "TestPassword", "TokenTime", "TestScore", "TestStatus", "Resume_Path", "Timestamp", "Job_ID", "ApplicantName"])
-
-def save_apps(df):
+def edit_job(job_id, fields):
     try:
-        if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
-        df.to_excel(APPS_FILE, index=False)
+        storage.update_job(job_id, fields)
+        st.toast("✅ Jobs Database Saved!", icon="💾")
     except Exception as e:
-        st.error(f"❌ Error Saving Applications: {e}")
+        st.error(f"❌ CRITICAL ERROR SAVING DATA: {e}")
 
-# ---------------- Email Notification ----------------
-def send_email(candidate_email, score, company, role, email_type="success", token=None):
+def remove_job(job_id):
     try:
-        sender_email = st.secrets["EMAIL_ADDRESS"]
-        password = st.secrets["EMAIL_PASSWORD"]
-    except Exception:
-        st.warning("⚠️ Email secrets not found. Skipping email.")
-        return ""
+        storage.delete_job(job_id)
+        st.toast("✅ Jobs Database Saved!", icon="💾")
+    except Exception as e:
+        st.error(f"❌ CRITICAL ERROR SAVING DATA: {e}")
 
-    if email_type == "success":
-        # Use provided token or generate backup (though caller should provide it)
-        if not token:
-            chars = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
-            token = "".join(random.choices(chars, k=6))
-        
-        subject = f"Congratulations! You've been shortlisted for {role} at {company}"
-        heading = "Great News! 🎉"
-        heading_color = "#FF9F1C"
-        score_color = "#2ecc71"
-        try:
-            base_url = st.secrets.get("BASE_URL", "http://localhost:8501")
-            if base_url.endswith("/"):
-                base_url = base_url.rstrip("/")
-        except:
-            base_url = "http://localhost:8501"
-            
-        body_content = f"""
-        <p>We are thrilled to inform you that your profile has been <strong>shortlisted</strong> for the <strong>{role}</strong> position at <strong>{company}</strong>!</p>
-        <p>Your Resume Score: <span style="font-size: 18px; font-weight: bold; color: {score_color};">{score}/100</span></p>
-        <hr>
-        <p>You have been invited to take the <strong>Proctored Aptitude Test</strong>.</p>
-        <div style="background: #fdf2f8; padding: 15px; border-left: 4px solid #db2777; margin: 20px 0;">
-            <p style="margin:0; font-weight:bold; color:#be185d;">Your Access Credentials:</p>
-            <p style="margin:5px 0 0 0;">Test Password: <span style="font-size: 1.25em; background: #fff; padding: 2px 8px; border: 1px solid #ddd; border-radius: 4px;">{token}</span></p>
-            <p style="margin:5px 0 0 0; font-size: 0.85em; color: #666;">⚠️ Valid for 30 Hours only.</p>
-        </div>
-        <p>Please click the link below to proceed:</p>
-        <div style="text-align: center; margin: 30px 0;">
-            <a href="{base_url}/?mode=test" style="background-color: #FF9F1C; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; font-weight: bold; display: inline-block;">Start Aptitude Test</a>
-        </div>
-        """
-    else:
-        subject = f"Update on your application for {role} at {company}"
-        heading = "Application Update"
-        heading_color = "#555"
-        score_color = "#e74c3c"
-        body_content = f"""
-        <p>Thank you for giving us the opportunity to review your application for the <strong>{role}</strong> position at <strong>{company}</strong>.</p>
-        <p>Your Resume Score: <span style="font-size: 18px; font-weight: bold; color: {score_color};">{score}/100</span></p>
-        <hr>
-        <p><strong>Don't be discouraged!</strong> We will keep your resume in our talent pool for future openings.</p>
-        """
-
-    html_content = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; color: #333;">
-            <div style="background-color: #f4f4f4; padding: 20px;">
-                <div style="background-color: white; padding: 30px; border-radius: 10px; max-width: 600px; margin: auto; border-top: 5px solid {heading_color};">
-                    <h2 style="color: {heading_color};">{heading}</h2>
-                    <p>Dear Candidate,</p>
-                    {body_content}
-                    <br>
-                    <p>Best Regards,<br><strong>Auto Hire Pro Team</strong></p>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = sender_email
-    msg["To"] = candidate_email
-    msg.attach(MIMEText(html_content, "html"))
+def migrate_apps():
+    try:
+        storage.migrate_apps_from_xlsx(APPS_FILE) # One-time import of the legacy workbook
+    except Exception as e:
+        st.error(f"❌ Error migrating applications: {e}")
 
+def load_apps():
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(sender_email, password)
-            server.sendmail(sender_email, candidate_email, msg.as_string())
-        print(f"✅ {email_type.capitalize()} email sent to {candidate_email}")
-        return token
+        migrate_apps()
+        return storage.load_apps_df()
     except Exception as e:
-        st.error(f"❌ Email Delivery Failed: {e}")
-        print(f"❌ Failed to send email: {e}")
-        return ""
+        st.error(f"❌ Error loading applications: {e}")
+        return pd.DataFrame(columns=["App_ID"] + storage.APP_COLUMNS)
 
-def extract_text_from_pdf(file):
+def extract_text_from_pdf(file, max_chars=RESUME_CHARS, max_pages=extraction.MAX_PAGES, time_budget=extraction.TIME_BUDGET):
+    """Lazy page-by-page extraction that stops at max_chars (None = whole document).
+    The page / time budgets are for resumes; pass None for both to read a JD in full."""
     try:
-        reader = PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            try:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted
-            except Exception as e:
-                print(f"⚠️ Error parsing PDF page: {e}")
-                continue
-        return text
+        return extraction.extract_pdf_text(file, max_chars, max_pages, time_budget)
     except Exception as e:
         st.error(f"Error reading PDF file: {e}")
         return ""
 
-def extract_text_from_docx(file):
-    doc = Document(file)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
+def extract_text_from_docx(file, max_chars=None):
+    return extraction.extract_docx_text(file, max_chars)
 
-def calculate_score(resume_text, jd_text):
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            model = genai.GenerativeModel('gemini-flash-latest')
-            prompt = f"""
-            Act as a calibrated ATS. Compare the Resume to the JD.
-            
-            JD: {jd_text[:2000]}...
-            RESUME: {resume_text[:2000]}...
-            
-            SCORING ALGORITHM (Base + Merit):
-            
-            1. **BASE SCORE (40 Points)**: 
-               - If the text is a valid resume with Contact, Education, and Experience sections, AUTOMATICALLY AWARD 40 POINTS.
-               - If it is gibberish or empty, award 0.
-            
-            2. **MERIT SCORE (0-60 Points)**:
-               - **Keywords & Skills (25)**: Exact matches for Key Technical Skills in JD.
-               - **Experience Relevance (25)**: Similar Job Titles, Industy, and Seniority.
-               - **Formatting & Impact (10)**: Quantifiable results (numbers/%) and clear structure.
-            
-            TOTAL = BASE (40) + MERIT (0-60). Max 100.
-            
-            INSTRUCTIONS:
-            - Most decent candidates should score between 50-70.
-            - Only perfect matches should exceed 85.
-            - OUTPUT FORMAT: "Final Score: <number>"
-            """
-            generation_config = {"temperature": 0.0, "top_p": 0.1, "top_k": 1}
-            response = model.generate_content(prompt, generation_config=generation_config)
-            
-            # Robust Parsing
-            import re
-            text = response.text
-            match = re.search(r"Final Score:\s*(\d+)", text, re.IGNORECASE)
-            if match:
-                score = int(match.group(1))
-                return min(100, max(0, score)) # Clamp between 0-100
-            else:
-                # Fallback: try to find any double digit number at the end
-                digits = re.findall(r"\d+", text)
-                if digits: 
-                    return min(100, int(digits[-1]))
-                return 40 # Default to base score on error if content likely valid
-                
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            elif attempt == max_retries - 1:
-                st.error(f"AI Error: {e}")
-                return 0
+def start_mail_dispatcher():
+    """Starts the outbox sender at app start so queued mail (e.g. from bulk_ingest) drains."""
+    settings = screening.mail_settings()
+    if settings is None:
+        return None # No email secrets: send_email() warns when it is used
+    return mailer.get_mailer(settings[0], settings[1])
 
-import json
-import random
+def start_scoring_queue():
+    try:
+        workers = int(st.secrets.get("SCORING_WORKERS", scoring_queue.NUM_WORKERS))
+        mode = st.secrets.get("SCORING_WORKER_MODE", scoring_queue.WORKER_MODE)
+    except Exception:
+        workers, mode = scoring_queue.NUM_WORKERS, scoring_queue.WORKER_MODE
+    return scoring_queue.get_queue(screening.process_application, workers, mode)
 
 # ---------------- Question Bank Logic ----------------
 QUESTIONS_DIR = os.path.join(BASE_DIR, "questions")
 if not os.path.exists(QUESTIONS_DIR): os.makedirs(QUESTIONS_DIR)
 
-def generate_question_bank(jd_text, job_id):
-    """Generates 50 Technical Qs (Job Specific) + reuses 50 General Qs (Common Pool)."""
-    
-    # 1. SETUP COMMON POOL (Logical + Situational) - Reuse if exists
-    common_file = os.path.join(QUESTIONS_DIR, "common_pool_v1.json")
-    common_questions = []
-    
-    if os.path.exists(common_file):
-        with open(common_file, "r") as f:
-            common_questions = json.load(f)
-    else:
-        # Generate Common Pool ONCE
-        common_topics = [
-            "Logical Reasoning & IQ (General)",
-            "Situational Judgment (Professional Workplace)",
-        ]
-        model = genai.GenerativeModel('gemini-flash-latest')
-        for topic in common_topics:
-            try:
-                # Ask for 25 each
-                prompt = f"""
-                Generate 25 Multiple Choice Questions (MCQs).
-                FOCUS AREA: {topic}
-                TAG: General
-                OUTPUT FORMAT (JSON): [{{"q": "...", "options": [...], "answer": "...", "type": "General"}}]
-                """
-                response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-                batch = json.loads(response.text)
-                if isinstance(batch, list):
-                    # Ensure type tag exists
-                    for b in batch: b["type"] = "General"
-                    common_questions.extend(batch)
-                time.sleep(1)
-            except Exception as e:
-                print(f"⚠️ Error gen common pool {topic}: {e}")
-        
-        # Save Common Pool
-        with open(common_file, "w") as f:
-            json.dump(common_questions, f)
-
-    # 2. GENERATE JOB SPECIFIC TECHNICAL QUESTIONS (50 Qs)
-    tech_questions = []
-    tech_topics = [
-        "Technical Skills in JD (Hard)",
-        "Advanced Role-Specific Scenarios"
-    ]
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    for topic in tech_topics:
-        try:
-            prompt = f"""
-            Act as a Senior Tech Interviewer. Generate 25 Hard MCQs for this Job Description.
+QUESTIONS_PER_TOPIC = 25   # per focus area; larger banks just add more concurrent batches
+GENERATION_WORKERS = question_gen.WORKERS
+COMMON_TOPICS = [
+    "Logical Reasoning & IQ (General)",
+    "Situational Judgment (Professional Workplace)",
+]
+TECH_TOPICS = [
+    "Technical Skills in JD (Hard)",
+    "Advanced Role-Specific Scenarios"
+]
+
+def _question_prompt(job, jd_text):
+    variety = f"\n            This is batch {job.part} of {job.parts} for this focus area: cover different sub-topics than the other batches." if job.parts > 1 else ""
+    if grading.SCHEMES[GRADING_SCHEME].partial:
+        variety += '\n            Also give "credit": one mark per option in option order (1 for the answer, e.g. 0.5 for a partly right option, else 0).'
+    if job.qtype == "General":
+        return f"""
+            Generate {job.count} Multiple Choice Questions (MCQs).
+            FOCUS AREA: {job.topic}
+            TAG: General{variety}
+            OUTPUT FORMAT (JSON): [{{"q": "...", "options": [...], "answer": "...", "type": "General"}}]
+            """
+    return f"""
+            Act as a Senior Tech Interviewer. Generate {job.count} Hard MCQs for this Job Description.
             JD SUMMARY: {jd_text[:1500]}...
-            FOCUS AREA: {topic}
-            TAG: Technical
+            FOCUS AREA: {job.topic}
+            TAG: Technical{variety}
             OUTPUT FORMAT (JSON): [{{"q": "...", "options": [...], "answer": "...", "type": "Technical"}}]
             """
-            response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            batch = json.loads(response.text)
-            if isinstance(batch, list):
-                for b in batch: b["type"] = "Technical"
-                tech_questions.extend(batch)
-            time.sleep(1)
-        except Exception as e:
-            print(f"⚠️ Error gen tech batch {topic}: {e}")
 
-    # 3. MERGE & SAVE
-    full_bank = tech_questions + common_questions
+def _generate_json(prompt):
+    model = genai.GenerativeModel('gemini-flash-latest')
+    response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+    return response.text
+
+def generate_question_bank(jd_text, job_id, per_topic=QUESTIONS_PER_TOPIC, progress=None):
+    """Generates Technical Qs (Job Specific) + reuses General Qs (Common Pool).
+    All topic batches run concurrently; progress(done, total, kept) streams back as they finish."""
+    
+    # 1. SETUP COMMON POOL (Logical + Situational) - Shared, versioned artifact
+    pool_version, common_questions = common_pool.current()
+    pool_lock = common_pool.GenerationLock()
+    jobs = []
+    if pool_version is None and pool_lock.acquire():
+        pool_version, common_questions = common_pool.current() # Re-check under the lock
+        if pool_version is None:
+            # Generate Common Pool ONCE (in the same concurrent run as the technical batches)
+            jobs += question_gen.plan_jobs(COMMON_TOPICS, "General", QUESTIONS_PER_TOPIC)
+        else:
+            pool_lock.release()
+
+    try:
+        # 2. GENERATE JOB SPECIFIC TECHNICAL QUESTIONS
+        jobs += question_gen.plan_jobs(TECH_TOPICS, "Technical", per_topic)
+        # Near-duplicate filter (MinHash/LSH) seeded with the common pool, applied as batches arrive
+        dedup = mcq_dedup.NearDupIndex(common_questions)
+        generated, stats = question_gen.generate(
+            jobs, lambda job: _question_prompt(job, jd_text), _generate_json,
+            workers=GENERATION_WORKERS, deduper=dedup, progress=progress,
+        )
+        stats["dedup_report"] = dedup.report()
+        print(f"🧠 Question generation for {job_id}: {stats}")
+        tech_questions = generated.get("Technical", [])
+
+        if pool_lock.held and generated.get("General"):
+            pool_version = common_pool.publish(generated["General"])
+            common_questions = common_pool.load(pool_version)
+    finally:
+        pool_lock.release()
+
+    if pool_version is None:
+        # Another admin is generating the pool right now: use theirs once it is published
+        pool_version, common_questions = common_pool.wait_for_pool()
+
+    # 3. SAVE (the bank references the common pool version instead of copying it)
+    full_bank = {"common_pool": pool_version, "questions": tech_questions, "generation": stats}
     
     # Save to JSON
     q_file = os.path.join(QUESTIONS_DIR, f"{job_id}.json")
     with open(q_file, "w") as f:
         json.dump(full_bank, f)
+
+    # Compiled copy that candidate sessions read (per-type offset tables, mmap'd)
+    try:
+        question_bank.compile_bank(tech_questions, os.path.join(QUESTIONS_DIR, f"{job_id}.qbank"), {"common_pool": pool_version})
+    except Exception as e:
+        print(f"⚠️ Error compiling question bank: {e}")
         
     # Save to Word (DOCX)
     docx_path = None
@@ -469,32 +359,65 @@ def generate_question_bank(jd_text, job_id):
     except Exception as e:
         print(f"⚠️ Error saving DOCX: {e}")
 
-    return len(full_bank), docx_path
+    return len(tech_questions) + len(common_questions), docx_path, stats
 
 def get_candidate_questions(job_id, num_questions=40):
     """Samples 25 Technical + 15 General Questions."""
-    q_file = os.path.join(QUESTIONS_DIR, f"{job_id}.json")
-    if not os.path.exists(q_file): return []
-    
-    with open(q_file, "r") as f:
-        bank = json.load(f)
-        
-    tech = [q for q in bank if q.get("type") == "Technical"]
-    general = [q for q in bank if q.get("type") == "General"]
-    
-    # Fallback if tags missing (older files)
-    if not tech and not general:
-        return random.sample(bank, min(len(bank), num_questions))
-        
+    qb_file = os.path.join(QUESTIONS_DIR, f"{job_id}.qbank")
+    if not os.path.exists(qb_file):
+        q_file = os.path.join(QUESTIONS_DIR, f"{job_id}.json")
+        if not os.path.exists(q_file): return []
+        try:
+            question_bank.compile_json(q_file, qb_file) # Banks generated before .qbank existed
+        except Exception as e:
+            print(f"⚠️ Error compiling question bank: {e}")
+            return []
+
     # Stratified Sampling (25 Tech, 15 General => 40 Total)
-    # If not enough, take what we have
-    n_tech = min(len(tech), 25)
-    n_gen = min(len(general), 15)
-    
-    exam_set = random.sample(tech, n_tech) + random.sample(general, n_gen)
+    # If not enough, take what we have. Only the sampled questions are decoded.
+    bank = question_bank.open_bank(qb_file)
+    pool_version = bank.meta.get("common_pool")
+    if not pool_version:
+        return bank.draw({"Technical": 25, "General": 15}, num_questions) # Older banks carry their own copy
+
+    general = common_pool.load(pool_version) # Parsed once per process, shared across sessions
+    exam_set = bank.sample("Technical", 25) + [dict(q) for q in random.sample(general, min(len(general), 15))]
     random.shuffle(exam_set)
     return exam_set
 
+try:
+    GRADING_SCHEME = st.secrets.get("GRADING_SCHEME", grading.DEFAULT_SCHEME) # See grading.SCHEMES (e.g. negative marking)
+except Exception:
+    GRADING_SCHEME = grading.DEFAULT_SCHEME
+if GRADING_SCHEME not in grading.SCHEMES:
+    print(f"⚠️ Unknown GRADING_SCHEME '{GRADING_SCHEME}'; using {grading.DEFAULT_SCHEME}")
+    GRADING_SCHEME = grading.DEFAULT_SCHEME
+
+def save_exam_answer(attempt_id, qid, key, opts):
+    # Autosave: one small append per answer change (option index + its text)
+    choice = st.session_state.get(key)
+    try:
+        attempt_store.save_answer(attempt_id, qid, choice, None if choice is None else opts[choice])
+    except Exception as e:
+        st.toast(f"⚠️ Answer not saved, please re-select it: {e}")
+
+@st.fragment
+def exam_questions(attempt_id, questions, saved):
+    """Question list. Answering reruns only this fragment, not the whole page."""
+    for i, q in enumerate(questions):
+        qid = attempt_store.question_id(q, i)
+        st.markdown(f"**Q{i+1}. {q.get('q')}**")
+        opts = q.get('options', [])
+        choice, text = saved.get(qid, (None, None))
+        if choice is None and text is not None:
+            choice = grading.choice_index(q, text) # Saved before answers were kept as indices
+        st.radio(f"Select Answer", range(len(opts)), index=choice if choice is not None and 0 <= choice < len(opts) else None,
+                 format_func=lambda j, opts=opts: opts[j], key=f"q_{i}", label_visibility="collapsed",
+                 on_change=save_exam_answer, args=(attempt_id, qid, f"q_{i}", opts))
+        st.divider()
+    answered = sum(st.session_state.get(f"q_{i}") is not None for i in range(len(questions)))
+    st.caption(f"💾 {answered}/{len(questions)} answered · saved automatically")
+
 # ---------------- VIBRANT SAAS UI IMPLEMENTATION ----------------
 def main():
     st.set_page_config(page_title="Auto Hire Pro", page_icon="🚀", layout="wide")
@@ -719,38 +642,22 @@ def main():
             mode = st.radio("Workspace", ["Job Seekers", "Admin Dashboard"], label_visibility="collapsed")
 
     df = load_data()
-    apps_df = load_apps()
+    migrate_apps()
+    # Only the admin views need the full applications table; test-portal logins use the credential index
+    apps_df = load_apps() if mode == "Admin Dashboard" else None
+    start_scoring_queue()
+    start_mail_dispatcher()
     
     # ---------------- HELPER: VERIFY TOKEN ----------------
     def verify_token(email, password):
-        # 1. Find all apps by this email
-        user_apps = apps_df[apps_df['Email'] == email]
-        if user_apps.empty: return False, "Email not found."
-        
-        # 2. Check if ANY credential matches the provided password
-        # This handles cases where a user applied multiple times (some rejected, some shortlisted)
-        # We need to find the specific application record that matches this password.
-        match = user_apps[user_apps['TestPassword'].astype(str).str.strip() == password.strip()]
-        
-        if match.empty:
+        # O(1) lookup on (email, password) with the 30-hour expiry precomputed; a candidate
+        # who applied several times is matched to the application this password was issued for
+        valid, res = credential_index.verify(email, password)
+        if not valid:
+            return False, res
+        user = storage.get_app(res)
+        if user is None:
             return False, "Invalid Password or Application not found."
-            
-        user = match.iloc[0] # Take the matching record
-        
-        # 3. Validation Checks
-        if user['Status'] != 'Shortlisted': 
-            return False, "Access Denied: You have not been shortlisted yet."
-            
-        # Check Expiry (30 Hours)
-        try:
-            token_time = pd.to_datetime(user['TokenTime'])
-            now = pd.Timestamp.now()
-            diff = now - token_time
-            if diff.total_seconds() > 30 * 3600:
-                return False, "Link Expired (Valid for 30hrs only)."
-        except:
-             return False, "Invalid Token Data."
-             
         return True, user
 
     # ---------------- TEST PORTAL ----------------
@@ -811,22 +718,45 @@ def main():
                     async_processing=True
                 )
                 
+                channel = warnings_channel()
+                p_state = None
+                if ctx.video_transformer:
+                    proctor = ctx.video_transformer.proctor
+                    proctor.bind(user['App_ID']) # Tags the session's event trail with this candidate
+                    st.session_state.proctor_session = proctor.session_id
+                    p_state = channel.open(proctor.session_id, user['App_ID'])
+                    st.session_state.warning_count = max(st.session_state.warning_count, proctor.warn_count)
+                
                 # Warnings (Always Visible)
                 warns = st.session_state.warning_count
-                st.metric("Warnings", f"{warns}/5", delta_color="inverse")
-                
-                if warns >= 3:
-                     st.error("⚠️ CRITICAL WARNING")
+                live = p_state is not None and warning_channel.serving()
+                # Until the widget has confirmed a poll (HTTPS, proxies and firewalls can all block it) reruns stay on
+                confirmed = live and p_state['confirmed']
+                if live:
+                    # Live widget: long-polls the warning channel, so new warnings don't rerun this script
+                    st.components.v1.html(warning_channel.widget_html(proctor.session_id, p_state['token'], warns, WARNING_CHANNEL_URL, WARNING_CHANNEL_PORT), height=100)
+                    st.markdown("<style>.st-key-proctor_sync {display: none;}</style>", unsafe_allow_html=True)
+                    st.button("sync", key="proctor_sync") # Clicked by the widget once, on termination
+                if not confirmed:
+                    st.metric("Warnings", f"{warns}/5", delta_color="inverse")
+                    if warns >= 3:
+                         st.error("⚠️ CRITICAL WARNING")
+                    if live and channel.unreachable(proctor.session_id):
+                        st.caption("Live warning updates are unavailable in this browser; the count refreshes when a warning is issued.")
                      
-                # Update Warning Count (Live)
                 if ctx.video_transformer:
+                    p_stats = proctor.snapshot()
+                    st.caption(f"📹 {p_stats['fps']} fps · {p_stats['infer_ms']} ms/check · 1 in {p_stats['stride']} frames @ {p_stats['width']}px · {p_stats['dropped']} dropped")
+
+                # Update Warning Count (Live) - only while the warning channel is not confirmed
+                if ctx.video_transformer and not confirmed:
                     new_warns = ctx.video_transformer.warn_count
                     if new_warns > st.session_state.warning_count:
                         st.session_state.warning_count = new_warns
                         st.rerun()
                 
                 # Auto-Termination Check
-                if st.session_state.warning_count >= 5:
+                if st.session_state.warning_count >= 5 or (p_state and p_state['terminated']):
                     st.session_state.test_stage = 'terminated'
                     st.rerun()
 
@@ -925,46 +855,37 @@ def main():
                          if not jid or pd.isna(jid) or jid == "":
                              jid = f"{user['Company']}_{user['Role']}".replace(" ", "_")
                          
-                         qs = get_candidate_questions(jid)
+                         # Resumes an in-progress attempt (same questions, saved answers) after a reconnect
+                         try:
+                             attempt = attempt_store.start_or_resume(user['App_ID'], jid, lambda: get_candidate_questions(jid))
+                         except attempt_store.AttemptClosedError as e:
+                             # One attempt per application: never hand out a fresh question set
+                             st.session_state.test_stage = 'terminated' if e.status == 'terminated' else 'submitted'
+                             st.rerun()
                          # Fallback
-                         if not qs:
+                         if not attempt:
                               st.error("No questions found. Contact Admin.")
                          else:
-                              st.session_state.exam_questions = qs
+                              st.session_state.exam_attempt, st.session_state.exam_questions, st.session_state.exam_saved = attempt
+                              if st.session_state.exam_saved:
+                                  st.toast(f"💾 Restored {len(st.session_state.exam_saved)} saved answers", icon="✅")
                     
-                    questions = st.session_state.exam_questions or []
+                    questions = st.session_state.get('exam_questions') or []
                     
                     if questions:
-                        with st.form("exam_submission"):
-                            answers = {}
-                            for i, q in enumerate(questions):
-                                st.markdown(f"**Q{i+1}. {q.get('q')}**")
-                                opts = q.get('options', [])
-                                ans = st.radio(f"Select Answer", opts, key=f"q_{i}", label_visibility="collapsed")
-                                answers[i] = ans
-                                st.divider()
+                        attempt_id = st.session_state.exam_attempt
+                        exam_questions(attempt_id, questions, st.session_state.exam_saved)
+                        
+                        if st.button("Submit Test", type="primary"):
+                            # Calculate Score (from the saved answers, which are what the candidate last selected)
+                            answers = attempt_store.answers(attempt_id)
+                            raw_score = grading.as_score(grading.grade_attempt(questions, answers, GRADING_SCHEME))
                             
-                            if st.form_submit_button("Submit Test"):
-                                # Calculate Score
-                                raw_score = 0
-                                total = len(questions)
-                                for i, q in enumerate(questions):
-                                    user_ans = str(answers.get(i)).strip()
-                                    correct = str(q.get('answer')).strip()
-                                    if user_ans == correct:
-                                        raw_score += 1
-                                    elif user_ans in correct or correct in user_ans:
-                                        if len(user_ans) > 5 and len(correct) > 5: raw_score += 1
-                                
-                                # Save Results
-                                idx = apps_df[apps_df['Email'] == user['Email']].index
-                                if not idx.empty:
-                                    apps_df.at[idx[0], 'TestScore'] = raw_score 
-                                    apps_df.at[idx[0], 'TestStatus'] = 'Completed'
-                                    save_apps(apps_df)
-                                
-                                st.session_state.test_stage = 'submitted'
-                                st.rerun()
+                            # Save Results (single-row update for this application)
+                            attempt_store.finalize(attempt_id, user['App_ID'], raw_score, scheme=GRADING_SCHEME)
+                            
+                            st.session_state.test_stage = 'submitted'
+                            st.rerun()
 
         # --- STAGE 3: EXAM ---
         # --- STAGE 3: EXAM ---
@@ -984,13 +905,14 @@ def main():
              # Save Status as Malpractice
              # We do this once to avoid overwriting or redundant saves
              user = st.session_state.test_session
-             idx = apps_df[apps_df['Email'] == user['Email']].index
-             if not idx.empty:
-                 if apps_df.at[idx[0], 'TestStatus'] != 'Terminated (Malpractice)':
-                     apps_df.at[idx[0], 'TestStatus'] = 'Terminated (Malpractice)'
-                     save_apps(apps_df)
+             current = storage.get_app(user['App_ID'])
+             if current:
+                 if current['TestStatus'] != 'Terminated (Malpractice)':
+                     storage.update_app(user['App_ID'], {'TestStatus': 'Terminated (Malpractice)'})
+                     attempt_store.close_open(user['App_ID'])
+                     proctor_events.record(st.session_state.get('proctor_session', f"app-{user['App_ID']}"), "terminated", app_id=user['App_ID'], counted=True)
                      # Trigger Email (Placeholder)
-                     # send_email(user['Email'], 0, user['Company'], user['Role'], "malpractice")
+                     # screening.send_email(user['Email'], 0, user['Company'], user['Role'], "malpractice")
              
              if st.button("Return to Home"):
                  st.session_state.test_session = None
@@ -1386,7 +1308,9 @@ def main():
         # Filter Logic
         if not df.empty:
             if query:
-                filtered_df = df[df['Role'].str.contains(query, case=False) | df['Company'].str.contains(query, case=False)]
+                ranked_ids = job_search.search(query) # Indexed Role/Company/JD search, best match first
+                rank = {job_id: i for i, job_id in enumerate(ranked_ids)}
+                filtered_df = df[df['Job_ID'].isin(rank)].sort_values('Job_ID', key=lambda ids: ids.map(rank))
             else:
                 filtered_df = df
         else:
@@ -1493,52 +1417,34 @@ def main():
                         if not email or not resume or not full_name:
                             st.error("Please provide Name, Email and Resume.")
                         else:
-                            with st.spinner("Analyzing Resume & Sending..."):
+                            with st.spinner("Submitting Application..."):
                                 # LOGIC: SAVE RESUME
                                 if not os.path.exists(RESUMES_DIR): os.makedirs(RESUMES_DIR)
                                 r_path = os.path.join(RESUMES_DIR, f"{job_data['Company']}_{email}_{resume.name}")
                                 with open(r_path, "wb") as f: f.write(resume.getbuffer())
+                                r_hash = resume_store.file_hash(resume.getbuffer())
                                 
-                                # LOGIC: SCORE
-                                text = extract_text_from_pdf(resume) if resume.name.endswith(".pdf") else extract_text_from_docx(resume)
-                                score = calculate_score(text, job_data["JD"])
-                                
-                                # LOGIC: STATUS & TOKEN
-                                thresh = int(job_data.get("ResumeThreshold", 60))
-                                status = "Shortlisted" if score >= thresh else "Rejected"
-                                
-                                token = ""
-                                if status == "Shortlisted":
-                                    chars = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
-                                    token = "".join(random.choices(chars, k=6))
-                                
-                                # LOGIC: SAVE APP
+                                # LOGIC: RECORD APP (Scoring + email happen on the background queue)
                                 new_app = {
                                     "Company": job_data['Company'], 
                                     "Role": job_data["Role"],
-                                    "Job_ID": job_data.get("Job_ID", ""), # <--- FIX: Added Job_ID
+                                    "Job_ID": job_data.get("Job_ID", ""),
                                     "Name": full_name,
                                     "Email": email, 
-                                    "Score": score,
-                                    "Status": status,                 # <--- FIX: Added Status
-                                    "TestPassword": token,            # <--- FIX: Added Password
-                                    "TokenTime": datetime.datetime.now(),
                                     "TestStatus": "Pending",
                                     "Resume_Path": r_path, 
+                                    "Resume_Hash": r_hash,
                                     "Timestamp": datetime.datetime.now()
                                 }
-                                apps_df = pd.concat([apps_df, pd.DataFrame([new_app])], ignore_index=True)
-                                save_apps(apps_df)
-                                
-                                # LOGIC: EMAIL
-                                email_type = "success" if status == "Shortlisted" else "rejection"
-                                send_email(email, score, job_data['Company'], job_data["Role"], email_type, token=token)
-                                
-                                if status == "Shortlisted":
-                                    st.success(f"🎉 Application Sent! Resume Match: {score}/100")
+                                task = {"job_id": job_data["Job_ID"], "resume_path": r_path, "resume_hash": r_hash, "email": email}
+                                try:
+                                    scoring_queue.enqueue_application(new_app, task)
+                                    st.success("🎉 Application Received! Your resume is being analyzed — the result will be emailed to you shortly.")
                                     st.balloons()
-                                else:
-                                    st.info(f"Application Sent. Resume Match: {score}/100")
+                                except scoring_queue.QueueFullError:
+                                    st.warning("⏳ We're receiving a lot of applications right now. Please try again in a few minutes.")
+                                except Exception as e:
+                                    st.error(f"❌ Error Saving Application: {e}")
                                     
                 st.markdown("</div>", unsafe_allow_html=True)
             else:
@@ -1612,7 +1518,8 @@ def main():
 </div>
 """, unsafe_allow_html=True)
             with k2:
-                avg = int(apps_df["Score"].mean()) if not apps_df.empty else 0
+                scored = apps_df["Score"].dropna() if not apps_df.empty else []
+                avg = int(scored.mean()) if len(scored) else 0
                 st.markdown(f"""
 <div class="metric-card">
     <div class="metric-val">{avg}%</div>
@@ -1642,6 +1549,34 @@ def main():
                 st.write(f"**Current Email Link Base URL:** `{debug_url}`")
                 st.info("If this URL is incorrect, update .streamlit/secrets.toml and reboot.")
                 
+            with st.expander("⏱️ Scoring Queue & Cache"):
+                q_stats = scoring_queue.queue_metrics()
+                if q_stats:
+                    st.dataframe(pd.DataFrame(q_stats), use_container_width=True)
+                else:
+                    st.info("No scoring activity in the last 24 hours.")
+                
+                o_stats = mailer.outbox_stats()
+                st.write(f"**Email Outbox:** {o_stats['queued']} queued · {o_stats['sending']} sending · {o_stats['sent']} sent · {o_stats['failed']} failed")
+                
+                c_stats = score_cache.cache_stats()
+                st.write(f"**Score Cache:** {c_stats['entries']} entries · {c_stats['hits']} hits / {c_stats['misses']} misses (hit rate {c_stats['hit_rate']:.0%})")
+                if st.button("🧹 Clear Score Cache"):
+                    score_cache.invalidate_all()
+                    st.success("Score cache cleared.")
+
+            if PROCTORING_AVAILABLE:
+                with st.expander("🎥 Live Proctoring Sessions"):
+                    p_sessions = proctoring.session_stats()
+                    if p_sessions:
+                        st.dataframe(pd.DataFrame(p_sessions), use_container_width=True)
+                    else:
+                        st.info("No active proctoring sessions.")
+                    e_stats = proctor_events.log_stats()
+                    st.caption(f"Event log: {e_stats['written']} written in {e_stats['flushes']} batches · {e_stats['buffered']} buffered · {e_stats['dropped']} dropped")
+                    ev_stats = evidence.metrics()
+                    st.caption(f"Evidence: {ev_stats['files']} snapshots ({ev_stats['bytes_written'] / 1024 ** 2:.1f} MB) for {ev_stats['events']} events · {ev_stats['queued']} queued · {ev_stats['dropped']} dropped · {ev_stats['capped']} over cap")
+                
             tab_jobs, tab_apps = st.tabs(["Manage Jobs", "View Applications"])
             
             with tab_jobs:
@@ -1656,21 +1591,24 @@ def main():
                                 st.markdown(f"**{row['Role']}** ({row['Company']})")
                             with c_p2:
                                 if st.button(f"⚙️ Generate Test", key=f"gen_{idx}"):
-                                    with st.spinner("🤖 AI is reading JD & Generating Question Bank..."):
-                                        cnt, d_path = generate_question_bank(row['JD'], row['Job_ID'])
+                                    gen_bar = st.progress(0.0, text="🤖 AI is reading JD & Generating Question Bank...")
+                                    def on_progress(done, total, kept):
+                                        gen_bar.progress(done / total, text=f"🤖 {done}/{total} batches done · {kept} questions so far")
+                                    cnt, d_path, gen_stats = generate_question_bank(row['JD'], row['Job_ID'], progress=on_progress)
                                     
                                     # Update Status
-                                    df.at[idx, 'HasQuestions'] = 'Done'
-                                    save_data(df)
+                                    edit_job(row['Job_ID'], {'HasQuestions': 'Done'})
                                     
                                     # Persist Download Link
                                     if d_path and os.path.exists(d_path):
                                         st.session_state['latest_doc'] = d_path
                                     
-                                    st.success(f"✅ Generated {cnt} Questions!")
+                                    st.session_state['latest_gen_report'] = f"✅ Generated {cnt} Questions! 🧹 {gen_stats['dedup_report']}"
                                     st.rerun()
 
                 # --- DOWNLOAD LATEST GENERATED ---
+                if 'latest_gen_report' in st.session_state:
+                     st.success(st.session_state['latest_gen_report'])
                 if 'latest_doc' in st.session_state:
                      p = st.session_state['latest_doc']
                      if os.path.exists(p):
@@ -1700,7 +1638,7 @@ def main():
                             if co_name and jd_file:
                                 jp = os.path.join(JOBS_DIR, jd_file.name)
                                 with open(jp, "wb") as f: f.write(jd_file.getbuffer())
-                                jtxt = extract_text_from_pdf(jd_file) if jd_file.name.endswith(".pdf") else extract_text_from_docx(jd_file)
+                                jtxt = extract_text_from_pdf(jd_file, max_chars=None, max_pages=None, time_budget=None) if jd_file.name.endswith(".pdf") else extract_text_from_docx(jd_file)
                                 
                                 # Job ID
                                 job_id = f"{co_name}_{role_name}".replace(" ", "_")
@@ -1716,32 +1654,58 @@ def main():
                                     "Job_ID": job_id,
                                     "HasQuestions": "Pending"
                                 }
-                                df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-                                save_data(df)
-                                
-                                st.success(f"Job {role_name} Published! Check 'Pending Actions' to generate tests.")
-                                st.balloons()
-                                time.sleep(1)
-                                st.rerun()
+                                if add_job(new):
+                                    st.success(f"Job {role_name} Published! Check 'Pending Actions' to generate tests.")
+                                    st.balloons()
+                                    time.sleep(1)
+                                    st.rerun()
 
 
                 st.markdown("### Active Listings")
                 if not df.empty:
                     st.dataframe(df, use_container_width=True)
                     
-                    del_co = st.selectbox("Delete Listing", df["Company"].unique(), index=None)
-                    if del_co:
+                    labels = dict(zip(df["Job_ID"], df["Role"] + " @ " + df["Company"]))
+                    rs_id = st.selectbox("Re-score Applicants", list(labels), index=None, format_func=lambda j: labels[j])
+                    if rs_id and st.button("🔁 Re-score all applicants for this job"):
+                        bar = st.progress(0.0, text="Scoring in batches...")
+                        n = screening.rescore_job(rs_id, progress=lambda done, total: bar.progress(done / total, text=f"Batch {done}/{total}"))
+                        st.success(f"Re-scored {n} applicant(s).")
+                    
+                    del_id = st.selectbox("Delete Listing", list(labels), index=None, format_func=lambda j: labels[j])
+                    if del_id:
                         if st.button("Confirm Delete"):
-                            df = df[df["Company"] != del_co]
-                            save_data(df)
+                            remove_job(del_id)
                             st.success("Deleted")
                             st.rerun()
 
             with tab_apps:
                 st.subheader("Incoming Applications")
                 if not apps_df.empty:
+                    # HR Export (XLSX is only built on demand, never on a normal rerun)
+                    if st.button("📊 Prepare XLSX Export"):
+                        buf = io.BytesIO()
+                        storage.export_apps_to_xlsx(buf, text_lookup=resume_store.get_texts)
+                        st.session_state['apps_export'] = buf.getvalue()
+                    if 'apps_export' in st.session_state:
+                        st.download_button(
+                            "📥 Download Applications (XLSX)",
+                            data=st.session_state['apps_export'],
+                            file_name="applications_export.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                    
+                    # Search over name, email and stored resume text
+                    app_query = st.text_input("Search Candidates", placeholder="Name, email or resume keywords…")
+                    shown_df = apps_df
+                    if app_query:
+                        shown_df = apps_df[apps_df["App_ID"].isin(resume_store.search_apps(apps_df, app_query))]
+                        st.caption(f"{len(shown_df)} matching candidate(s)")
+                    
+                    proctor_counts = proctor_events.counts_by_app() # One query for every candidate's violation count
+                    
                     # Interactive List with Badges
-                    for i, row in apps_df.sort_values(by="Score", ascending=False).iterrows():
+                    for i, row in shown_df.sort_values(by="Score", ascending=False).iterrows():
                         with st.container():
                             st.markdown(f"""
                             <div class="job-card-item">
@@ -1769,6 +1733,10 @@ def main():
                                 with col_d1:
                                     st.write(f"**Email:** {row['Email']}")
                                     st.write(f"**Applied:** {row.get('Timestamp', '')}")
+                                    if row.get('Email_Status'):
+                                        st.write(f"**Email Status:** {row['Email_Status']}")
+                                    if row.get('Score_Stage'):
+                                        st.write(f"**Scored By:** {row['Score_Stage']} (keyword overlap {row.get('Prescreen_Score', '')})")
                                     if row['Resume_Path'] and os.path.exists(row['Resume_Path']):
                                         with open(row['Resume_Path'], "rb") as f:
                                             st.download_button("📥 Download Resume", f, file_name=os.path.basename(row['Resume_Path']), key=f"dl_{i}")
@@ -1776,16 +1744,28 @@ def main():
                                     # Shortlist Action
                                     if row['Status'] != "Shortlisted":
                                         if st.button(f"✨ Invite & Shortlist Candidate", key=f"sl_{i}", type="primary"):
-                                            token = send_email(row['Email'], row['Score'], row['Company'], row['Role'], "success")
+                                            token = screening.send_email(row['Email'], row['Score'], row['Company'], row['Role'], "success", app_id=row['App_ID'])
                                             if token:
-                                                apps_df.at[i, 'Status'] = 'Shortlisted'
-                                                apps_df.at[i, 'TestPassword'] = token
-                                                apps_df.at[i, 'TokenTime'] = datetime.datetime.now()
-                                                save_apps(apps_df)
+                                                storage.update_app(row['App_ID'], {
+                                                    'Status': 'Shortlisted',
+                                                    'TestPassword': token,
+                                                    'TokenTime': datetime.datetime.now()
+                                                })
                                                 st.success(f"Invited {row['Name']}!")
                                                 st.rerun()
                                     else:
                                         st.success("✅ Candidate Shortlisted")
+                                
+                                # Proctoring Evidence Trail (queried only when opened)
+                                n_events = proctor_counts.get(row['App_ID'], 0)
+                                if n_events and st.toggle(f"🎥 Proctoring Timeline ({n_events} events)", key=f"pt_{i}"):
+                                    p_events = pd.DataFrame(proctor_events.timeline(app_id=row['App_ID']))
+                                    p_events['Time'] = pd.to_datetime(p_events['Ts'], unit='s')
+                                    st.dataframe(p_events[['Time', 'Type', 'Face_Count', 'Yaw_Ratio', 'Counted', 'Session_ID']], use_container_width=True, hide_index=True)
+                                    if PROCTORING_AVAILABLE:
+                                        snaps = [f for sid in p_events['Session_ID'].unique() for f in evidence.list_files(sid)]
+                                        if snaps:
+                                            st.image(snaps[:40], width=160, caption=[os.path.basename(f) for f in snaps[:40]])
                             
                             st.divider()
 
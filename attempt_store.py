@@ -0,0 +1,164 @@
+# attempt_store.py
+# Exam attempts with per-answer autosave: the drawn question set is stored when the
+# attempt starts and every answer is one small append-only row, so a dropped connection
+# resumes where it left off and submitting only has to grade and update one row.
+# Answers are kept as option indices (Choice); the option text is stored alongside for audit.
+import json
+import time
+import sqlite3
+import threading
+import storage
+
+ATTEMPTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exam_attempts (
+    Attempt_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    App_ID INTEGER NOT NULL,
+    Job_ID TEXT,
+    Questions TEXT NOT NULL,
+    Status TEXT NOT NULL DEFAULT 'in_progress',
+    Score REAL,
+    Started_At REAL NOT NULL,
+    Finished_At REAL,
+    Scheme TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_exam_attempts_app ON exam_attempts(App_ID, Status);
+CREATE TABLE IF NOT EXISTS attempt_answers (
+    Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    Attempt_ID INTEGER NOT NULL,
+    Question_ID TEXT NOT NULL,
+    Answer TEXT,
+    Answered_At REAL NOT NULL,
+    Choice INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_attempt_answers ON attempt_answers(Attempt_ID, Question_ID);
+"""
+
+class AttemptClosedError(Exception):
+    """Raised when a candidate whose attempt was already submitted or terminated tries to start another."""
+
+    def __init__(self, attempt_id, status):
+        super().__init__(f"Attempt {attempt_id} is already {status}")
+        self.status = status
+
+# Columns added after the tables were first created: (table, column, type)
+_ADDED_COLUMNS = [
+    ("attempt_answers", "Choice", "INTEGER"), # answers stored as option indices
+    ("exam_attempts", "Scheme", "TEXT"),      # marking scheme the attempt was graded with
+]
+_columns_lock = threading.Lock()
+_columns_ready = False
+
+def _conn():
+    global _columns_ready
+    conn = storage.get_conn()
+    storage.ensure_schema("exam_attempts", ATTEMPTS_SCHEMA, conn)
+    if not _columns_ready:
+        with _columns_lock:
+            for table, col, typ in _ADDED_COLUMNS:
+                cols = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+                if col not in cols:
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {typ}")
+                        conn.commit()
+                    except sqlite3.OperationalError:
+                        pass # added by another process meanwhile
+            _columns_ready = True
+    return conn
+
+def question_id(q, i):
+    """Stable key of a question within its attempt (bank/pool id, else its position)."""
+    return str(q.get("id") or f"#{i}")
+
+def _latest_attempt(conn, app_id):
+    return conn.execute(
+        "SELECT Attempt_ID, Questions, Status FROM exam_attempts WHERE App_ID = ? ORDER BY Attempt_ID DESC LIMIT 1",
+        (int(app_id),),
+    ).fetchone()
+
+def start_or_resume(app_id, job_id, draw):
+    """(attempt_id, questions, answers()) for the candidate's open attempt.
+    A new attempt is started with draw() only if the candidate has none yet; one exam per
+    application, so a submitted or terminated attempt raises AttemptClosedError.
+    Returns None if draw() is empty."""
+    conn = _conn()
+    row = _latest_attempt(conn, app_id)
+    if row is None:
+        questions = draw()
+        if not questions: return None
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = _latest_attempt(conn, app_id) # a second tab may have started meanwhile
+            if row is None:
+                cur = conn.execute(
+                    "INSERT INTO exam_attempts (App_ID, Job_ID, Questions, Started_At) VALUES (?, ?, ?, ?)",
+                    (int(app_id), job_id, json.dumps(questions, ensure_ascii=False), time.time()),
+                )
+                return cur.lastrowid, questions, {}
+    if row["Status"] != "in_progress":
+        raise AttemptClosedError(row["Attempt_ID"], row["Status"])
+    return row["Attempt_ID"], json.loads(row["Questions"]), answers(row["Attempt_ID"])
+
+def save_answer(attempt_id, qid, choice, answer=None):
+    """Appends one answer (option index, and its text); the latest row per question wins."""
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT INTO attempt_answers (Attempt_ID, Question_ID, Choice, Answer, Answered_At) VALUES (?, ?, ?, ?, ?)",
+            (int(attempt_id), str(qid), None if choice is None else int(choice), answer, time.time()),
+        )
+
+_LATEST = """SELECT a.Attempt_ID, a.Question_ID, a.Choice, a.Answer FROM attempt_answers a
+             JOIN (SELECT MAX(Seq) AS Seq FROM attempt_answers WHERE Attempt_ID IN ({ids}) GROUP BY Attempt_ID, Question_ID) last
+               ON last.Seq = a.Seq"""
+
+def answers(attempt_id):
+    """{question_id: (choice, text)} of an attempt, latest answer per question.
+    choice is None for answers saved as text only (before indices were kept)."""
+    rows = _conn().execute(_LATEST.format(ids="?"), (int(attempt_id),)).fetchall()
+    return {r["Question_ID"]: (r["Choice"], r["Answer"]) for r in rows}
+
+def finalize(attempt_id, app_id, score, status="Completed", scheme=None):
+    """Closes the attempt and writes the score (and the scheme it was graded with): one row
+    in each table, in one transaction.
+    Returns False if the attempt was already closed (double submit, or terminated meanwhile)."""
+    conn = _conn()
+    with conn:
+        cur = conn.execute(
+            "UPDATE exam_attempts SET Status = 'submitted', Score = ?, Scheme = ?, Finished_At = ? "
+            "WHERE Attempt_ID = ? AND Status = 'in_progress'",
+            (score, scheme, time.time(), int(attempt_id)),
+        )
+        if cur.rowcount == 0: return False
+        changes = storage.update_app(app_id, {"TestScore": score, "TestStatus": status}, conn=conn)
+    storage.notify_app_listeners(changes)
+    return True
+
+def submitted_attempts(job_id):
+    """Every submitted attempt of a job with its questions and answers (two queries in total)."""
+    conn = _conn()
+    rows = conn.execute(
+        "SELECT Attempt_ID, App_ID, Questions, Score, Scheme FROM exam_attempts WHERE Job_ID = ? AND Status = 'submitted' ORDER BY Attempt_ID",
+        (job_id,),
+    ).fetchall()
+    attempts = {r["Attempt_ID"]: {"attempt_id": r["Attempt_ID"], "app_id": r["App_ID"], "score": r["Score"], "scheme": r["Scheme"],
+                                  "questions": json.loads(r["Questions"]), "answers": {}} for r in rows}
+    if attempts:
+        for r in conn.execute(_LATEST.format(ids=", ".join("?" * len(attempts))), list(attempts)):
+            attempts[r["Attempt_ID"]]["answers"][r["Question_ID"]] = (r["Choice"], r["Answer"])
+    return list(attempts.values())
+
+def set_scores(scores, scheme=None):
+    """{Attempt_ID: score} in one transaction; scheme, if given, is recorded as the new one."""
+    conn = _conn()
+    with conn:
+        conn.executemany("UPDATE exam_attempts SET Score = ?, Scheme = COALESCE(?, Scheme) WHERE Attempt_ID = ?",
+                         [(score, scheme, int(aid)) for aid, score in scores.items()])
+
+def close_open(app_id, status="terminated"):
+    """Ends whatever attempt the candidate has in progress (e.g. malpractice termination)."""
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "UPDATE exam_attempts SET Status = ?, Finished_At = ? WHERE App_ID = ? AND Status = 'in_progress'",
+            (status, time.time(), int(app_id)),
+        )
@@ -0,0 +1,248 @@
+# bulk_ingest.py
+# Bulk resume ingestion for campus drives: a folder or ZIP of resumes -> scored applications.
+#
+#   python bulk_ingest.py <Job_ID> <folder-or-zip> [--workers 4] [--concurrency 4] [--notify [--send]]
+#
+# Files are streamed one at a time (ZIP members are never unpacked to a temp dir),
+# text extraction runs in a process pool, duplicates are skipped by content hash,
+# scoring runs under a concurrency limit and rows are written in batches.
+# Progress is recorded per file, so re-running after a crash picks up where it stopped.
+# --notify only queues result emails for the app's mail dispatcher; add --send to deliver
+# them from this process, which then waits for the due ones to go out before exiting.
+import os
+import re
+import sys
+import time
+import zipfile
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import storage
+import extraction
+import resume_store
+import screening
+import mailer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESUMES_DIR = os.path.join(BASE_DIR, "resumes") # same folder the app saves uploads to
+RESUME_EXTS = (".pdf", ".docx")
+FLUSH_EVERY = 50
+PROGRESS_EVERY = 2.0  # seconds
+
+INGEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_log (
+    Job_ID TEXT NOT NULL,
+    Hash TEXT NOT NULL,
+    Source_Name TEXT,
+    App_ID INTEGER,
+    Ingested_At REAL NOT NULL,
+    PRIMARY KEY (Job_ID, Hash)
+);
+"""
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+def _conn():
+    conn = storage.get_conn()
+    storage.ensure_schema("ingest_log", INGEST_SCHEMA, conn)
+    return conn
+
+# ---------------- Sources ----------------
+def iter_source(path):
+    """Yields (name, bytes) one resume at a time from a folder or ZIP archive."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(RESUME_EXTS):
+                    yield info.filename, zf.read(info)
+    else:
+        for root, _, files in os.walk(path):
+            for fn in sorted(files):
+                if fn.lower().endswith(RESUME_EXTS):
+                    with open(os.path.join(root, fn), "rb") as f:
+                        yield os.path.relpath(os.path.join(root, fn), path), f.read()
+
+def count_source(path):
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return sum(1 for i in zf.infolist() if not i.is_dir() and i.filename.lower().endswith(RESUME_EXTS))
+    return sum(1 for _, _, files in os.walk(path) for fn in files if fn.lower().endswith(RESUME_EXTS))
+
+def guess_contact(text, source_name):
+    """Best-effort (name, email) from resume text; falls back to the file name."""
+    m = EMAIL_RE.search(text or "")
+    email = m.group(0) if m else ""
+    lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+    name = next((ln for ln in lines[:5] if "@" not in ln and len(ln) <= 60 and not any(c.isdigit() for c in ln)), "")
+    if not name:
+        name = os.path.splitext(os.path.basename(source_name))[0].replace("_", " ")
+    return name, email
+
+# ---------------- Ingestion ----------------
+class Ingestor:
+    def __init__(self, job, workers, concurrency, notify):
+        os.makedirs(RESUMES_DIR, exist_ok=True)
+        self.job = job
+        self.workers = workers
+        self.concurrency = concurrency
+        self.notify = notify
+        self.seen = {r["Hash"] for r in _conn().execute("SELECT Hash FROM ingest_log WHERE Job_ID = ?", (job["Job_ID"],))}
+        self.buffer = []
+        self.cached = {}
+        self.stats = {"files": 0, "written": 0, "duplicates": 0, "errors": 0}
+        self.started = time.time()
+        self.last_report = 0.0
+
+    def _save_resume(self, name, data, resume_hash):
+        base = os.path.basename(name)
+        r_path = os.path.join(RESUMES_DIR, f"{self.job['Company']}_bulk_{resume_hash[:12]}_{base}")
+        if not os.path.exists(r_path):
+            with open(r_path, "wb") as f: f.write(data)
+        return r_path
+
+    def _pending_files(self, source):
+        """Streams unseen files to the extraction pool; stored text is reused without parsing."""
+        for name, data in iter_source(source):
+            self.stats["files"] += 1
+            resume_hash = resume_store.file_hash(data)
+            if resume_hash in self.seen:
+                self.stats["duplicates"] += 1
+                continue
+            self.seen.add(resume_hash)
+            r_path = self._save_resume(name, data, resume_hash)
+            text = resume_store.get_text_by_hash(resume_hash)
+            if text is not None:
+                self.cached[resume_hash] = (name, r_path, text)
+                continue
+            yield (resume_hash, name, r_path), data, name
+
+    def _score(self, resume_hash, name, r_path, text):
+        fields = screening.assess_resume(text, self.job)
+        cand_name, email = guess_contact(text, name)
+        row = dict(fields, **{
+            "Company": self.job["Company"], "Role": self.job["Role"], "Job_ID": self.job["Job_ID"],
+            "Name": cand_name, "Email": email, "TestStatus": "Pending",
+            "Resume_Path": r_path, "Resume_Hash": resume_hash, "Timestamp": datetime.datetime.now(),
+        })
+        return resume_hash, name, row
+
+    def _flush(self):
+        if not self.buffer: return
+        conn = _conn()
+        now = time.time()
+        inserted = []
+        with conn:
+            # App rows and their ingest_log entries commit together -> crash-safe resume
+            for resume_hash, name, row in self.buffer:
+                app_id = storage.insert_app(row, conn=conn)
+                inserted.append((app_id, row))
+                conn.execute(
+                    "INSERT OR IGNORE INTO ingest_log (Job_ID, Hash, Source_Name, App_ID, Ingested_At) VALUES (?, ?, ?, ?, ?)",
+                    (self.job["Job_ID"], resume_hash, name, app_id, now),
+                )
+        self.stats["written"] += len(self.buffer)
+        if self.notify:
+            self._notify(inserted)
+        self.buffer = []
+
+    def _notify(self, inserted):
+        """Queues result emails on the outbox (sent in the background by the mail dispatcher)."""
+        for app_id, row in inserted:
+            if not row["Email"] or row["Status"] == "Provisional": continue
+            email_type = "success" if row["Status"] == "Shortlisted" else "rejection"
+            screening.send_email(row["Email"], row["Score"], self.job["Company"], self.job["Role"], email_type,
+                                token=row["TestPassword"], app_id=app_id)
+
+    def _report(self, total, force=False):
+        now = time.time()
+        if not force and now - self.last_report < PROGRESS_EVERY: return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-6)
+        s = self.stats
+        print(f"📦 {s['files']}/{total} files · {s['written']} written · {s['duplicates']} duplicates · "
+              f"{s['errors']} errors · {s['files'] / elapsed:.1f} files/s")
+
+    def _collect(self, futures, block_until):
+        """Moves finished scoring futures into the write buffer until at most block_until remain."""
+        while len(futures) > block_until:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    self.buffer.append(fut.result())
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"❌ Scoring failed: {e}")
+            if len(self.buffer) >= FLUSH_EVERY: self._flush()
+        return futures
+
+    def run(self, source):
+        total = count_source(source)
+        print(f"🚀 Ingesting {total} file(s) into {self.job['Job_ID']} ({len(self.seen)} already done)")
+        scoring = ThreadPoolExecutor(max_workers=self.concurrency)
+        # spawn, not fork: the parent already has gRPC / scoring threads running
+        extractors = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        futures = set()
+        try:
+            # Whole documents are extracted and stored; scoring takes its own prefix
+            for (resume_hash, name, r_path), text, error in extraction.extract_many(
+                self._pending_files(source), pool=extractors, max_inflight=self.workers * 2
+            ):
+                if error:
+                    print(f"⚠️ {name}: {error}")
+                    text = ""
+                resume_store.put_text(resume_hash, text)
+                futures.add(scoring.submit(self._score, resume_hash, name, r_path, text))
+                # Files whose text was already stored skip extraction entirely
+                while self.cached:
+                    h, (n, p, t) = self.cached.popitem()
+                    futures.add(scoring.submit(self._score, h, n, p, t))
+                futures = self._collect(futures, self.concurrency * 2)
+                self._report(total)
+            for h, (n, p, t) in self.cached.items():
+                futures.add(scoring.submit(self._score, h, n, p, t))
+            self._collect(futures, 0)
+        finally:
+            self._flush()
+            scoring.shutdown(wait=True)
+            extractors.shutdown(cancel_futures=True)
+        self._report(total, force=True)
+        print(f"✅ Done in {time.time() - self.started:.1f}s")
+        return self.stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest resumes (folder or ZIP) into a job.")
+    parser.add_argument("job_id", help="Job_ID of a published job")
+    parser.add_argument("source", help="Folder of resumes or a .zip archive")
+    parser.add_argument("--workers", type=int, default=extraction.DEFAULT_WORKERS, help="Extraction processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent scoring calls")
+    parser.add_argument("--notify", action="store_true", help="Queue result emails for the app's mail dispatcher")
+    parser.add_argument("--send", action="store_true", help="With --notify: send them now instead of waiting for the app")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"❌ Source not found: {args.source}")
+        return 1
+    job = storage.get_job(args.job_id)
+    if job is None:
+        print(f"❌ Unknown Job_ID: {args.job_id}")
+        return 1
+    sender = None
+    if args.notify and args.send:
+        settings = screening.mail_settings()
+        if settings is None:
+            print("❌ Email secrets not found: cannot --send")
+            return 1
+        sender = mailer.Mailer(settings[0], settings[1])
+        sender.start()
+    try:
+        Ingestor(job, args.workers, args.concurrency, args.notify).run(args.source)
+    finally:
+        if sender is not None:
+            print("📨 Sending queued emails before exiting...")
+            sender.stop()
+            print(f"📨 Outbox: {mailer.outbox_stats()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# common_pool.py
+# The General (common) question pool as a versioned, content-addressed artifact.
+# questions/common_pool_<sha>.json files are immutable once written and
+# questions/common_pool.manifest.json names the current one. Job banks store the
+# version they were built against instead of a copy of the pool.
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+# ---------------- Config ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+POOL_DIR = os.path.join(BASE_DIR, "questions")
+MANIFEST = os.path.join(POOL_DIR, "common_pool.manifest.json")
+LOCK_FILE = os.path.join(POOL_DIR, "common_pool.lock")
+LEGACY_FILE = os.path.join(POOL_DIR, "common_pool_v1.json")
+LOCK_STALE_AFTER = 600  # seconds; a lock older than this belongs to a crashed generator
+WAIT_TIMEOUT = 300      # how long a second admin waits for someone else's generation
+
+def _atomic_write(path, data):
+    """Write-to-temp then os.replace: readers see the old file or the new one, never half of one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def pool_path(version):
+    return os.path.join(POOL_DIR, f"common_pool_{version}.json")
+
+def _with_ids(questions):
+    """Pool questions are General, numbered G1.. in pool order."""
+    out = []
+    for i, q in enumerate(questions):
+        q = dict(q, type="General")
+        q["id"] = f"G{i + 1}"
+        out.append(q)
+    return out
+
+def publish(questions):
+    """Stores a pool version (idempotent for identical content) and makes it current. Returns the version."""
+    questions = _with_ids(questions)
+    data = json.dumps(questions, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    version = hashlib.sha256(data).hexdigest()[:16]
+    if not os.path.exists(pool_path(version)):
+        _atomic_write(pool_path(version), data)
+    manifest = {"version": version, "count": len(questions), "published_at": time.time()}
+    _atomic_write(MANIFEST, json.dumps(manifest).encode("utf-8"))
+    with _cache_lock:
+        _pools[version] = questions
+    print(f"✅ Common pool {version} published ({len(questions)} questions)")
+    return version
+
+# ---------------- Readers (shared in-memory cache) ----------------
+_pools = {}                                  # version -> questions (versions never change)
+_manifest = {"stamp": None, "version": None} # re-read only when the manifest file changes
+_cache_lock = threading.Lock()
+
+def current_version():
+    """Version named by the manifest, or None. A legacy common_pool_v1.json is imported once."""
+    try:
+        st = os.stat(MANIFEST)
+    except FileNotFoundError:
+        if os.path.exists(LEGACY_FILE):
+            with open(LEGACY_FILE, "r") as f:
+                legacy = json.load(f)
+            if isinstance(legacy, list) and legacy:
+                return publish(legacy)
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if _manifest["stamp"] == stamp:
+            return _manifest["version"]
+    with open(MANIFEST, "r") as f:
+        version = json.load(f)["version"]
+    with _cache_lock:
+        _manifest.update(stamp=stamp, version=version)
+    return version
+
+def load(version):
+    """Questions of one pool version, parsed once per process and shared by every session."""
+    with _cache_lock:
+        hit = _pools.get(version)
+    if hit is not None: return hit
+    with open(pool_path(version), "r") as f:
+        questions = json.load(f)
+    with _cache_lock:
+        return _pools.setdefault(version, questions)
+
+def current():
+    """(version, questions) for the current pool, or (None, [])."""
+    version = current_version()
+    return (version, load(version)) if version else (None, [])
+
+# ---------------- Generation Lock ----------------
+class GenerationLock:
+    """Cross-process lock file (O_CREAT | O_EXCL) so only one admin generates the pool."""
+
+    def __init__(self, path=LOCK_FILE):
+        self.path = path
+        self.held = False
+
+    def acquire(self):
+        """Non-blocking. Returns True if this caller now owns the lock."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE_AFTER:
+                        os.remove(self.path) # crashed generator; take over
+                        continue
+                except FileNotFoundError:
+                    continue
+                return False
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{os.getpid()} {time.time()}")
+            self.held = True
+            return True
+        return False
+
+    def release(self):
+        if self.held:
+            self.held = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+def wait_for_pool(timeout=WAIT_TIMEOUT, poll=1.0):
+    """Waits for another process's generation to publish. Returns (version, questions) or (None, [])."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        version = current_version()
+        if version: return version, load(version)
+        if not os.path.exists(LOCK_FILE): break # generator gave up without publishing
+        time.sleep(poll)
+    return current()
@@ -0,0 +1,117 @@
+# credential_index.py
+# In-memory (email, test password) -> application lookup for the test portal login.
+# Built once per process from the credential columns only (never the full applications
+# table) and refreshed per row whenever storage writes a token, status or email.
+import time
+import datetime
+import threading
+import storage
+
+# ---------------- Config ----------------
+TOKEN_TTL = 30 * 3600   # test passwords are valid for 30 hours
+WATCHED_FIELDS = {"Email", "TestPassword", "TokenTime", "Status"}
+
+def _key(email, token):
+    return str(email or "").strip().lower(), str(token or "").strip()
+
+def _expiry(token_time):
+    """Epoch seconds at which a token issued at token_time expires (None if unparseable)."""
+    try:
+        if isinstance(token_time, (int, float)):
+            raise ValueError("not a timestamp")
+        return datetime.datetime.fromisoformat(str(token_time).strip()).timestamp() + TOKEN_TTL
+    except (TypeError, ValueError):
+        return None
+
+class CredentialIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}   # (email_lower, token) -> (App_ID, Status, expires_at)
+        self.by_app = {}    # App_ID -> key, so a re-issued token replaces the old one
+        self.built = False
+
+    def _put(self, row):
+        app_id = int(row["App_ID"])
+        old = self.by_app.pop(app_id, None)
+        if old is not None: self.entries.pop(old, None)
+        key = _key(row["Email"], row["TestPassword"])
+        if not key[0] or not key[1]: return
+        self.entries[key] = (app_id, row["Status"], _expiry(row["TokenTime"]))
+        self.by_app[app_id] = key
+
+    def build(self):
+        rows = storage.get_conn().execute(
+            "SELECT App_ID, Email, TestPassword, TokenTime, Status FROM applications "
+            "WHERE TestPassword IS NOT NULL AND TestPassword != '' ORDER BY App_ID"
+        ).fetchall()
+        with self.lock:
+            self.entries, self.by_app = {}, {}
+            for row in rows:
+                self._put(row)
+            self.built = True
+        print(f"✅ Credential index built ({len(self.entries)} active tokens)")
+
+    def refresh(self, app_id):
+        """Re-reads one application's credential columns (primary-key lookup)."""
+        row = storage.get_conn().execute(
+            "SELECT App_ID, Email, TestPassword, TokenTime, Status FROM applications WHERE App_ID = ?", (int(app_id),)
+        ).fetchone()
+        with self.lock:
+            if row is None:
+                old = self.by_app.pop(int(app_id), None)
+                if old is not None: self.entries.pop(old, None)
+            else:
+                self._put(row)
+
+    def on_app_change(self, app_id, fields):
+        """storage application listener."""
+        if self.built and WATCHED_FIELDS.intersection(fields):
+            self.refresh(app_id)
+
+    def lookup(self, email, token):
+        """(App_ID, Status, expires_at) or None. Misses fall back to one indexed query, which
+        picks up tokens issued by other processes (e.g. bulk_ingest)."""
+        if not self.built: self.build()
+        key = _key(email, token)
+        with self.lock:
+            hit = self.entries.get(key)
+        if hit is not None or not key[0] or not key[1]:
+            return hit
+        row = storage.get_conn().execute(
+            "SELECT App_ID, Email, TestPassword, TokenTime, Status FROM applications "
+            "WHERE LOWER(TRIM(Email)) = ? AND TRIM(TestPassword) = ? ORDER BY App_ID DESC LIMIT 1",
+            key, # case-insensitive, like the index keys
+        ).fetchone()
+        if row is None: return None
+        with self.lock:
+            self._put(row)
+            return self.entries.get(key)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """Process-wide index singleton, kept current through storage's application listener."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CredentialIndex()
+            storage.add_app_listener(_index.on_app_change)
+        return _index
+
+def verify(email, token, now=None):
+    """Checks a test-portal login. Returns (True, App_ID) or (False, reason)."""
+    hit = get_index().lookup(email, token)
+    if hit is None:
+        known = storage.get_conn().execute(
+            "SELECT 1 FROM applications WHERE LOWER(TRIM(Email)) = ? LIMIT 1", (str(email or "").strip().lower(),)
+        ).fetchone()
+        return False, ("Invalid Password or Application not found." if known else "Email not found.")
+    app_id, status, expires_at = hit
+    if status != "Shortlisted":
+        return False, "Access Denied: You have not been shortlisted yet."
+    if expires_at is None:
+        return False, "Invalid Token Data."
+    if (now or time.time()) > expires_at:
+        return False, "Link Expired (Valid for 30hrs only)."
+    return True, app_id
@@ -0,0 +1,156 @@
+# email_templates.py
+# Candidate email templates, compiled once at import and rendered from a small context dict.
+#
+#   python email_templates.py --bench 10000   # dry-run bulk render, nothing is sent
+#
+# The parts of a message that are identical for every candidate of a job (subject,
+# company / role / link) are substituted once per job and cached; per-candidate
+# rendering only fills in the score and the test password.
+import sys
+import html
+import time
+import argparse
+from string import Template
+from functools import lru_cache
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+DEFAULT_BASE_URL = "http://localhost:8501"
+JOB_FIELDS = ("company", "role", "base_url")
+CANDIDATE_FIELDS = ("score", "token")
+
+LAYOUT = """
+    <html>
+        <body style="font-family: Arial, sans-serif; color: #333;">
+            <div style="background-color: #f4f4f4; padding: 20px;">
+                <div style="background-color: white; padding: 30px; border-radius: 10px; max-width: 600px; margin: auto; border-top: 5px solid $heading_color;">
+                    <h2 style="color: $heading_color;">$heading</h2>
+                    <p>Dear Candidate,</p>
+                    $body
+                    <br>
+                    <p>Best Regards,<br><strong>Auto Hire Pro Team</strong></p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+TEMPLATES = {
+    "success": {
+        "subject": "Congratulations! You've been shortlisted for $role at $company",
+        "heading": "Great News! 🎉",
+        "heading_color": "#FF9F1C",
+        "body": """
+        <p>We are thrilled to inform you that your profile has been <strong>shortlisted</strong> for the <strong>$role</strong> position at <strong>$company</strong>!</p>
+        <p>Your Resume Score: <span style="font-size: 18px; font-weight: bold; color: #2ecc71;">$score/100</span></p>
+        <hr>
+        <p>You have been invited to take the <strong>Proctored Aptitude Test</strong>.</p>
+        <div style="background: #fdf2f8; padding: 15px; border-left: 4px solid #db2777; margin: 20px 0;">
+            <p style="margin:0; font-weight:bold; color:#be185d;">Your Access Credentials:</p>
+            <p style="margin:5px 0 0 0;">Test Password: <span style="font-size: 1.25em; background: #fff; padding: 2px 8px; border: 1px solid #ddd; border-radius: 4px;">$token</span></p>
+            <p style="margin:5px 0 0 0; font-size: 0.85em; color: #666;">⚠️ Valid for 30 Hours only.</p>
+        </div>
+        <p>Please click the link below to proceed:</p>
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="$base_url/?mode=test" style="background-color: #FF9F1C; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; font-weight: bold; display: inline-block;">Start Aptitude Test</a>
+        </div>
+        """,
+    },
+    "rejection": {
+        "subject": "Update on your application for $role at $company",
+        "heading": "Application Update",
+        "heading_color": "#555",
+        "body": """
+        <p>Thank you for giving us the opportunity to review your application for the <strong>$role</strong> position at <strong>$company</strong>.</p>
+        <p>Your Resume Score: <span style="font-size: 18px; font-weight: bold; color: #e74c3c;">$score/100</span></p>
+        <hr>
+        <p><strong>Don't be discouraged!</strong> We will keep your resume in our talent pool for future openings.</p>
+        """,
+    },
+    "malpractice": {
+        "subject": "Your aptitude test for $role at $company has been terminated",
+        "heading": "Test Terminated",
+        "heading_color": "#c0392b",
+        "body": """
+        <p>Your proctored aptitude test for the <strong>$role</strong> position at <strong>$company</strong> was <strong>terminated</strong> after repeated proctoring violations.</p>
+        <p>The session has been flagged for review by the hiring team. No further attempts are allowed with this test password.</p>
+        <hr>
+        <p>If you believe this was a mistake, please reply to this email.</p>
+        """,
+    },
+}
+
+def _compile(spec):
+    # Static parts (heading, colours, body) are baked into the layout here, once
+    page = Template(LAYOUT).safe_substitute(
+        heading=spec["heading"], heading_color=spec["heading_color"], body=spec["body"]
+    )
+    return Template(spec["subject"]), Template(page)
+
+COMPILED = {kind: _compile(spec) for kind, spec in TEMPLATES.items()}
+
+def _literal(value):
+    """Escapes a value for HTML and for a second round of Template substitution."""
+    return html.escape(str(value)).replace("$", "$$")
+
+@lru_cache(maxsize=256)
+def job_part(kind, company, role, base_url=DEFAULT_BASE_URL):
+    """(subject, Template) with the job-level fields already filled in. Cached per job."""
+    if kind not in COMPILED:
+        kind = "rejection" # unknown kinds fall back to the neutral update
+    subject_t, page_t = COMPILED[kind]
+    subject = subject_t.safe_substitute(company=company, role=role)
+    page = page_t.safe_substitute(
+        company=_literal(company), role=_literal(role), base_url=_literal(base_url.rstrip("/"))
+    )
+    return subject, Template(page)
+
+def render(kind, ctx):
+    """Returns (subject, html) for ctx = {company, role, base_url, score, token}."""
+    subject, page = job_part(kind, ctx.get("company", ""), ctx.get("role", ""), ctx.get("base_url") or DEFAULT_BASE_URL)
+    return subject, page.safe_substitute(
+        score=html.escape(str(ctx.get("score", ""))), token=html.escape(str(ctx.get("token") or ""))
+    )
+
+def build_message(sender, to_addr, kind, ctx):
+    """Rendered MIME message as a string, ready for the outbox."""
+    subject, html_content = render(kind, ctx)
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = to_addr
+    msg.attach(MIMEText(html_content, "html"))
+    return msg.as_string()
+
+# ---------------- Dry Run ----------------
+def dry_run(n, kind="success", jobs=5, mime=True):
+    """Renders n messages across a few jobs without sending anything. Returns messages/second."""
+    job_part.cache_clear()
+    started = time.perf_counter()
+    for i in range(n):
+        ctx = {"company": f"Company {i % jobs}", "role": "Software Engineer", "base_url": DEFAULT_BASE_URL,
+               "score": i % 101, "token": f"{i:06d}"}
+        if mime:
+            build_message("noreply@example.com", f"candidate{i}@example.com", kind, ctx)
+        else:
+            render(kind, ctx)
+    return n / max(time.perf_counter() - started, 1e-9)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dry-run bulk render of candidate emails (nothing is sent).")
+    parser.add_argument("--bench", type=int, default=10000, help="Messages to render")
+    parser.add_argument("--kind", default="success", choices=sorted(TEMPLATES))
+    parser.add_argument("--jobs", type=int, default=5, help="Distinct jobs the messages are spread over")
+    args = parser.parse_args(argv)
+
+    render_rate = dry_run(args.bench, args.kind, args.jobs, mime=False)
+    mime_rate = dry_run(args.bench, args.kind, args.jobs, mime=True)
+    info = job_part.cache_info()
+    print(f"📨 {args.bench} x '{args.kind}' over {args.jobs} job(s)")
+    print(f"   render only : {render_rate:,.0f} msgs/s")
+    print(f"   render + MIME: {mime_rate:,.0f} msgs/s")
+    print(f"   job cache    : {info.hits} hits / {info.misses} misses")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
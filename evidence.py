@@ -0,0 +1,192 @@
+# evidence.py
+# Evidence snapshots for proctoring violations. Each session keeps a small ring buffer
+# of recent downscaled frames (bounded by frame count and bytes); when a violation
+# starts, the frames around it are handed to one background encoder thread that writes
+# JPEGs, so the video callback never waits on encoding or disk.
+import os
+import time
+import queue
+import threading
+from collections import deque
+import cv2
+
+# ---------------- Config ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EVIDENCE_DIR = os.path.join(BASE_DIR, "evidence")
+FRAME_WIDTH = 320               # frames are stored downscaled to this width
+CAPTURE_EVERY = 3               # keep every 3rd frame (~5 per second at 15 fps)
+RING_FRAMES = 15                # ~3 seconds of history
+RING_MAX_BYTES = 4 * 1024 ** 2  # memory ceiling per session, whatever the camera resolution
+FRAMES_BEFORE = 5
+FRAMES_AFTER = 5
+MAX_EVENTS_PER_SESSION = 20     # later violations are still logged, just without images
+MAX_BYTES_PER_SESSION = 8 * 1024 ** 2
+ENCODE_QUEUE = 64               # pending events across all sessions; more are dropped, never waited on
+JPEG_QUALITY = 70
+
+class FrameRing:
+    """Recent frames, evicting the oldest beyond max_frames or max_bytes."""
+
+    def __init__(self, max_frames=RING_FRAMES, max_bytes=RING_MAX_BYTES):
+        self.frames = deque()
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+    def append(self, ts, img):
+        self.frames.append((ts, img))
+        self.nbytes += img.nbytes
+        while self.frames and (len(self.frames) > self.max_frames or self.nbytes > self.max_bytes):
+            self.nbytes -= self.frames.popleft()[1].nbytes
+
+    def last(self, n):
+        return list(self.frames)[-n:]
+
+class _Capture:
+    __slots__ = ("seq", "kind", "ts", "frames", "remaining")
+
+    def __init__(self, seq, kind, ts, frames, remaining):
+        self.seq = seq
+        self.kind = kind
+        self.ts = ts
+        self.frames = frames
+        self.remaining = remaining
+
+class EvidenceRecorder:
+    """Per-session recorder. push() is called from the video thread, trigger() from
+    wherever the verdict lands (the same thread inline, the collector in service mode)."""
+
+    def __init__(self, session_id, encoder=None):
+        self.session_id = session_id
+        self.encoder = encoder or get_encoder()
+        self.ring = FrameRing()
+        self.pending = []
+        self.events = 0
+        self.since_capture = CAPTURE_EVERY
+        self.lock = threading.Lock()
+
+    def push(self, img, ts=None):
+        self.since_capture += 1
+        if self.since_capture < CAPTURE_EVERY:
+            return
+        self.since_capture = 0
+        h, w = img.shape[:2]
+        if w > FRAME_WIDTH:
+            img = cv2.resize(img, (FRAME_WIDTH, max(1, int(h * FRAME_WIDTH / w))), interpolation=cv2.INTER_AREA)
+        else:
+            img = img.copy() # the caller draws the overlay on its frame afterwards
+        ts = ts or time.time()
+        with self.lock:
+            self.ring.append(ts, img)
+            done = []
+            for cap in self.pending:
+                cap.frames.append((ts, img))
+                cap.remaining -= 1
+                if cap.remaining <= 0: done.append(cap)
+            for cap in done:
+                self.pending.remove(cap)
+        for cap in done:
+            self.encoder.submit(self.session_id, cap)
+
+    def trigger(self, kind, ts=None):
+        """Starts capturing an event: FRAMES_BEFORE from the ring plus the next FRAMES_AFTER."""
+        with self.lock:
+            if self.events >= MAX_EVENTS_PER_SESSION:
+                self.encoder.count("capped")
+                return False
+            self.events += 1
+            self.pending.append(_Capture(self.events, kind, ts or time.time(), self.ring.last(FRAMES_BEFORE), FRAMES_AFTER))
+        return True
+
+    def close(self):
+        """Session over: whatever has been captured so far is still written."""
+        with self.lock:
+            pending, self.pending = self.pending, []
+            self.ring = FrameRing()
+        for cap in pending:
+            if cap.frames: self.encoder.submit(self.session_id, cap)
+
+    def memory_bytes(self):
+        with self.lock:
+            return self.ring.nbytes + sum(f.nbytes for cap in self.pending for _, f in cap.frames)
+
+class EvidenceEncoder:
+    """One background thread encoding and writing JPEGs for every session."""
+
+    def __init__(self, root=EVIDENCE_DIR, quality=JPEG_QUALITY):
+        self.root = root
+        self.params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        self.queue = queue.Queue(maxsize=ENCODE_QUEUE)
+        self.session_bytes = {}
+        self.lock = threading.Lock()
+        self.stats = {"events": 0, "files": 0, "bytes_written": 0, "encode_ms": 0.0,
+                      "dropped": 0, "capped": 0, "errors": 0}
+        self.thread = threading.Thread(target=self._loop, name="evidence-encoder", daemon=True)
+        self.thread.start()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.stats[name] += n
+
+    def submit(self, session_id, capture):
+        try:
+            self.queue.put_nowait((session_id, capture))
+        except queue.Full:
+            self.count("dropped")
+
+    def session_dir(self, session_id):
+        return os.path.join(self.root, session_id)
+
+    def _loop(self):
+        while True:
+            session_id, cap = self.queue.get()
+            try:
+                self._write(session_id, cap)
+            except Exception as e:
+                self.count("errors")
+                print(f"⚠️ Evidence write failed ({session_id}): {e}")
+
+    def _write(self, session_id, cap):
+        out_dir = self.session_dir(session_id)
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(cap.ts))
+        started = time.perf_counter()
+        for i, (_, img) in enumerate(cap.frames):
+            with self.lock:
+                if self.session_bytes.get(session_id, 0) >= MAX_BYTES_PER_SESSION:
+                    self.stats["capped"] += 1
+                    return
+            ok, buf = cv2.imencode(".jpg", img, self.params)
+            if not ok: continue
+            with open(os.path.join(out_dir, f"{cap.seq:03d}_{stamp}_{cap.kind}_{i:02d}.jpg"), "wb") as f:
+                f.write(buf.tobytes())
+            with self.lock:
+                self.session_bytes[session_id] = self.session_bytes.get(session_id, 0) + buf.nbytes
+                self.stats["files"] += 1
+                self.stats["bytes_written"] += buf.nbytes
+        with self.lock:
+            self.stats["events"] += 1
+            self.stats["encode_ms"] += (time.perf_counter() - started) * 1000
+
+    def metrics(self):
+        with self.lock:
+            return dict(self.stats, queued=self.queue.qsize(), sessions=len(self.session_bytes))
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def get_encoder():
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = EvidenceEncoder()
+        return _encoder
+
+def metrics():
+    return get_encoder().metrics()
+
+def list_files(session_id):
+    """Evidence JPEGs of one session, oldest event first."""
+    d = get_encoder().session_dir(session_id)
+    if not os.path.isdir(d): return []
+    return [os.path.join(d, name) for name in sorted(os.listdir(d)) if name.endswith(".jpg")]
@@ -1,6 +1,7 @@
 import json
 import os
 from docx import Document
+import common_pool
 
 # Config
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,7 +12,9 @@ def export_all_questions():
         print("❌ No 'questions' directory found.")
         return
 
-    files = [f for f in os.listdir(QUESTIONS_DIR) if f.endswith(".json")]
+    # Job banks only: the shared common pool versions and their manifest are not banks
+    files = [f for f in os.listdir(QUESTIONS_DIR)
+             if f.endswith(".json") and not f.startswith("common_pool")]
     
     if not files:
         print("ℹ️ No question files found to export.")
@@ -25,7 +28,15 @@ def export_all_questions():
             json_path = os.path.join(QUESTIONS_DIR, filename)
             
             with open(json_path, "r") as f:
-                questions = json.load(f)
+                bank = json.load(f)
+            
+            # {"questions": [...], "common_pool": version}; older banks are a bare list
+            if isinstance(bank, dict):
+                questions = list(bank.get("questions") or [])
+                if bank.get("common_pool"):
+                    questions += common_pool.load(bank["common_pool"])
+            else:
+                questions = bank
             
             if not questions or not isinstance(questions, list):
                 print(f"⚠️ Skipping {filename}: Invalid or empty JSON.")
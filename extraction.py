@@ -0,0 +1,103 @@
+# extraction.py
+# Bounded resume text extraction: pages are read lazily and parsing stops as soon
+# as enough text has been collected, or a page / time / size budget runs out.
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from pypdf import PdfReader
+from docx import Document
+
+# ---------------- Config ----------------
+MAX_PAGES = 10                    # resumes longer than this are portfolios; the rest is ignored
+TIME_BUDGET = 5.0                 # seconds of parsing per document
+MAX_FILE_BYTES = 25 * 1024 * 1024 # refuse anything bigger outright
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+def _file_size(file):
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    if isinstance(file, (bytes, bytearray)):
+        return len(file)
+    pos = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(pos)
+    return size
+
+def _as_readable(file):
+    return io.BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+
+def iter_pdf_pages(file, max_pages=MAX_PAGES, time_budget=TIME_BUDGET):
+    """Yields the text of each page lazily, within the page and time budgets."""
+    reader = PdfReader(_as_readable(file))
+    started = time.monotonic()
+    for i, page in enumerate(reader.pages):
+        if max_pages and i >= max_pages:
+            break
+        if time_budget and time.monotonic() - started > time_budget:
+            print(f"⚠️ PDF time budget hit after {i} page(s)")
+            break
+        try:
+            extracted = page.extract_text()
+        except Exception as e:
+            print(f"⚠️ Error parsing PDF page: {e}")
+            continue
+        if extracted:
+            yield extracted
+
+def extract_pdf_text(file, max_chars=None, max_pages=MAX_PAGES, time_budget=TIME_BUDGET):
+    """Reads pages until max_chars is reached (None = whole document, within the budgets)."""
+    if _file_size(file) > MAX_FILE_BYTES:
+        raise ValueError(f"File larger than {MAX_FILE_BYTES // (1024 * 1024)} MB")
+    parts, total = [], 0
+    for text in iter_pdf_pages(file, max_pages, time_budget):
+        parts.append(text)
+        total += len(text)
+        if max_chars and total >= max_chars:
+            break
+    return "".join(parts)
+
+def extract_docx_text(file, max_chars=None):
+    if _file_size(file) > MAX_FILE_BYTES:
+        raise ValueError(f"File larger than {MAX_FILE_BYTES // (1024 * 1024)} MB")
+    parts, total = [], 0
+    for para in Document(_as_readable(file)).paragraphs:
+        parts.append(para.text)
+        total += len(para.text) + 1
+        if max_chars and total >= max_chars:
+            break
+    return "\n".join(parts)
+
+def extract_text(file, name, max_chars=None):
+    """Dispatches on the file name's extension (.pdf or .docx)."""
+    if name.lower().endswith(".pdf"):
+        return extract_pdf_text(file, max_chars)
+    return extract_docx_text(file, max_chars)
+
+# ---------------- Bulk (process pool) ----------------
+def _extract_job(args):
+    key, data, name, max_chars = args
+    try:
+        return key, extract_text(data, name, max_chars), None
+    except Exception as e:
+        return key, "", str(e)
+
+def extract_many(items, max_chars=None, workers=DEFAULT_WORKERS, pool=None, max_inflight=None):
+    """Extracts (key, bytes_or_path, name) items across a process pool.
+    Items are pulled lazily (at most max_inflight in memory) and
+    (key, text, error) tuples are yielded in completion order."""
+    own_pool = pool is None
+    pool = pool or ProcessPoolExecutor(max_workers=workers)
+    max_inflight = max_inflight or workers * 2
+    inflight = set()
+    try:
+        for key, data, name in items:
+            inflight.add(pool.submit(_extract_job, (key, data, name, max_chars)))
+            if len(inflight) >= max_inflight:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done: yield fut.result()
+        for fut in as_completed(inflight):
+            yield fut.result()
+    finally:
+        if own_pool: pool.shutdown(cancel_futures=True)
@@ -0,0 +1,196 @@
+# grading.py
+# Exam grading on option indices. Every question becomes one row of a credit matrix
+# (credit per option, plus a last column for "not answered"), so a whole cohort is
+# graded with one NumPy gather + sum, under any marking scheme.
+#
+#   python grading.py regrade JOB_ID [--scheme negative] [--dry-run]
+#
+# Regrading re-reads the answer key from the job's current bank and the current common
+# pool (so a corrected key applies to everyone) and updates TestScore for every attempt
+# at once, each under the scheme it was graded with unless --scheme overrides it.
+# A question whose key matches none of its options is void: it scores 0 for everyone.
+# Under a partial scheme a question may carry "credit": one mark per option, in option
+# order (e.g. [1, 0.5, 0, 0]); questions without it score like the standard key.
+import os
+import sys
+import argparse
+from collections import namedtuple
+import numpy as np
+
+# ---------------- Config ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_DIR = os.path.join(BASE_DIR, "questions")
+
+# correct / wrong / blank credit; partial schemes read per-option credit from the question
+Scheme = namedtuple("Scheme", ["correct", "wrong", "blank", "partial"], defaults=(False,))
+SCHEMES = {
+    "standard": Scheme(1.0, 0.0, 0.0),         # one mark per correct answer (the original marking)
+    "negative": Scheme(1.0, -0.25, 0.0),       # a wrong answer costs a quarter mark, blanks are free
+    "partial": Scheme(1.0, 0.0, 0.0, True),    # the question's "credit" list, else standard marking
+}
+DEFAULT_SCHEME = "standard"
+BLANK = -1
+
+def correct_index(question):
+    """Index of the correct option, or BLANK if the key matches none. Resolved once per
+    question: exact text first, then the old lenient containment match (both sides > 5 chars)."""
+    options = [str(o).strip() for o in question.get("options") or []]
+    answer = str(question.get("answer")).strip()
+    if answer in options:
+        return options.index(answer)
+    if len(answer) > 5:
+        for i, o in enumerate(options):
+            if len(o) > 5 and (answer in o or o in answer):
+                return i
+    return BLANK
+
+def choice_index(question, text):
+    """Option index of an answer stored as text (attempts saved before indices were kept)."""
+    if text is None: return BLANK
+    options = [str(o).strip() for o in question.get("options") or []]
+    text = str(text).strip()
+    return options.index(text) if text in options else BLANK
+
+def option_credit(question):
+    """The question's per-option "credit" as floats, or None if it is missing or does not
+    give exactly one number per option."""
+    credit = question.get("credit")
+    if not isinstance(credit, (list, tuple)) or len(credit) != len(question.get("options") or []):
+        return None
+    try:
+        return [float(c) for c in credit]
+    except (TypeError, ValueError):
+        return None
+
+def credit_matrix(questions, scheme=DEFAULT_SCHEME):
+    """(len(questions), max_options + 1) credits; column -1 is the blank answer.
+    Void questions (no option matches the key) are 0 in every column, so nobody
+    gains or loses marks on them under any scheme. Partial schemes take a question's
+    own credit list where it has a valid one."""
+    scheme = SCHEMES[scheme] if isinstance(scheme, str) else scheme
+    width = max([len(q.get("options") or []) for q in questions] + [1])
+    credit = np.full((len(questions), width + 1), scheme.wrong, dtype=np.float64)
+    credit[:, -1] = scheme.blank
+    for i, q in enumerate(questions):
+        k = correct_index(q)
+        if k == BLANK:
+            credit[i, :] = 0.0
+            continue
+        credit[i, k] = scheme.correct
+        given = option_credit(q) if scheme.partial else None
+        if given is not None:
+            credit[i, :len(given)] = given
+    return credit
+
+def grade(question_idx, choices, credit):
+    """Scores for a cohort. question_idx and choices are (candidates, slots) int arrays:
+    row i lists the questions candidate i got (-1 pads shorter exams) and their chosen
+    option (BLANK if unanswered). Returns a float array of length candidates."""
+    question_idx = np.asarray(question_idx, dtype=np.int64)
+    choices = np.asarray(choices, dtype=np.int64)
+    cols = np.where(choices < 0, credit.shape[1] - 1, np.minimum(choices, credit.shape[1] - 2))
+    gained = credit[np.maximum(question_idx, 0), cols]
+    return np.where(question_idx >= 0, gained, 0.0).sum(axis=1)
+
+def grade_attempt(questions, answered, scheme=DEFAULT_SCHEME):
+    """One candidate: questions in exam order, answered = attempt_store.answers()."""
+    if not questions: return 0.0
+    table, question_idx, choices = cohort([(questions, answered)])
+    return float(grade(question_idx, choices, credit_matrix(table, scheme))[0])
+
+def as_score(value):
+    """Whole scores stay integers (as TestScore always was); fractional ones keep 2 decimals."""
+    value = round(float(value), 2)
+    return int(value) if value.is_integer() else value
+
+# ---------------- Cohort Regrade ----------------
+def current_key(job_id):
+    """{question id: question} from the job's bank and the current common pool. The pool
+    version pinned in the bank is not used: a corrected key is published as a new version."""
+    import question_bank
+    import common_pool
+    path = os.path.join(QUESTIONS_DIR, f"{job_id}.qbank")
+    key = {}
+    if os.path.exists(path):
+        bank = question_bank.open_bank(path)
+        for qtype in bank.tables:
+            for i in range(bank.count(qtype)):
+                q = bank.get(qtype, i)
+                key[str(q.get("id"))] = q
+    _, pool = common_pool.current()
+    key.update((str(q.get("id")), q) for q in pool)
+    return key
+
+def cohort(attempts, key=None):
+    """Builds the shared question table and the (candidates, slots) index/choice arrays.
+    attempts: [(questions, {question_id: (choice, text)})]. A question found in key with the
+    same text and options the candidate saw takes the key's answer and credit (so indices
+    still match)."""
+    from attempt_store import question_id
+    key = key or {}
+    table, rows = {}, []
+    for questions, answered in attempts:
+        idx, picked = [], []
+        for i, q in enumerate(questions):
+            qid = question_id(q, i)
+            fixed = key.get(qid)
+            if (fixed is not None and str(fixed.get("q")).strip() == str(q.get("q")).strip()
+                    and [str(o).strip() for o in fixed.get("options") or []] == [str(o).strip() for o in q.get("options") or []]):
+                q = dict(q, answer=fixed.get("answer"), credit=fixed.get("credit"))
+            sig = (qid, str(q.get("answer")), tuple(str(o) for o in q.get("options") or []),
+                   tuple(option_credit(q) or ()))
+            if sig not in table: table[sig] = (len(table), q)
+            idx.append(table[sig][0])
+            choice, text = answered.get(qid, (None, None))
+            picked.append(BLANK if choice is None and text is None else
+                          int(choice) if choice is not None else choice_index(q, text))
+        rows.append((idx, picked))
+    slots = max([len(r[0]) for r in rows] + [1])
+    question_idx = np.full((len(rows), slots), -1, dtype=np.int64)
+    choices = np.full((len(rows), slots), BLANK, dtype=np.int64)
+    for n, (idx, picked) in enumerate(rows):
+        question_idx[n, :len(idx)] = idx
+        choices[n, :len(picked)] = picked
+    questions = [q for _, q in sorted(table.values(), key=lambda e: e[0])]
+    return questions, question_idx, choices
+
+def regrade_job(job_id, scheme=None, dry_run=False):
+    """Regrades every submitted attempt of a job under scheme, or by default under the
+    scheme each attempt was graded with. Returns [(App_ID, old, new)]."""
+    import attempt_store
+    import storage
+    attempts = attempt_store.submitted_attempts(job_id)
+    if not attempts: return []
+    questions, question_idx, choices = cohort([(a["questions"], a["answers"]) for a in attempts], current_key(job_id))
+    schemes = np.array([scheme or a["scheme"] or DEFAULT_SCHEME for a in attempts])
+    scores = np.zeros(len(attempts))
+    for name in set(schemes.tolist()): # one gather per scheme in use
+        rows = schemes == name
+        scores[rows] = grade(question_idx[rows], choices[rows], credit_matrix(questions, name))
+    results = [(a["app_id"], a["score"], as_score(s)) for a, s in zip(attempts, scores)]
+    if not dry_run:
+        attempt_store.set_scores({a["attempt_id"]: new for a, (_, _, new) in zip(attempts, results)}, scheme)
+        storage.update_apps({app_id: {"TestScore": new} for app_id, _, new in results})
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exam grading tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    regrade = sub.add_parser("regrade", help="Regrade every submitted attempt of a job against its current key")
+    regrade.add_argument("job_id")
+    regrade.add_argument("--scheme", choices=sorted(SCHEMES), help="Default: the scheme each attempt was graded with")
+    regrade.add_argument("--dry-run", action="store_true", help="Show the new scores without saving them")
+    args = parser.parse_args(argv)
+    results = regrade_job(args.job_id, args.scheme, args.dry_run)
+    if not results:
+        print(f"⚠️ No submitted attempts for job {args.job_id}")
+        return 1
+    changed = [r for r in results if r[1] != r[2]]
+    for app_id, old, new in changed:
+        print(f"   App {app_id}: {old} -> {new}")
+    print(f"{'🔎 Would update' if args.dry_run else '✅ Updated'} {len(changed)} of {len(results)} attempt(s) "
+          f"for job {args.job_id} (scheme: {args.scheme or 'as graded'})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# job_search.py
+# In-memory inverted index over job listings (Role, Company, JD) with prefix
+# matching and BM25 ranking for the Job Seekers search box.
+# The index is built once per process and kept current through storage's job listener.
+import re
+import math
+import heapq
+import bisect
+import threading
+from collections import Counter
+import storage
+
+# ---------------- Config ----------------
+FIELD_WEIGHTS = {"Role": 3.0, "Company": 2.0, "JD": 1.0} # a hit in the title outranks one in the JD
+K1 = 1.2
+B = 0.75
+MIN_PREFIX = 2          # shorter query words only match whole terms
+MAX_EXPANSIONS = 64     # vocabulary terms a single prefix may expand to
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+def tokenize(text):
+    """Lowercased tokens; keeps spellings like c++, c#, node.js."""
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+class JobIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = {}      # term -> {Job_ID: weighted tf}
+        self.doc_len = {}       # Job_ID -> weighted length
+        self.doc_terms = {}     # Job_ID -> terms (for removal)
+        self.vocab = []         # sorted terms, for prefix lookups
+        self.total_len = 0.0
+        self.version = None     # storage.jobs_version() this index reflects (None = needs a rebuild)
+
+    # ---------- Maintenance ----------
+    def _add(self, job):
+        job_id = job["Job_ID"]
+        tf = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(job.get(field, "")):
+                tf[term] += weight
+        for term, w in tf.items():
+            plist = self.postings.get(term)
+            if plist is None:
+                plist = self.postings[term] = {}
+                if self.version is not None: # bulk rebuilds sort the vocabulary once at the end
+                    bisect.insort(self.vocab, term)
+            plist[job_id] = w
+        self.doc_terms[job_id] = list(tf)
+        self.doc_len[job_id] = sum(tf.values())
+        self.total_len += self.doc_len[job_id]
+
+    def _remove(self, job_id):
+        terms = self.doc_terms.pop(job_id, None)
+        if terms is None: return
+        self.total_len -= self.doc_len.pop(job_id)
+        for term in terms:
+            plist = self.postings[term]
+            plist.pop(job_id, None)
+            if not plist:
+                del self.postings[term]
+                i = bisect.bisect_left(self.vocab, term)
+                if i < len(self.vocab) and self.vocab[i] == term:
+                    del self.vocab[i]
+
+    def rebuild(self):
+        version = storage.jobs_version() # read first: a change racing the load only triggers another rebuild
+        df = storage.load_jobs_df()
+        with self.lock:
+            self.postings, self.doc_len, self.doc_terms = {}, {}, {}
+            self.total_len = 0.0
+            self.version = None
+            for job in df.to_dict("records"):
+                self._add(job)
+            self.vocab = sorted(self.postings)
+            self.version = version
+
+    def on_job_change(self, action, job_id, version):
+        """storage job listener: applies one change, or marks the index stale if it missed one."""
+        with self.lock:
+            if self.version is None: return # not built (or already stale); the next search rebuilds it
+            if int(version) != int(self.version) + 1:
+                self.version = None # another process (or a migration) changed jobs in between
+                return
+            self._remove(job_id)
+            if action != "delete":
+                job = storage.get_job(job_id)
+                if job is not None: self._add(job)
+            self.version = version
+
+    def sync(self):
+        """Rebuilds only if jobs changed without passing through this process's listener."""
+        if self.version != storage.jobs_version():
+            self.rebuild()
+
+    # ---------- Query ----------
+    def _expand(self, word):
+        """Vocabulary terms matching a query word (exact, plus prefix matches)."""
+        if len(word) < MIN_PREFIX:
+            return [word] if word in self.postings else []
+        i = bisect.bisect_left(self.vocab, word)
+        out = []
+        while i < len(self.vocab) and self.vocab[i].startswith(word) and len(out) < MAX_EXPANSIONS:
+            out.append(self.vocab[i])
+            i += 1
+        return out
+
+    def search(self, query, limit=None):
+        """Job_IDs matching every query word (by prefix), best BM25 score first."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words: return []
+        with self.lock:
+            n = len(self.doc_len)
+            if not n: return []
+            norm_a, norm_b = K1 * (1 - B), K1 * B * n / max(self.total_len, 1) # every listing may be empty
+            expanded = [[self.postings[t] for t in self._expand(w)] for w in words]
+            # Most selective word first, so later words only score surviving candidates
+            expanded.sort(key=lambda plists: sum(len(p) for p in plists))
+            scores = None
+            for plists in expanded:
+                word_scores = {}
+                for plist in plists:
+                    idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                    if scores is None:
+                        items = plist.items()
+                    else:
+                        items = ((j, plist[j]) for j in scores if j in plist)
+                    for job_id, tf in items:
+                        norm = norm_a + norm_b * self.doc_len[job_id]
+                        word_scores[job_id] = word_scores.get(job_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {j: s + word_scores[j] for j, s in scores.items() if j in word_scores}
+                if not scores: return []
+        if limit:
+            return heapq.nlargest(limit, scores, key=scores.get)
+        return sorted(scores, key=scores.get, reverse=True)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """Process-wide index singleton, registered for incremental updates on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = JobIndex()
+            storage.add_job_listener(_index.on_job_change)
+        return _index
+
+def search(query, limit=None):
+    """Ranked Job_IDs for the query."""
+    index = get_index()
+    index.sync()
+    return index.search(query, limit)
@@ -0,0 +1,264 @@
+# mailer.py
+# Outbox-based email dispatch: messages are queued in SQLite and sent in the
+# background over pooled, already-authenticated SMTP connections. Producers only
+# enqueue; the long-lived app runs the dispatcher (get_mailer), and a CLI that sends
+# itself must stop() it, which drains what is due, before exiting.
+import ssl
+import time
+import queue
+import sqlite3
+import smtplib
+import threading
+import storage
+from ratelimit import RateLimiter
+
+# ---------------- Config ----------------
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+POOL_SIZE = 2             # concurrent SMTP connections / sender threads
+BATCH_SIZE = 20           # messages claimed per batch
+RATE_PER_SEC = 1.0        # sustained send rate (Gmail throttles bursts)
+BURST = 5
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30         # seconds; doubles each retry
+IDLE_CHECK = 60           # NOOP-check connections idle for longer than this
+POLL_INTERVAL = 2.0
+CLAIM_LEASE = 900         # seconds; longer than a batch can take (BATCH_SIZE x 30 s SMTP timeout + rate limit)
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    Msg_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    App_ID INTEGER,
+    Kind TEXT,
+    To_Addr TEXT NOT NULL,
+    Raw TEXT NOT NULL,
+    State TEXT NOT NULL DEFAULT 'queued',
+    Attempts INTEGER NOT NULL DEFAULT 0,
+    Next_Attempt_At REAL NOT NULL,
+    Error TEXT,
+    Created_At REAL NOT NULL,
+    Sent_At REAL,
+    Claimed_At REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(State, Next_Attempt_At);
+CREATE INDEX IF NOT EXISTS idx_outbox_app ON outbox(App_ID);
+"""
+
+# Columns added after the table was first created: (column, type)
+_ADDED_COLUMNS = [
+    ("Claimed_At", "REAL"), # lease start of a 'sending' claim
+]
+_columns_lock = threading.Lock()
+_columns_ready = False
+
+def _conn():
+    global _columns_ready
+    conn = storage.get_conn()
+    storage.ensure_schema("outbox", OUTBOX_SCHEMA, conn)
+    if not _columns_ready:
+        with _columns_lock:
+            cols = {r["name"] for r in conn.execute("PRAGMA table_info(outbox)")}
+            for col, typ in _ADDED_COLUMNS:
+                if col not in cols:
+                    try:
+                        conn.execute(f"ALTER TABLE outbox ADD COLUMN {col} {typ}")
+                        conn.commit()
+                    except sqlite3.OperationalError:
+                        pass # added by another process meanwhile
+            _columns_ready = True
+    return conn
+
+def _set_app_status(app_id, status):
+    if app_id:
+        storage.update_app(app_id, {"Email_Status": status})
+
+# ---------------- Connection Pool ----------------
+class SMTPPool:
+    """Reusable logged-in SMTP_SSL connections (one TLS handshake + login per connection, not per email)."""
+
+    def __init__(self, sender, password, size=POOL_SIZE, host=SMTP_HOST, port=SMTP_PORT):
+        self.sender = sender
+        self.password = password
+        self.host = host
+        self.port = port
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        server = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=30)
+        server.login(self.sender, self.password)
+        return server
+
+    def acquire(self):
+        while True:
+            try:
+                server, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.time() - last_used < IDLE_CHECK:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._close(server)
+
+    def release(self, server, broken=False):
+        if broken:
+            self._close(server)
+            return
+        try:
+            self.idle.put_nowait((server, time.time()))
+        except queue.Full:
+            self._close(server)
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+# ---------------- Dispatcher ----------------
+class Mailer:
+    def __init__(self, sender, password, pool_size=POOL_SIZE, rate=RATE_PER_SEC):
+        self.sender = sender
+        self.pool = SMTPPool(sender, password, pool_size)
+        self.limiter = RateLimiter(rate, BURST)
+        self.wake_event = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._sender_loop, name=f"mail-sender-{i}", daemon=True) for i in range(pool_size)
+        ]
+
+    def start(self):
+        for t in self.threads: t.start()
+        print(f"✅ Mail dispatcher started ({len(self.threads)} connections)")
+
+    def stop(self, timeout=None):
+        """Sends every message that is due, then stops the sender threads. Messages
+        waiting out a retry backoff stay queued for the app's dispatcher."""
+        self.stopping.set()
+        self.wake()
+        for t in self.threads: t.join(timeout)
+        while True:
+            try:
+                server, _ = self.pool.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.pool._close(server)
+
+    def wake(self):
+        self.wake_event.set()
+
+    def _claim(self):
+        """Claims a batch of due messages. A 'sending' claim older than CLAIM_LEASE belongs to a
+        sender that died (crashed process, CLI that exited) and is taken over."""
+        now = time.time()
+        conn = _conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT Msg_ID, App_ID, To_Addr, Raw, Attempts FROM outbox "
+                "WHERE (State = 'queued' AND Next_Attempt_At <= ?) "
+                "OR (State = 'sending' AND COALESCE(Claimed_At, 0) < ?) ORDER BY Msg_ID LIMIT ?",
+                (now, now - CLAIM_LEASE, BATCH_SIZE),
+            ).fetchall()
+            for r in rows:
+                conn.execute("UPDATE outbox SET State = 'sending', Claimed_At = ? WHERE Msg_ID = ?", (now, r["Msg_ID"]))
+        return rows
+
+    def _sender_loop(self):
+        while True:
+            try:
+                batch = self._claim()
+                if batch:
+                    self._send_batch(batch)
+                elif self.stopping.is_set():
+                    return
+                else:
+                    self.wake_event.wait(POLL_INTERVAL)
+                    self.wake_event.clear()
+            except Exception as e:
+                print(f"⚠️ Mail dispatcher error: {e}")
+                if self.stopping.is_set(): return
+                time.sleep(POLL_INTERVAL)
+
+    def _send_batch(self, batch):
+        server = None
+        for i, msg in enumerate(batch):
+            self.limiter.acquire()
+            try:
+                if server is None:
+                    server = self.pool.acquire()
+                server.sendmail(self.sender, msg["To_Addr"], msg["Raw"])
+                self._mark_sent(msg)
+            except smtplib.SMTPRecipientsRefused as e:
+                self._mark_failed(msg, e, permanent=True)
+            except Exception as e:
+                # Connection-level problem: drop this connection and retry the message later
+                if server is not None:
+                    self.pool.release(server, broken=True)
+                    server = None
+                self._mark_failed(msg, e)
+        if server is not None:
+            self.pool.release(server)
+
+    def _mark_sent(self, msg):
+        conn = _conn()
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET State = 'sent', Attempts = Attempts + 1, Error = NULL, Sent_At = ? WHERE Msg_ID = ?",
+                (time.time(), msg["Msg_ID"]),
+            )
+        _set_app_status(msg["App_ID"], "Sent")
+        print(f"✅ Email sent to {msg['To_Addr']}")
+
+    def _mark_failed(self, msg, error, permanent=False):
+        attempts = msg["Attempts"] + 1
+        failed = permanent or attempts >= MAX_ATTEMPTS
+        conn = _conn()
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET State = ?, Attempts = ?, Error = ?, Next_Attempt_At = ? WHERE Msg_ID = ?",
+                ("failed" if failed else "queued", attempts, str(error),
+                 time.time() + BACKOFF_BASE * 2 ** (attempts - 1), msg["Msg_ID"]),
+            )
+        _set_app_status(msg["App_ID"], "Failed" if failed else "Retrying")
+        print(f"❌ Email to {msg['To_Addr']} failed (attempt {attempts}): {error}")
+
+_mailer = None
+_mailer_lock = threading.Lock()
+
+def get_mailer(sender, password, pool_size=POOL_SIZE, rate=RATE_PER_SEC):
+    """Process-wide dispatcher singleton, started by the app (not by producers)."""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = Mailer(sender, password, pool_size, rate)
+            _mailer.start()
+    return _mailer
+
+# ---------------- Producer Side ----------------
+def enqueue(to_addr, raw_message, app_id=None, kind=""):
+    """Queues a fully-built MIME message. Returns immediately with the Msg_ID."""
+    now = time.time()
+    conn = _conn()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO outbox (App_ID, Kind, To_Addr, Raw, Next_Attempt_At, Created_At) VALUES (?, ?, ?, ?, ?, ?)",
+            (app_id, kind, to_addr, raw_message, now, now),
+        )
+    _set_app_status(app_id, "Queued")
+    if _mailer is not None: _mailer.wake()
+    return cur.lastrowid
+
+def has_message(app_id, kind=None):
+    """True if a message for this application (of this kind, if given) is already on the outbox."""
+    sql = "SELECT 1 FROM outbox WHERE App_ID = ?" + (" AND Kind = ?" if kind else "") + " LIMIT 1"
+    return _conn().execute(sql, (app_id, kind) if kind else (app_id,)).fetchone() is not None
+
+def outbox_stats():
+    rows = _conn().execute("SELECT State, COUNT(*) AS n FROM outbox GROUP BY State").fetchall()
+    stats = {"queued": 0, "sending": 0, "sent": 0, "failed": 0}
+    stats.update({r["State"]: r["n"] for r in rows})
+    return stats
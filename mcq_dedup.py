@@ -0,0 +1,117 @@
+# mcq_dedup.py
+# Near-duplicate detection for generated MCQs: each question (text + options) is
+# normalized and shingled, signed with MinHash (vectorized across a whole batch in
+# NumPy) and bucketed with LSH banding, so a new question is only compared with
+# the few existing ones that share a band.
+import re
+import zlib
+import numpy as np
+
+# ---------------- Config ----------------
+NUM_PERM = 128
+BANDS = 32              # 32 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a band
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.6         # estimated Jaccard at or above which two questions are duplicates
+SHINGLE_CHARS = 4       # character n-grams survive rewordings like "What is" -> "What's"
+SEED = 7
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK32 = (1 << 32) - 1
+_rng = np.random.RandomState(SEED)
+# a < 2^31 and h < 2^32 keep a*h + b below 2^64 (no uint64 wrap before the modulo)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+def normalize(text):
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", str(text or "").lower())).strip()
+
+def shingles(question):
+    """Character n-grams of the question text plus one shingle per option (option order is ignored)."""
+    text = normalize(question.get("q"))
+    out = {text[i:i + SHINGLE_CHARS] for i in range(max(1, len(text) - SHINGLE_CHARS + 1))}
+    out.update("opt:" + normalize(o) for o in question.get("options") or [])
+    out.discard("")
+    return out or {"<empty>"}
+
+def signatures(questions):
+    """(len(questions), NUM_PERM) MinHash matrix, computed for the whole batch at once."""
+    if not questions:
+        return np.empty((0, NUM_PERM), dtype=np.uint64)
+    hashes, starts = [], []
+    for q in questions:
+        starts.append(len(hashes))
+        hashes.extend(zlib.crc32(s.encode("utf-8")) & _MASK32 for s in shingles(q))
+    h = np.asarray(hashes, dtype=np.uint64)
+    permuted = (np.outer(_A, h) + _B[:, None]) % _PRIME      # (NUM_PERM, total shingles)
+    return np.minimum.reduceat(permuted, starts, axis=1).T   # min per question segment
+
+class NearDupIndex:
+    """LSH index of accepted questions. filter() has the same contract as question_gen.Deduper."""
+
+    def __init__(self, existing=(), source="pool"):
+        self.buckets = [{} for _ in range(BANDS)]
+        self.sigs = []
+        self.sources = []
+        self.stats = {"checked": 0, "exact": 0, "near": 0, "against_pool": 0, "within_bank": 0}
+        self._exact = {}
+        existing = list(existing)
+        if existing:
+            self._add_all(existing, signatures(existing), source)
+
+    def _add(self, question, sig, source):
+        idx = len(self.sigs)
+        self.sigs.append(sig)
+        self.sources.append(source)
+        for band in range(BANDS):
+            key = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+            self.buckets[band].setdefault(key, []).append(idx)
+        self._exact.setdefault(normalize(question.get("q")), idx)
+
+    def _add_all(self, questions, sigs, source):
+        for q, sig in zip(questions, sigs):
+            self._add(q, sig, source)
+
+    def _match(self, question, sig):
+        """(index of the closest existing question, estimated similarity, exact text match)."""
+        hit = self._exact.get(normalize(question.get("q")))
+        if hit is not None:
+            return hit, 1.0, True
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self.buckets[band].get(sig[band * ROWS:(band + 1) * ROWS].tobytes(), ()))
+        if not candidates:
+            return None, 0.0, False
+        cand = np.fromiter(candidates, dtype=np.int64)
+        sims = (np.asarray([self.sigs[i] for i in cand]) == sig).mean(axis=1)
+        best = int(sims.argmax())
+        return int(cand[best]), float(sims[best]), False
+
+    def filter(self, questions, source="bank"):
+        """Keeps questions that are not near-duplicates of anything seen so far (including
+        earlier questions of the same batch) and adds the kept ones to the index."""
+        kept = []
+        for q, sig in zip(questions, signatures(questions)):
+            self.stats["checked"] += 1
+            idx, sim, exact = self._match(q, sig)
+            if idx is not None and sim >= THRESHOLD:
+                self.stats["exact" if exact else "near"] += 1
+                self.stats["against_pool" if self.sources[idx] == "pool" else "within_bank"] += 1
+                continue
+            self._add(q, sig, source)
+            kept.append(q)
+        return kept
+
+    def report(self):
+        s = self.stats
+        dropped = s["exact"] + s["near"]
+        return (f"{dropped} of {s['checked']} dropped as duplicates "
+                f"({s['within_bank']} within the bank, {s['against_pool']} against the common pool; "
+                f"{s['exact']} exact, {s['near']} near)")
+
+def dedupe(questions, existing=()):
+    """One-shot helper: (kept questions, NearDupIndex with stats)."""
+    index = NearDupIndex(existing)
+    return index.filter(list(questions)), index
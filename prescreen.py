@@ -0,0 +1,68 @@
+# prescreen.py
+# Local first-stage resume screen (BM25-style keyword overlap, no API calls).
+# Clear rejects (empty PDFs, resumes sharing nothing with the JD) never reach Gemini.
+import re
+import math
+from collections import Counter, namedtuple
+
+# ---------------- Config ----------------
+DEFAULT_FLOOR = 0.08        # relevance (0-1) below which a resume is screened out
+DEFAULT_MODE = "reject"     # "reject" = auto-reject, "provisional" = hold for admin review
+MIN_RESUME_CHARS = 200      # shorter than this = empty / unreadable upload
+MAX_JD_TERMS = 40           # number of JD skill terms to match against
+K1 = 1.2                    # BM25 term-frequency saturation
+B = 0.75                    # BM25 length normalisation
+AVG_RESUME_TOKENS = 450     # assumed average resume length for length normalisation
+
+STOPWORDS = set("""
+a about above after all also an and any are as at be been being both but by can could did do does
+doing during each etc for from further had has have having he her here hers him his how i if in into
+is it its itself just may me more most must my no nor not of off on once only or other our ours out
+over own per same she should so some such than that the their them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours
+ability able candidate candidates company description duties experience good great including job
+knowledge looking plus position preferred required requirements responsibilities responsible role
+skills strong team teams work working year years using use well within across new help ensure
+""".split())
+
+PrescreenResult = namedtuple("PrescreenResult", ["passed", "relevance", "provisional_score", "matched", "reason"])
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+def tokenize(text):
+    """Lowercased tokens; keeps skill spellings like c++, c#, node.js."""
+    return [t for t in _TOKEN_RE.findall(str(text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+def jd_terms(jd_text, max_terms=MAX_JD_TERMS):
+    """Top JD terms with weights (log-scaled JD frequency, favours repeated skills)."""
+    counts = Counter(tokenize(jd_text))
+    return {t: 1.0 + math.log(c) for t, c in counts.most_common(max_terms)}
+
+def relevance(resume_text, jd_text):
+    """BM25 overlap of JD skill terms in the resume, normalised to 0-1. Returns (score, matched)."""
+    terms = jd_terms(jd_text)
+    if not terms: return 1.0, [] # Nothing to screen against: let the LLM decide
+    tokens = tokenize(resume_text)
+    tf = Counter(tokens)
+    norm = K1 * (1 - B + B * len(tokens) / AVG_RESUME_TOKENS)
+    got, best, matched = 0.0, 0.0, []
+    for term, weight in terms.items():
+        f = tf.get(term, 0)
+        best += weight
+        if f:
+            got += weight * f / (f + norm) # BM25 saturation, scaled so a term maxes out at its weight
+            matched.append(term)
+    return got / best, matched
+
+def prescreen(resume_text, jd_text, floor=DEFAULT_FLOOR, threshold=60):
+    """Decides whether a resume is worth an LLM call.
+    Screened-out resumes get a provisional score kept safely below the job threshold."""
+    text = str(resume_text or "").strip()
+    if len(text) < MIN_RESUME_CHARS:
+        return PrescreenResult(False, 0.0, 0, [], "empty or unreadable resume")
+    rel, matched = relevance(text, jd_text)
+    if rel < floor:
+        provisional = min(int(round(rel * 100)), max(0, int(threshold) - 1))
+        return PrescreenResult(False, rel, provisional, matched, f"keyword overlap {rel:.2f} below floor {floor:.2f}")
+    return PrescreenResult(True, rel, None, matched, "passed")
@@ -0,0 +1,143 @@
+# proctor_events.py
+# Append-only proctoring event log: violations are buffered in memory by the video
+# threads and written to SQLite in batches by one flusher thread, so recording an
+# event never touches the disk (or reruns the page) on the frame path.
+import time
+import atexit
+import threading
+from collections import deque
+import storage
+
+# ---------------- Config ----------------
+FLUSH_INTERVAL = 2.0    # seconds between flushes
+FLUSH_BATCH = 500       # flush early once this many events are waiting
+MAX_BUFFER = 20000      # events held in memory if the database is unavailable; oldest dropped beyond this
+
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proctor_events (
+    Event_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Session_ID TEXT NOT NULL,
+    App_ID INTEGER,
+    Ts REAL NOT NULL,
+    Type TEXT NOT NULL,
+    Face_Count INTEGER,
+    Yaw_Ratio REAL,
+    Counted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_proctor_events_session ON proctor_events(Session_ID, Ts);
+CREATE INDEX IF NOT EXISTS idx_proctor_events_app ON proctor_events(App_ID, Ts);
+"""
+
+COLUMNS = ["Session_ID", "App_ID", "Ts", "Type", "Face_Count", "Yaw_Ratio", "Counted"]
+
+def _conn():
+    conn = storage.get_conn()
+    storage.ensure_schema("proctor_events", EVENTS_SCHEMA, conn)
+    return conn
+
+class EventLog:
+    """In-memory buffer + background flusher. record() is O(1) and never blocks on I/O."""
+
+    def __init__(self, interval=FLUSH_INTERVAL, batch=FLUSH_BATCH, max_buffer=MAX_BUFFER):
+        self.interval = interval
+        self.batch = batch
+        self.buffer = deque(maxlen=max_buffer)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stats = {"recorded": 0, "written": 0, "flushes": 0, "dropped": 0, "errors": 0}
+        self.thread = threading.Thread(target=self._flush_loop, name="proctor-events", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def record(self, session_id, event_type, face_count=None, yaw_ratio=None, app_id=None, counted=False, ts=None):
+        row = (session_id, app_id, ts or time.time(), event_type, face_count,
+               None if yaw_ratio is None else round(float(yaw_ratio), 4), int(bool(counted)))
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.stats["dropped"] += 1
+            self.buffer.append(row)
+            self.stats["recorded"] += 1
+            due = len(self.buffer) >= self.batch
+        if due: self.wake_event.set()
+
+    def flush(self):
+        """Writes everything buffered in one transaction. Returns the number of rows written."""
+        with self.flush_lock:
+            with self.lock:
+                rows = list(self.buffer)
+                self.buffer.clear()
+            if not rows: return 0
+            try:
+                conn = _conn()
+                with conn:
+                    conn.executemany(
+                        f"INSERT INTO proctor_events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                    )
+            except Exception as e:
+                with self.lock:
+                    self.buffer.extendleft(reversed(rows)) # retry next round, keeping order
+                    self.stats["errors"] += 1
+                print(f"⚠️ Proctor event flush failed ({len(rows)} pending): {e}")
+                return 0
+            with self.lock:
+                self.stats["written"] += len(rows)
+                self.stats["flushes"] += 1
+            return len(rows)
+
+    def _flush_loop(self):
+        while True:
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+            self.flush()
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_log():
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+        return _log
+
+def record(session_id, event_type, **fields):
+    get_log().record(session_id, event_type, **fields)
+
+# ---------------- Admin Queries ----------------
+def timeline(app_id=None, session_id=None, since=None, limit=1000):
+    """A candidate's events in time order (by App_ID, or one proctoring session).
+    Events recorded before the session was linked to an application are included."""
+    get_log().flush() # include what is still buffered
+    if app_id is not None:
+        where = "(App_ID = ? OR Session_ID IN (SELECT DISTINCT Session_ID FROM proctor_events WHERE App_ID = ?))"
+        params = [int(app_id), int(app_id)]
+    elif session_id is not None:
+        where, params = "Session_ID = ?", [session_id]
+    else:
+        raise ValueError("timeline() needs app_id or session_id")
+    if since is not None:
+        where += " AND Ts >= ?"
+        params.append(since)
+    rows = _conn().execute(
+        f"SELECT {', '.join(COLUMNS)} FROM proctor_events WHERE {where} ORDER BY Ts, Event_ID LIMIT ?",
+        params + [int(limit)],
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+def counts_by_app():
+    """{App_ID: number of violation events} for every candidate with a proctoring trail."""
+    get_log().flush()
+    rows = _conn().execute(
+        """SELECT a.App_ID, COUNT(*) AS n FROM proctor_events e
+           JOIN (SELECT DISTINCT Session_ID, App_ID FROM proctor_events WHERE App_ID IS NOT NULL) a
+             ON a.Session_ID = e.Session_ID
+           WHERE e.Type NOT IN ('session_start', 'session_end')
+           GROUP BY a.App_ID"""
+    ).fetchall()
+    return {r["App_ID"]: r["n"] for r in rows}
+
+def log_stats():
+    log = get_log()
+    with log.lock:
+        return dict(log.stats, buffered=len(log.buffer))
@@ -0,0 +1,289 @@
+# proctor_service.py
+# Face-inference service for proctoring: a pool of worker processes, each holding one
+# detector (own FaceMesh graph) per session pinned to it. Sessions submit downscaled
+# frames through bounded queues with drop-oldest semantics; results are delivered back
+# to the session's Proctor by a collector thread.
+#
+#   python proctor_service.py --sessions 1,2,4,8,16 --fps 15 --seconds 10 [--video clip.mp4]
+#
+# The load test reports, per concurrency level, the checks/second each candidate gets
+# and the submit->result latency, and the highest level that stays within target.
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from collections import deque
+
+# ---------------- Config ----------------
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+PENDING_PER_SESSION = 1     # frames waiting behind the in-flight one; older ones are dropped
+SESSION_IDLE_TTL = 120      # worker drops a session's detector after this long without frames
+DETECTOR = "mesh"
+HEALTH_CHECK_EVERY = 1.0    # seconds between worker liveness checks, busy or idle
+TARGET_CHECKS_PER_SEC = 2.0 # load test: each candidate needs at least this many checks per second
+TARGET_P95_MS = 500.0       # ... with results no older than this
+
+# ---------------- Worker Process ----------------
+def _worker_main(inbox, outbox, detector_kind):
+    import proctoring # imported in the child: spawn starts from a clean interpreter
+    sessions = {} # session_id -> [detector, last_seen]
+    last_sweep = time.monotonic()
+    while True:
+        try:
+            msg = inbox.get(timeout=5)
+        except queue.Empty:
+            msg = ()
+        if msg is None:
+            break
+        now = time.monotonic()
+        if msg and msg[0] == "close":
+            entry = sessions.pop(msg[1], None)
+            if entry: entry[0].close()
+        elif msg:
+            _, sid, seq, frame = msg
+            entry = sessions.get(sid)
+            try:
+                if entry is None:
+                    entry = sessions[sid] = [proctoring.make_detector(detector_kind), now]
+                entry[1] = now
+                started = time.perf_counter()
+                obs = entry[0].detect(frame)
+                outbox.put((sid, seq, tuple(obs), (time.perf_counter() - started) * 1000, None))
+            except Exception as e:
+                outbox.put((sid, seq, None, 0.0, str(e)))
+        if now - last_sweep > SESSION_IDLE_TTL / 4:
+            last_sweep = now
+            for sid in [s for s, (_, seen) in sessions.items() if now - seen > SESSION_IDLE_TTL]:
+                sessions.pop(sid)[0].close()
+    for det, _ in sessions.values():
+        det.close()
+
+# ---------------- Parent Side ----------------
+class _Session:
+    __slots__ = ("proctor", "worker", "inflight", "sent_at", "pending", "seq", "latencies")
+
+    def __init__(self, proctor, worker):
+        self.proctor = proctor
+        self.worker = worker
+        self.inflight = False
+        self.sent_at = 0.0
+        self.pending = deque(maxlen=PENDING_PER_SESSION)
+        self.seq = 0
+        self.latencies = deque(maxlen=200)
+
+class RemoteDetector:
+    """What a Proctor holds in service mode: submit() is non-blocking."""
+
+    def __init__(self, service, session_id):
+        self.service = service
+        self.session_id = session_id
+
+    def submit(self, rgb):
+        self.service.submit(self.session_id, rgb)
+
+    def close(self):
+        self.service.close(self.session_id)
+
+class ProctorService:
+    def __init__(self, workers=WORKERS, detector_kind=DETECTOR):
+        self.ctx = multiprocessing.get_context("spawn") # never fork a process that runs gRPC / webrtc threads
+        self.detector_kind = detector_kind
+        self.outbox = self.ctx.Queue()
+        self.inboxes = [None] * workers
+        self.procs = [None] * workers
+        self.load = [0] * workers
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.errors = 0
+        self.stopping = threading.Event()
+        for i in range(workers): self._spawn(i)
+        self.collector = threading.Thread(target=self._collect, name="proctor-collector", daemon=True)
+        self.collector.start()
+        print(f"✅ Proctoring service started ({workers} worker processes, detector={detector_kind})")
+
+    def _spawn(self, i):
+        self.inboxes[i] = self.ctx.Queue()
+        self.procs[i] = self.ctx.Process(target=_worker_main, args=(self.inboxes[i], self.outbox, self.detector_kind),
+                                         name=f"proctor-worker-{i}", daemon=True)
+        self.procs[i].start()
+
+    def open(self, proctor):
+        """Pins a session to the least-loaded worker and makes it the proctor's detector."""
+        with self.lock:
+            worker = min(range(len(self.load)), key=self.load.__getitem__)
+            self.load[worker] += 1
+            self.sessions[proctor.session_id] = _Session(proctor, worker)
+        proctor.detector = RemoteDetector(self, proctor.session_id)
+        return proctor.detector
+
+    def _send(self, sid, s, frame):
+        s.seq += 1
+        s.inflight = True
+        s.sent_at = time.monotonic()
+        self.inboxes[s.worker].put(("frame", sid, s.seq, frame))
+
+    def submit(self, sid, frame):
+        with self.lock:
+            s = self.sessions.get(sid)
+            if s is None: return
+            if not s.inflight:
+                self._send(sid, s, frame)
+                return
+            # One frame in flight per session: newer frames replace waiting ones (drop-oldest)
+            if len(s.pending) == s.pending.maxlen:
+                s.proctor.stats.queue_dropped += 1
+            s.pending.append(frame)
+
+    def close(self, sid):
+        with self.lock:
+            s = self.sessions.pop(sid, None)
+            if s is None: return
+            self.load[s.worker] -= 1
+        self.inboxes[s.worker].put(("close", sid))
+
+    def _collect(self):
+        next_check = time.monotonic() + HEALTH_CHECK_EVERY
+        while not self.stopping.is_set():
+            # On a deadline, not only when idle: under steady traffic the outbox never runs
+            # dry, and a dead worker's sessions would otherwise wait forever
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + HEALTH_CHECK_EVERY
+            try:
+                sid, seq, obs, ms, error = self.outbox.get(timeout=HEALTH_CHECK_EVERY)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            with self.lock:
+                s = self.sessions.get(sid)
+                if s is None: continue # session closed while its frame was in flight
+                s.inflight = False
+                s.latencies.append((time.monotonic() - s.sent_at) * 1000)
+                if s.pending:
+                    self._send(sid, s, s.pending.popleft())
+            if error:
+                self.errors += 1
+                print(f"⚠️ Proctor worker error ({sid}): {error}")
+                continue
+            try:
+                from proctoring import Observation
+                s.proctor.on_result(Observation(*obs), ms)
+            except Exception as e:
+                print(f"⚠️ Proctor result error ({sid}): {e}")
+
+    def _check_workers(self):
+        """Restarts dead workers; their sessions get fresh detectors on the next frame."""
+        for i, proc in enumerate(self.procs):
+            if proc.is_alive(): continue
+            print(f"⚠️ Proctor worker {i} died (exit {proc.exitcode}); restarting")
+            with self.lock:
+                self.inboxes[i].cancel_join_thread() # frames queued for the dead worker are dropped, not flushed at exit
+                self._spawn(i)
+                for s in self.sessions.values():
+                    if s.worker == i:
+                        s.inflight = False
+                        s.pending.clear()
+
+    def stats(self):
+        with self.lock:
+            lat = sorted(l for s in self.sessions.values() for l in s.latencies)
+            return {
+                "workers": len(self.procs), "alive": sum(p.is_alive() for p in self.procs),
+                "sessions": len(self.sessions), "load": list(self.load), "errors": self.errors,
+                "p50_ms": round(lat[len(lat) // 2], 1) if lat else None,
+                "p95_ms": round(lat[int(len(lat) * 0.95)], 1) if lat else None,
+            }
+
+    def shutdown(self):
+        self.stopping.set() # workers exiting now are not restarted
+        for inbox in self.inboxes: inbox.put(None)
+        for proc in self.procs: proc.join(timeout=5)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service(workers=WORKERS, detector_kind=DETECTOR):
+    """Process-wide service singleton (started on first use)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ProctorService(workers, detector_kind)
+        return _service
+
+# ---------------- Load Test ----------------
+def _frames(video, size=(640, 480)):
+    import cv2
+    import numpy as np
+    if video:
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < 300:
+            ok, img = cap.read()
+            if not ok: break
+            frames.append(img)
+        cap.release()
+        if frames: return frames
+        print(f"⚠️ Could not read {video}; using synthetic frames")
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8) for _ in range(30)]
+
+def _candidate(proctor, frames, fps, seconds, stop):
+    interval = 1.0 / fps
+    next_at = time.monotonic()
+    end = next_at + seconds
+    i = 0
+    while time.monotonic() < end and not stop.is_set():
+        proctor.process(frames[i % len(frames)].copy(), pts=i * 3000)
+        i += 1
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+
+def load_test(levels, fps=15, seconds=10, video=None, workers=WORKERS, detector_kind=DETECTOR):
+    import proctoring
+    frames = _frames(video)
+    service = ProctorService(workers, detector_kind)
+    best = 0
+    print(f"{'sessions':>8} {'checks/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'q-drop':>7}  ok")
+    try:
+        for n in levels:
+            proctors = [proctoring.Proctor(None) for _ in range(n)]
+            for p in proctors: service.open(p)
+            stop = threading.Event()
+            threads = [threading.Thread(target=_candidate, args=(p, frames, fps, seconds, stop), daemon=True) for p in proctors]
+            for t in threads: t.start()
+            for t in threads: t.join()
+            time.sleep(0.5)
+            st = service.stats()
+            rates = sorted(p.stats.inferred / seconds for p in proctors)
+            worst = rates[0]
+            dropped = sum(p.stats.queue_dropped for p in proctors)
+            ok = worst >= TARGET_CHECKS_PER_SEC and (st["p95_ms"] or 0) <= TARGET_P95_MS
+            if ok: best = n
+            print(f"{n:>8} {worst:>9.1f} {st['p50_ms'] or 0:>7} {st['p95_ms'] or 0:>7} {dropped:>7}  {'✅' if ok else '❌'}")
+            for p in proctors: p.close()
+            time.sleep(0.2)
+            if not ok: break
+    finally:
+        service.shutdown()
+    print(f"🖥️ Sustained {best} concurrent candidate(s) at {fps} fps "
+          f"(target ≥{TARGET_CHECKS_PER_SEC:g} checks/s each, p95 ≤{TARGET_P95_MS:g} ms) with {workers} worker(s)")
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the proctoring inference service.")
+    parser.add_argument("--sessions", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--video", help="Recorded clip to replay (synthetic frames if omitted)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--detector", default=DETECTOR, help="Detector kind (see proctoring.DETECTORS)")
+    args = parser.parse_args(argv)
+    load_test([int(x) for x in args.sessions.split(",")], args.fps, args.seconds, args.video, args.workers, args.detector)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
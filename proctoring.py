@@ -0,0 +1,436 @@
+# proctoring.py
+# Adaptive proctoring pipeline: frames are downscaled before inference, the inference
+# rate follows a per-session CPU / latency budget, skipped frames reuse the last result
+# for the overlay, and every session keeps live stats (fps, inference ms, dropped frames).
+#
+#   python proctoring.py --bench clip.mp4 [clip2.mp4 ...] --detectors mesh,tiered
+#
+# The benchmark replays recorded clips through each detector and reports throughput and
+# how often its verdict (status / violation / looking away) agrees with the first
+# (reference) detector.
+import os
+import sys
+import math
+import time
+import argparse
+import uuid
+import threading
+import weakref
+from collections import namedtuple
+import cv2
+
+# ---------------- Config ----------------
+WIDTHS = (480, 320, 240, 160)   # inference resolutions, best first (landmarks are normalized, so any works)
+START_WIDTH = 320
+BUDGET_MS_PER_SEC = 120.0       # CPU time one session may spend on inference per second of video
+LATENCY_BUDGET_MS = 40.0        # a single inference slower than this steps the resolution down
+MIN_STRIDE = 1
+MAX_STRIDE = 15                 # never fewer than fps/15 inferences per second
+EWMA_ALPHA = 0.2
+WARN_COOLDOWN = 4.0             # seconds between two counted violations
+YAW_LEFT, YAW_RIGHT = 0.5, 2.0  # nose-to-ear distance ratio limits
+YAW_EVERY = 3                   # tiered detector: landmarks on every 3rd single-face inference
+
+# pose = (nose_x, nose_y, yaw_ratio) in normalized coordinates, or None;
+# yaw_ratio is None when the head is known to be turned but not by how much
+Observation = namedtuple("Observation", ["face_count", "pose"])
+Assessment = namedtuple("Assessment", ["face_count", "pose", "status", "color", "violation", "kind"])
+
+def pose_from_landmarks(face_landmarks):
+    """Nose (1) vs ear (234, 454) x-distance ratio; ~1.0 when facing the camera."""
+    nose = face_landmarks.landmark[1]
+    left_ear = face_landmarks.landmark[234]
+    right_ear = face_landmarks.landmark[454]
+    ratio = abs(nose.x - left_ear.x) / (abs(nose.x - right_ear.x) + 1e-6)
+    return (nose.x, nose.y, ratio)
+
+def create_face_mesh():
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+class MeshDetector:
+    """FaceMesh wrapper returning an Observation for an RGB frame.
+    Each session gets its own instance: the graph keeps tracking state and is not thread-safe."""
+
+    def __init__(self, face_mesh=None):
+        self.face_mesh = face_mesh or create_face_mesh()
+
+    def detect(self, rgb):
+        results = self.face_mesh.process(rgb)
+        faces = results.multi_face_landmarks or []
+        pose = pose_from_landmarks(faces[0]) if len(faces) == 1 else None
+        return Observation(len(faces), pose)
+
+    def close(self):
+        self.face_mesh.close()
+
+class FaceDetectionCounter:
+    """MediaPipe FaceDetection (short-range BlazeFace): face count plus the nose keypoint."""
+
+    def __init__(self):
+        import mediapipe as mp
+        self.detector = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
+    def count(self, rgb):
+        faces = self.detector.process(rgb).detections or []
+        nose = None
+        if len(faces) == 1:
+            kp = faces[0].location_data.relative_keypoints[2] # NOSE_TIP
+            nose = (kp.x, kp.y)
+        return len(faces), nose
+
+    def close(self):
+        self.detector.close()
+
+def load_cascade(name):
+    """OpenCV Haar cascade by file name (looked up in cv2.data.haarcascades) or path."""
+    path = name if os.path.exists(name) else os.path.join(cv2.data.haarcascades, name)
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise RuntimeError(f"Could not load face cascade: {path}")
+    return cascade
+
+class CascadeDetector:
+    """OpenCV Haar cascades only, for deployments without MediaPipe. The frontal cascade
+    gives the face count; it misses turned heads, so with no frontal face a profile hit
+    (either side; the image is mirrored for the other one) is reported as looking away,
+    with yaw ratio None: the cascades give no angle, and which side depends on camera
+    mirroring. No hit from either cascade is no face (frontal misses from lighting or
+    blur are common, so they are never counted as a violation)."""
+
+    def __init__(self, frontal=None, profile=None):
+        self.frontal = frontal or load_cascade("haarcascade_frontalface_default.xml")
+        self.profile = profile or load_cascade("haarcascade_profileface.xml")
+        self.profile_hits = 0
+
+    @staticmethod
+    def _faces(cascade, gray):
+        return cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+
+    def detect(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        ih, iw = gray.shape
+        faces = self._faces(self.frontal, gray)
+        if len(faces) > 1:
+            return Observation(len(faces), None)
+        if len(faces) == 1:
+            x, y, w, h = faces[0]
+            return Observation(1, ((x + w / 2) / iw, (y + h / 2) / ih, 1.0))
+        for mirrored in (False, True):
+            side = self._faces(self.profile, cv2.flip(gray, 1) if mirrored else gray)
+            if len(side):
+                x, y, w, h = side[0]
+                cx = (x + w / 2) / iw
+                self.profile_hits += 1
+                return Observation(1, ((1 - cx) if mirrored else cx, (y + h / 2) / ih, None))
+        return Observation(0, None)
+
+    def close(self):
+        pass
+
+class TieredDetector:
+    """Cheap face counter on every inference; FaceMesh only when exactly one face is
+    present and a yaw estimate is due. Between mesh runs the last yaw ratio is reused."""
+
+    def __init__(self, counter=None, mesh=None, yaw_every=YAW_EVERY):
+        self.counter = counter or FaceDetectionCounter()
+        self.mesh = mesh or MeshDetector()
+        self.yaw_every = yaw_every
+        self.since_yaw = yaw_every
+        self.ratio = None
+        self.mesh_runs = 0
+
+    def detect(self, rgb):
+        count, nose = self.counter.count(rgb)
+        if count != 1:
+            self.ratio = None # the next single face is a new look; re-estimate immediately
+            self.since_yaw = self.yaw_every
+            return Observation(count, None)
+        self.since_yaw += 1
+        if self.ratio is None or self.since_yaw >= self.yaw_every:
+            self.since_yaw = 0
+            self.mesh_runs += 1
+            obs = self.mesh.detect(rgb)
+            if obs.face_count != 1 or obs.pose is None:
+                return obs # the landmark model disagrees; trust it for this frame
+            self.ratio = obs.pose[2]
+            return obs
+        x, y = nose or (0.5, 0.5)
+        return Observation(1, (x, y, self.ratio))
+
+    def close(self):
+        self.counter.close()
+        self.mesh.close()
+
+class NullDetector:
+    """Always reports one centred face. For measuring pipeline overhead without a model."""
+
+    def detect(self, rgb):
+        return Observation(1, (0.5, 0.5, 1.0))
+
+    def close(self):
+        pass
+
+DETECTORS = {
+    "mesh": MeshDetector,                                           # full FaceMesh on every inference
+    "tiered": TieredDetector,                                       # FaceDetection count, FaceMesh for yaw
+    "cascade": CascadeDetector,                                     # OpenCV frontal + profile cascades, no MediaPipe
+    "null": NullDetector,
+}
+
+def make_detector(kind="mesh"):
+    return DETECTORS[kind]()
+
+def assess(obs):
+    """Turns an Observation into the status shown to the candidate."""
+    if obs.face_count > 1:
+        return Assessment(obs.face_count, obs.pose, "MULTIPLE FACES DETECTED!", (0, 0, 255), True, "multiple_faces")
+    if obs.face_count == 0:
+        # Strict no-face is optional, so it is not a violation
+        return Assessment(0, None, "NO FACE DETECTED", (0, 0, 255), False, "no_face")
+    if obs.pose is not None:
+        ratio = obs.pose[2]
+        if ratio is None:
+            return Assessment(1, obs.pose, "LOOKING AWAY", (0, 165, 255), True, "looking_away")
+        if ratio < YAW_LEFT:
+            return Assessment(1, obs.pose, "LOOKING AWAY (LEFT)", (0, 165, 255), True, "looking_left")
+        if ratio > YAW_RIGHT:
+            return Assessment(1, obs.pose, "LOOKING AWAY (RIGHT)", (0, 165, 255), True, "looking_right")
+    return Assessment(1, obs.pose, "Secure", (0, 255, 0), False, "secure")
+
+class SessionStats:
+    def __init__(self):
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.dropped = 0        # frames lost before reaching us (gaps in the stream's timestamps)
+        self.queue_dropped = 0  # frames superseded while waiting for an inference worker
+        self.fps = 0.0
+        self.infer_ms = 0.0
+        self.last_arrival = None
+        self.last_pts = None
+        self.frame_pts = None   # typical pts step between consecutive frames
+
+    def on_frame(self, pts=None):
+        now = time.monotonic()
+        self.frames += 1
+        if self.last_arrival is not None:
+            dt = now - self.last_arrival
+            if dt > 0:
+                inst = 1.0 / dt
+                self.fps = inst if not self.fps else (1 - EWMA_ALPHA) * self.fps + EWMA_ALPHA * inst
+        self.last_arrival = now
+        if pts is not None and self.last_pts is not None and pts > self.last_pts:
+            step = pts - self.last_pts
+            if self.frame_pts is None or step < self.frame_pts:
+                self.frame_pts = step
+            self.dropped += max(0, int(round(step / self.frame_pts)) - 1)
+        if pts is not None:
+            self.last_pts = pts
+
+    def on_inference(self, ms):
+        self.inferred += 1
+        self.infer_ms = ms if self.inferred == 1 else (1 - EWMA_ALPHA) * self.infer_ms + EWMA_ALPHA * ms
+
+class Proctor:
+    """Per-session frame pipeline. detector.detect(rgb) -> Observation.
+    on_event(proctor, event_type, assessment, counted) is called when a violation starts
+    or is counted as a warning, and on bind() / close(). An optional recorder
+    (evidence.EvidenceRecorder) gets every frame and a trigger on those violations."""
+
+    def __init__(self, detector, budget_ms=BUDGET_MS_PER_SEC, session_id=None, on_event=None, recorder=None):
+        self.detector = detector
+        self.budget_ms = budget_ms
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.app_id = None
+        self.on_event = on_event
+        self.recorder = recorder
+        self.stats = SessionStats()
+        self.stride = 2
+        self.width = START_WIDTH
+        self.since_inference = 0
+        self.last = Assessment(0, None, "Starting...", (200, 200, 200), False, "starting")
+        self.warn_count = 0
+        self.last_warn = time.time()
+        self.lock = threading.Lock()
+        _register(self)
+
+    def _downscale(self, img):
+        h, w = img.shape[:2]
+        if w <= self.width:
+            small = img
+        else:
+            small = cv2.resize(img, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+    def _adapt(self):
+        """Stride from the CPU budget; resolution from the latency budget."""
+        ms, fps = self.stats.infer_ms, max(self.stats.fps, 1.0)
+        self.stride = int(min(MAX_STRIDE, max(MIN_STRIDE, math.ceil(ms * fps / self.budget_ms))))
+        i = WIDTHS.index(self.width)
+        if ms > LATENCY_BUDGET_MS and i < len(WIDTHS) - 1:
+            self.width = WIDTHS[i + 1]
+        elif ms < LATENCY_BUDGET_MS / 3 and self.stride == MIN_STRIDE and i > 0:
+            self.width = WIDTHS[i - 1]
+
+    def _count_violation(self, assessment):
+        if assessment.violation:
+            now = time.time()
+            if now - self.last_warn > WARN_COOLDOWN:
+                self.warn_count += 1
+                self.last_warn = now
+                return True
+        return False
+
+    def _emit(self, event_type, assessment=None, counted=False):
+        if self.on_event is not None:
+            try:
+                self.on_event(self, event_type, assessment, counted)
+            except Exception as e:
+                print(f"⚠️ Proctor event error: {e}")
+
+    def bind(self, app_id):
+        """Links the session to a candidate (once); later events carry the App_ID."""
+        if self.app_id != app_id:
+            self.app_id = app_id
+            self._emit("session_start")
+
+    def observe(self, obs):
+        """Applies an inference result (used directly, or by an async inference service)."""
+        assessment = assess(obs)
+        with self.lock:
+            started = assessment.violation and assessment.kind != self.last.kind
+            self.last = assessment
+            counted = self._count_violation(assessment)
+        if started or counted:
+            if self.recorder is not None:
+                self.recorder.trigger(assessment.kind)
+            self._emit(assessment.kind, assessment, counted)
+        return assessment
+
+    def on_result(self, obs, infer_ms):
+        """Inference finished (inline, or delivered by proctor_service's collector thread)."""
+        self.stats.on_inference(infer_ms)
+        self.observe(obs)
+        self._adapt()
+
+    def process(self, img, pts=None):
+        """Runs (or skips) inference for one BGR frame and draws the overlay in place.
+        Detectors with submit() are asynchronous: their result arrives via on_result()."""
+        self.stats.on_frame(pts)
+        self.since_inference += 1
+        if self.since_inference >= self.stride:
+            self.since_inference = 0
+            small = self._downscale(img)
+            if hasattr(self.detector, "submit"):
+                self.detector.submit(small)
+            else:
+                started = time.perf_counter()
+                obs = self.detector.detect(small)
+                self.on_result(obs, (time.perf_counter() - started) * 1000)
+        else:
+            self.stats.skipped += 1
+        if self.recorder is not None:
+            self.recorder.push(img) # before the overlay is drawn on it
+        self.draw(img, self.last)
+        return img
+
+    def close(self):
+        """Releases the detector (or the service session) and leaves the live registry."""
+        try:
+            self._emit("session_end")
+            if self.recorder is not None:
+                self.recorder.close()
+            self.detector.close()
+        finally:
+            with _sessions_lock:
+                _sessions.pop(self.session_id, None)
+
+    def draw(self, img, a):
+        h, w = img.shape[:2]
+        if a.pose is not None:
+            cv2.circle(img, (int(a.pose[0] * w), int(a.pose[1] * h)), 5, (255, 0, 0), -1)
+        cv2.putText(img, f"Status: {a.status}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, a.color, 2)
+        cv2.putText(img, f"WARNINGS: {self.warn_count}/5", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        # Visual Alarm
+        if a.color != (0, 255, 0):
+            cv2.rectangle(img, (0, 0), (w, h), a.color, 10)
+
+    def snapshot(self):
+        s = self.stats
+        return {
+            "session": self.session_id, "fps": round(s.fps, 1), "infer_ms": round(s.infer_ms, 1),
+            "stride": self.stride, "width": self.width, "frames": s.frames, "inferred": s.inferred,
+            "skipped": s.skipped, "dropped": s.dropped, "queue_dropped": s.queue_dropped,
+            "warnings": self.warn_count, "status": self.last.status,
+            "evidence_kb": round(self.recorder.memory_bytes() / 1024) if self.recorder is not None else 0,
+        }
+
+# ---------------- Session Registry ----------------
+_sessions = weakref.WeakValueDictionary()
+_sessions_lock = threading.Lock()
+
+def _register(proctor):
+    with _sessions_lock:
+        _sessions[proctor.session_id] = proctor
+
+def session_stats():
+    """Live stats for every proctoring session in this process."""
+    with _sessions_lock:
+        proctors = list(_sessions.values())
+    return [p.snapshot() for p in proctors]
+
+# ---------------- Benchmark ----------------
+def _clip_frames(path, width=START_WIDTH):
+    cap = cv2.VideoCapture(path)
+    while True:
+        ok, img = cap.read()
+        if not ok: break
+        h, w = img.shape[:2]
+        if w > width:
+            img = cv2.resize(img, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+        yield cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    cap.release()
+
+def benchmark(clips, kinds=("mesh", "tiered")):
+    """Every frame of every clip through each detector (no stride, so the numbers are per inference)."""
+    frames = [f for clip in clips for f in _clip_frames(clip)]
+    if not frames:
+        print("❌ No frames could be read from the given clips")
+        return
+    verdicts = {}
+    print(f"🎥 {len(frames)} frames from {len(clips)} clip(s) at {START_WIDTH}px")
+    print(f"{'detector':>15} {'ms/frame':>9} {'fps':>8} {'violations':>11} {'status agree':>13} {'violation agree':>16} "
+          f"{'look-away agree':>16}")
+    for kind in kinds:
+        det = make_detector(kind)
+        out, started = [], time.perf_counter()
+        for f in frames:
+            out.append(assess(det.detect(f)))
+        elapsed = time.perf_counter() - started
+        det.close()
+        verdicts[kind] = out
+        ref = verdicts[kinds[0]]
+        status = sum(a.status == r.status for a, r in zip(out, ref)) / len(frames)
+        violation = sum(a.violation == r.violation for a, r in zip(out, ref)) / len(frames)
+        # Of the frames the reference calls looking away (any side), how many this detector also flags
+        away = [a.kind.startswith("looking") for a, r in zip(out, ref) if r.kind.startswith("looking")]
+        away_agree = f"{sum(away) / len(away):>15.1%}" if away else f"{'n/a':>15}"
+        print(f"{kind:>15} {elapsed / len(frames) * 1000:>9.2f} {len(frames) / elapsed:>8.1f} "
+              f"{sum(a.violation for a in out):>11} {status:>12.1%} {violation:>15.1%} {away_agree} ({len(away)} frames)")
+        if isinstance(det, TieredDetector):
+            print(f"{'':>15} FaceMesh ran on {det.mesh_runs} of {len(frames)} frames")
+        if isinstance(det, CascadeDetector):
+            print(f"{'':>15} looking away from profile hits on {det.profile_hits} of {len(frames)} frames")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark proctoring detectors on recorded clips.")
+    parser.add_argument("--bench", nargs="+", metavar="CLIP", required=True, help="Video files to replay")
+    parser.add_argument("--detectors", default="mesh,tiered",
+                        help=f"Comma-separated, first is the reference ({', '.join(DETECTORS)})")
+    args = parser.parse_args(argv)
+    benchmark(args.bench, args.detectors.split(","))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
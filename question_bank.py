@@ -0,0 +1,223 @@
+# question_bank.py
+# Compiled question banks (.qbank): questions grouped by type with per-type offset
+# tables, read through mmap so drawing an exam only decodes the sampled questions.
+#
+#   python question_bank.py --bench 10000   # compare against the JSON path
+#
+# Layout (little-endian):
+#   b"QBNK" | u16 version | u16 n_types
+#   v2 only:   u32 meta_len | meta (JSON, e.g. the common pool version the bank uses)
+#   per type:  u16 name_len | name (utf-8) | u32 count
+#   per type:  (count + 1) x u64 absolute offsets into the record section
+#   records:   one compact JSON object per question
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import argparse
+import tempfile
+import threading
+
+MAGIC = b"QBNK"
+VERSION = 2
+ID_PREFIX = {"Technical": "T", "General": "G"}  # matches the T1/G1 numbering in the DOCX export
+
+def _group(questions):
+    """{type: [questions]} in first-seen order, with stable ids assigned per type."""
+    groups = {}
+    for q in questions:
+        groups.setdefault(str(q.get("type") or ""), []).append(q)
+    for qtype, qs in groups.items():
+        prefix = ID_PREFIX.get(qtype, "Q")
+        for i, q in enumerate(qs):
+            q.setdefault("id", f"{prefix}{i + 1}")
+    return groups
+
+def compile_bank(questions, path, meta=None):
+    """Writes questions to path as a .qbank file (atomically). Returns the count written."""
+    groups = _group([dict(q) for q in questions if isinstance(q, dict)])
+    meta_bytes = json.dumps(meta or {}).encode("utf-8")
+    header = bytearray(MAGIC + struct.pack("<HHI", VERSION, len(groups), len(meta_bytes)) + meta_bytes)
+    for qtype, qs in groups.items():
+        name = qtype.encode("utf-8")
+        header += struct.pack("<H", len(name)) + name + struct.pack("<I", len(qs))
+    tables_size = sum((len(qs) + 1) * 8 for qs in groups.values())
+
+    records, tables = [], bytearray()
+    pos = len(header) + tables_size
+    for qs in groups.values():
+        offsets = [pos]
+        for q in qs:
+            rec = json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            records.append(rec)
+            pos += len(rec)
+            offsets.append(pos)
+        tables += struct.pack(f"<{len(offsets)}Q", *offsets)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(tables)
+            for rec in records: f.write(rec)
+        os.replace(tmp, path) # readers holding the old mmap keep a consistent view
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return sum(len(qs) for qs in groups.values())
+
+def compile_json(json_path, path=None):
+    """Compiles a JSON bank next to it: either a plain list of questions (older banks) or
+    {"common_pool": version, "questions": [...]}. Returns the .qbank path."""
+    path = path or os.path.splitext(json_path)[0] + ".qbank"
+    with open(json_path, "r") as f:
+        bank = json.load(f)
+    if isinstance(bank, dict):
+        compile_bank(bank.get("questions", []), path, {"common_pool": bank.get("common_pool")})
+    else:
+        compile_bank(bank if isinstance(bank, list) else [], path)
+    return path
+
+class QuestionBank:
+    """Read-only view over a .qbank file. Safe to share between sessions/threads."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != MAGIC:
+            raise ValueError(f"Not a question bank: {path}")
+        version, n_types = struct.unpack_from("<HH", self.mm, 4)
+        pos, self.meta = 8, {}
+        if version == 2:
+            (meta_len,) = struct.unpack_from("<I", self.mm, pos)
+            self.meta = json.loads(self.mm[pos + 4:pos + 4 + meta_len].decode("utf-8"))
+            pos += 4 + meta_len
+        elif version != 1:
+            raise ValueError(f"Unsupported question bank version {version}")
+        counts = []
+        for _ in range(n_types):
+            (name_len,) = struct.unpack_from("<H", self.mm, pos)
+            name = self.mm[pos + 2:pos + 2 + name_len].decode("utf-8")
+            (count,) = struct.unpack_from("<I", self.mm, pos + 2 + name_len)
+            counts.append((name, count))
+            pos += 2 + name_len + 4
+        self.tables = {} # type -> (offset table position, count)
+        for name, count in counts:
+            self.tables[name] = (pos, count)
+            pos += (count + 1) * 8
+
+    def count(self, qtype):
+        return self.tables.get(qtype, (0, 0))[1]
+
+    def get(self, qtype, i):
+        table, count = self.tables[qtype]
+        if not 0 <= i < count: raise IndexError(i)
+        start, end = struct.unpack_from("<QQ", self.mm, table + i * 8)
+        return json.loads(self.mm[start:end].decode("utf-8"))
+
+    def sample(self, qtype, k, rng=random):
+        """k distinct random questions of one type (only those k records are decoded)."""
+        n = self.count(qtype)
+        return [self.get(qtype, i) for i in rng.sample(range(n), min(k, n))]
+
+    def draw(self, quotas, total, rng=random):
+        """Stratified exam: {type: k} quotas, shuffled. Banks with no typed
+        questions (older files) fall back to a plain sample of `total`."""
+        if not any(self.count(t) for t in quotas):
+            pool = [(t, i) for t, (_, n) in self.tables.items() for i in range(n)]
+            exam = [self.get(t, i) for t, i in rng.sample(pool, min(len(pool), total))]
+        else:
+            exam = [q for t, k in quotas.items() for q in self.sample(t, k, rng)]
+        rng.shuffle(exam)
+        return exam
+
+    def close(self):
+        self.mm.close()
+
+# ---------------- Shared Cache ----------------
+_cache = {}
+_cache_lock = threading.Lock()
+
+def open_bank(path):
+    """Process-wide cached QuestionBank for path; reopened when the file is rewritten."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        hit = _cache.get(path)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        bank = QuestionBank(path)
+        _cache[path] = (stamp, bank) # the old mmap is left to the GC; sessions may still be reading it
+        return bank
+
+# ---------------- Benchmark ----------------
+def _synthetic_bank(n):
+    bank = []
+    for i in range(n):
+        qtype = "Technical" if i % 5 < 3 else "General"
+        bank.append({
+            "q": f"Question {i}: " + "which of the following best describes the behaviour of this system? " * 3,
+            "options": [f"Option {c} for question {i} with some explanatory text" for c in "ABCD"],
+            "answer": f"Option A for question {i} with some explanatory text", "type": qtype,
+        })
+    return bank
+
+def _json_draw(path, n_tech=25, n_gen=15):
+    with open(path, "r") as f:
+        bank = json.load(f)
+    tech = [q for q in bank if q.get("type") == "Technical"]
+    general = [q for q in bank if q.get("type") == "General"]
+    exam = random.sample(tech, min(len(tech), n_tech)) + random.sample(general, min(len(general), n_gen))
+    random.shuffle(exam)
+    return exam
+
+def benchmark(n_questions=10000, draws=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "bench.json")
+        with open(json_path, "w") as f:
+            json.dump(_synthetic_bank(n_questions), f)
+        t = time.perf_counter()
+        qb_path = compile_json(json_path)
+        compile_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        for _ in range(draws): _json_draw(json_path)
+        json_ms = (time.perf_counter() - t) / draws * 1000
+
+        t = time.perf_counter()
+        for _ in range(draws):
+            bank = QuestionBank(qb_path)
+            bank.draw({"Technical": 25, "General": 15}, 40)
+            bank.close()
+        cold_ms = (time.perf_counter() - t) / draws * 1000
+
+        t = time.perf_counter()
+        for _ in range(draws): open_bank(qb_path).draw({"Technical": 25, "General": 15}, 40)
+        warm_ms = (time.perf_counter() - t) / draws * 1000
+        with _cache_lock:
+            _cache.pop(qb_path)[1].close()
+
+    print(f"📚 {n_questions} questions, {draws} draws of 25 Technical + 15 General")
+    print(f"   compile             : {compile_s * 1000:.1f} ms (once per bank)")
+    print(f"   JSON load + split   : {json_ms:.2f} ms/draw")
+    print(f"   qbank open + draw   : {cold_ms:.3f} ms/draw")
+    print(f"   qbank cached draw   : {warm_ms:.3f} ms/draw")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile JSON question banks or benchmark the .qbank format.")
+    parser.add_argument("json_files", nargs="*", help="JSON banks to compile to .qbank")
+    parser.add_argument("--bench", type=int, metavar="N", help="Benchmark with an N-question synthetic bank")
+    parser.add_argument("--draws", type=int, default=200)
+    args = parser.parse_args(argv)
+    if args.bench:
+        benchmark(args.bench, args.draws)
+    for path in args.json_files:
+        print(f"✅ Compiled {compile_json(path)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# question_gen.py
+# Concurrent MCQ generation: every topic is split into independent batch jobs that
+# run on a thread pool under a shared rate limiter. Each batch is validated and
+# deduplicated as soon as it arrives, and progress is reported back to the caller.
+import re
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ratelimit import RateLimiter
+
+# ---------------- Config ----------------
+BATCH_SIZE = 10         # questions requested per call (smaller = more parallelism)
+WORKERS = 4             # concurrent Gemini calls
+RATE_PER_SEC = 1.0      # shared across every generation running in this process
+BURST = 4
+MAX_ATTEMPTS = 2        # per batch (bad JSON / API error)
+TOP_UP_ROUNDS = 2       # extra rounds when dedup leaves a type short
+
+GenJob = namedtuple("GenJob", ["topic", "qtype", "count", "part", "parts"])
+
+_limiter = RateLimiter(RATE_PER_SEC, BURST)
+
+def plan_jobs(topics, qtype, per_topic, batch_size=BATCH_SIZE):
+    """Splits per_topic questions for each topic into batch jobs."""
+    jobs = []
+    for topic in topics:
+        parts = max(1, -(-per_topic // batch_size))
+        for part in range(parts):
+            count = min(batch_size, per_topic - part * batch_size)
+            jobs.append(GenJob(topic, qtype, count, part + 1, parts))
+    return jobs
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+LETTERS = "ABCDEFGHIJ" # option letters a model may answer with instead of the text
+
+def normalize_question(text):
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", str(text or "").lower())).strip()
+
+def _credit(value, n_options):
+    """Optional per-option partial credit (see grading.py): kept only as one number per option."""
+    if not isinstance(value, list) or len(value) != n_options:
+        return None
+    try:
+        return [float(c) for c in value]
+    except (TypeError, ValueError):
+        return None
+
+def validate_batch(raw, qtype):
+    """Parses a model response and keeps well-formed MCQs: question text, 2+ distinct
+    options and an answer that is one of them (a bare option letter such as "B" is
+    mapped to that option's text). A valid "credit" list is kept with the question.
+    Returns (questions, rejected_count)."""
+    try:
+        batch = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    except (TypeError, ValueError):
+        return [], 1
+    if isinstance(batch, dict): # {"questions": [...]} and similar wrappers
+        batch = next((v for v in batch.values() if isinstance(v, list)), [])
+    if not isinstance(batch, list):
+        return [], 1
+    good, rejected = [], 0
+    for item in batch:
+        if not isinstance(item, dict):
+            rejected += 1
+            continue
+        q = str(item.get("q") or "").strip()
+        raw_options = [str(o).strip() for o in item.get("options") or []]
+        credit = _credit(item.get("credit"), len(raw_options))
+        options = list(dict.fromkeys(o for o in raw_options if o))
+        if credit is not None:
+            credit = [credit[raw_options.index(o)] for o in options] # follows the kept options
+        answer = str(item.get("answer") or "").strip()
+        if len(answer) == 1 and answer.upper() in LETTERS[:len(options)] and answer not in options:
+            answer = options[LETTERS.index(answer.upper())]
+        if not q or len(options) < 2 or answer not in options:
+            rejected += 1
+            continue
+        question = {"q": q, "options": options, "answer": answer, "type": qtype}
+        if credit is not None: question["credit"] = credit
+        good.append(question)
+    return good, rejected
+
+class Deduper:
+    """Drops questions whose normalized text has already been seen."""
+
+    def __init__(self, existing=()):
+        self.seen = {normalize_question(q.get("q")) for q in existing}
+
+    def filter(self, questions):
+        kept = []
+        for q in questions:
+            key = normalize_question(q["q"])
+            if key in self.seen: continue
+            self.seen.add(key)
+            kept.append(q)
+        return kept
+
+def _run_job(job, make_prompt, call, limiter):
+    last_error = None
+    for _ in range(MAX_ATTEMPTS):
+        limiter.acquire()
+        try:
+            questions, rejected = validate_batch(call(make_prompt(job)), job.qtype)
+            if questions:
+                return questions, rejected
+            last_error = "no valid questions in response"
+        except Exception as e:
+            last_error = e
+    raise RuntimeError(f"{job.topic} (batch {job.part}/{job.parts}): {last_error}")
+
+def _top_up_jobs(planned, have, topics, batch_size=BATCH_SIZE):
+    """Extra batch jobs for every type that is still short of its planned count."""
+    extra = []
+    for qtype, want in planned.items():
+        short = want - have.get(qtype, 0)
+        if short <= 0: continue
+        names = topics[qtype]
+        extra += plan_jobs(names, qtype, -(-short // len(names)), batch_size)
+    return extra
+
+def generate(jobs, make_prompt, call, workers=WORKERS, limiter=None, deduper=None, progress=None,
+             top_up_rounds=TOP_UP_ROUNDS):
+    """Runs batch jobs concurrently. make_prompt(job) -> prompt, call(prompt) -> response text.
+    Types that fall short of their planned count after validation and dedup are topped up
+    with at most top_up_rounds further rounds. progress(done, total, kept) is called from
+    the calling thread as batches finish. Returns ({qtype: [questions]} in job order, stats)."""
+    limiter = limiter or _limiter
+    deduper = deduper or Deduper()
+    stats = {"batches": 0, "failed": 0, "received": 0, "invalid": 0, "duplicates": 0, "kept": 0, "top_up_batches": 0}
+    planned, topics = {}, {}
+    for job in jobs:
+        planned[job.qtype] = planned.get(job.qtype, 0) + job.count
+        topics.setdefault(job.qtype, [])
+        if job.topic not in topics[job.qtype]: topics[job.qtype].append(job.topic)
+
+    by_type, done, round_jobs = {}, 0, list(jobs)
+    for round_no in range(top_up_rounds + 1):
+        if not round_jobs: break
+        if round_no:
+            stats["top_up_batches"] += len(round_jobs)
+            print(f"🔁 Topping up {len(round_jobs)} question batch(es) after dedup")
+        stats["batches"] += len(round_jobs)
+        results = [None] * len(round_jobs)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(round_jobs))), thread_name_prefix="qgen") as pool:
+            futures = {pool.submit(_run_job, job, make_prompt, call, limiter): i for i, job in enumerate(round_jobs)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    questions, rejected = fut.result()
+                    kept = deduper.filter(questions)
+                    stats["received"] += len(questions) + rejected
+                    stats["invalid"] += rejected
+                    stats["duplicates"] += len(questions) - len(kept)
+                    stats["kept"] += len(kept)
+                    results[i] = kept
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"⚠️ Question batch failed: {e}")
+                done += 1
+                if progress: progress(done, stats["batches"], stats["kept"])
+        for job, kept in zip(round_jobs, results):
+            by_type.setdefault(job.qtype, []).extend(kept or [])
+        round_jobs = _top_up_jobs(planned, {t: len(qs) for t, qs in by_type.items()}, topics)
+
+    # A top-up batch may overshoot; keep the planned number per type
+    return {t: qs[:planned[t]] for t, qs in by_type.items()}, stats
@@ -0,0 +1,104 @@
+# resume_store.py
+# Extracted resume text, stored once (zlib-compressed) and keyed by the resume file's hash.
+# Re-scoring, search and exports read from here instead of re-parsing PDFs. The whole
+# document is stored; scoring takes its own prefix (screening.RESUME_CHARS).
+import os
+import time
+import zlib
+import hashlib
+import storage
+import extraction
+
+RESUME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resume_texts (
+    Hash TEXT PRIMARY KEY,
+    Text BLOB NOT NULL,
+    Chars INTEGER NOT NULL,
+    Created_At REAL NOT NULL
+);
+"""
+
+def _conn():
+    conn = storage.get_conn()
+    storage.ensure_schema("resume_texts", RESUME_SCHEMA, conn)
+    return conn
+
+def file_hash(data):
+    """SHA-256 of the raw resume bytes (or of a file on disk when given a path)."""
+    if isinstance(data, (str, os.PathLike)):
+        with open(data, "rb") as f:
+            data = f.read()
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+def put_text(resume_hash, text):
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO resume_texts (Hash, Text, Chars, Created_At) VALUES (?, ?, ?, ?)",
+            (resume_hash, zlib.compress(text.encode("utf-8"), 6), len(text), time.time()),
+        )
+
+def get_text_by_hash(resume_hash):
+    """Stored text or None if this file has never been extracted."""
+    if not resume_hash: return None
+    row = _conn().execute("SELECT Text FROM resume_texts WHERE Hash = ?", (resume_hash,)).fetchone()
+    return zlib.decompress(row["Text"]).decode("utf-8") if row else None
+
+def get_texts(hashes):
+    """{hash: text} for many hashes in one query."""
+    hashes = [h for h in hashes if h]
+    out = {}
+    conn = _conn()
+    for i in range(0, len(hashes), 500): # stay under SQLite's bound-parameter limit
+        chunk = hashes[i:i + 500]
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT Hash, Text FROM resume_texts WHERE Hash IN ({marks})", chunk):
+            out[row["Hash"]] = zlib.decompress(row["Text"]).decode("utf-8")
+    return out
+
+def text_for_file(resume_hash, path):
+    """Returns stored text for this file, extracting (and storing) it only the first time."""
+    text = get_text_by_hash(resume_hash)
+    if text is None:
+        text = extraction.extract_text(path, path)
+        put_text(resume_hash, text)
+    return text
+
+def get_resume_text(app_id):
+    """Resume text for an application. Legacy rows with no stored text are
+    extracted once from Resume_Path and linked, so later calls never re-parse."""
+    app = storage.get_app(app_id)
+    if app is None: return ""
+    text = get_text_by_hash(app.get("Resume_Hash"))
+    if text is not None: return text
+
+    path = app.get("Resume_Path")
+    if not path or not os.path.exists(path): return ""
+    resume_hash = file_hash(path)
+    text = text_for_file(resume_hash, path)
+    storage.update_app(app_id, {"Resume_Hash": resume_hash})
+    return text
+
+def texts_for_apps(apps_df):
+    """{App_ID: text} for a DataFrame of applications (one bulk read, backfilling legacy rows).
+    Text is "" for applications whose resume is missing or unreadable."""
+    stored = get_texts(apps_df["Resume_Hash"].unique().tolist()) if not apps_df.empty else {}
+    out = {}
+    for _, app in apps_df.iterrows():
+        text = stored.get(app["Resume_Hash"])
+        if text is None:
+            text = get_resume_text(int(app["App_ID"]))
+        out[int(app["App_ID"])] = text
+    return out
+
+def search_apps(apps_df, query):
+    """App_IDs whose name, email or resume text contain every word of the query."""
+    words = [w for w in query.lower().split() if w]
+    if not words or apps_df.empty: return set()
+    stored = get_texts(apps_df["Resume_Hash"].unique().tolist())
+    hits = set()
+    for _, app in apps_df.iterrows():
+        haystack = " ".join([str(app["Name"]), str(app["Email"]), stored.get(app["Resume_Hash"], "")]).lower()
+        if all(w in haystack for w in words):
+            hits.add(int(app["App_ID"]))
+    return hits
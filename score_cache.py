@@ -0,0 +1,120 @@
+# score_cache.py
+# Persistent content-hash cache for resume scores (skips repeat Gemini calls)
+import re
+import time
+import hashlib
+import threading
+import storage
+
+# ---------------- Config ----------------
+MAX_ENTRIES = 50000           # LRU bound on cached scores
+TTL_SECONDS = 30 * 24 * 3600  # entries older than this are treated as misses
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_cache (
+    Key TEXT PRIMARY KEY,
+    Score INTEGER NOT NULL,
+    Model TEXT,
+    Prompt_Version TEXT,
+    Created_At REAL NOT NULL,
+    Last_Used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_score_cache_used ON score_cache(Last_Used);
+"""
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+_checked_versions = set()
+
+def _conn():
+    conn = storage.get_conn()
+    storage.ensure_schema("score_cache", CACHE_SCHEMA, conn)
+    return conn
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", str(text or "")).strip().lower()
+
+def make_key(resume_text, jd_text, prompt_version, model, variant=""):
+    """Hash of everything that can change the score. variant tells prompts of the same
+    version apart (e.g. "batch"); the default keeps single-call keys unchanged."""
+    h = hashlib.sha256()
+    parts = (normalize_text(resume_text), normalize_text(jd_text), prompt_version, model)
+    for part in parts + ((variant,) if variant else ()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+def get(key):
+    """Cached score or None. Expired entries count as misses and are dropped."""
+    conn = _conn()
+    row = conn.execute("SELECT Score, Created_At FROM score_cache WHERE Key = ?", (key,)).fetchone()
+    now = time.time()
+    if row is None:
+        _count("misses")
+        return None
+    if now - row["Created_At"] > TTL_SECONDS:
+        with conn:
+            conn.execute("DELETE FROM score_cache WHERE Key = ?", (key,))
+        _count("misses")
+        return None
+    with conn:
+        conn.execute("UPDATE score_cache SET Last_Used = ? WHERE Key = ?", (now, key))
+    _count("hits")
+    return row["Score"]
+
+def put(key, score, model="", prompt_version=""):
+    conn = _conn()
+    now = time.time()
+    with conn:
+        conn.execute(
+            "INSERT INTO score_cache (Key, Score, Model, Prompt_Version, Created_At, Last_Used) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(Key) DO UPDATE SET Score = excluded.Score, Created_At = excluded.Created_At, Last_Used = excluded.Last_Used",
+            (key, int(score), model, prompt_version, now, now),
+        )
+    _count("writes")
+    # Amortized LRU trim: only check size every 100 writes
+    if _stats["writes"] % 100 == 0:
+        evict()
+
+def evict(max_entries=MAX_ENTRIES):
+    """Drops expired entries, then least-recently-used ones beyond max_entries."""
+    conn = _conn()
+    with conn:
+        n = conn.execute("DELETE FROM score_cache WHERE Created_At < ?", (time.time() - TTL_SECONDS,)).rowcount
+        total = conn.execute("SELECT COUNT(*) FROM score_cache").fetchone()[0]
+        if total > max_entries:
+            n += conn.execute(
+                "DELETE FROM score_cache WHERE Key IN (SELECT Key FROM score_cache ORDER BY Last_Used LIMIT ?)",
+                (total - max_entries,),
+            ).rowcount
+    if n: _count("evictions", n)
+    return n
+
+def invalidate_all():
+    """Clears every cached score (e.g. after changing the scoring prompt)."""
+    conn = _conn()
+    with conn:
+        n = conn.execute("DELETE FROM score_cache").rowcount
+    print(f"🧹 Score cache cleared ({n} entries)")
+    return n
+
+def ensure_prompt_version(prompt_version):
+    """Once per process: drop entries written under a different prompt version."""
+    if prompt_version in _checked_versions: return
+    conn = _conn()
+    with conn:
+        n = conn.execute("DELETE FROM score_cache WHERE Prompt_Version != ?", (prompt_version,)).rowcount
+    if n: print(f"🧹 Dropped {n} cached scores from older prompt versions")
+    _checked_versions.add(prompt_version)
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["entries"] = _conn().execute("SELECT COUNT(*) FROM score_cache").fetchone()[0]
+    return stats
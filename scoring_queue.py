@@ -0,0 +1,208 @@
+# scoring_queue.py
+# Persisted resume-scoring queue: applications are recorded instantly with
+# Status="Scoring" and a worker pool does extraction / scoring / email later.
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import storage
+
+# ---------------- Config (defaults, overridable from secrets) ----------------
+NUM_WORKERS = 4
+WORKER_MODE = "thread"        # "thread" (I/O bound Gemini/SMTP) or "process"
+MAX_PENDING = 500             # back-pressure: queued + running, all jobs
+MAX_PENDING_PER_JOB = 200     # back-pressure: queued + running, one job
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 1.0           # seconds between queue scans when idle
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scoring_tasks (
+    Task_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    App_ID INTEGER NOT NULL,
+    Job_ID TEXT,
+    Payload TEXT NOT NULL,
+    State TEXT NOT NULL DEFAULT 'queued',
+    Attempts INTEGER NOT NULL DEFAULT 0,
+    Error TEXT,
+    Enqueued_At REAL NOT NULL,
+    Started_At REAL,
+    Finished_At REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON scoring_tasks(State, Task_ID);
+CREATE INDEX IF NOT EXISTS idx_tasks_job ON scoring_tasks(Job_ID, State);
+"""
+
+class QueueFullError(Exception):
+    """Raised when the queue is over its back-pressure limits."""
+
+def _conn():
+    conn = storage.get_conn()
+    storage.ensure_schema("scoring_tasks", QUEUE_SCHEMA, conn)
+    return conn
+
+# ---------------- Producer Side ----------------
+def enqueue_application(app_row, payload, max_pending=MAX_PENDING, max_per_job=MAX_PENDING_PER_JOB):
+    """Writes the application row (Status='Scoring') and its task in one transaction.
+    Returns the new App_ID. Raises QueueFullError when over the limits."""
+    job_id = app_row.get("Job_ID", "")
+    conn = _conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        total = conn.execute("SELECT COUNT(*) FROM scoring_tasks WHERE State IN ('queued', 'running')").fetchone()[0]
+        per_job = conn.execute(
+            "SELECT COUNT(*) FROM scoring_tasks WHERE Job_ID = ? AND State IN ('queued', 'running')", (job_id,)
+        ).fetchone()[0]
+        if total >= max_pending or per_job >= max_per_job:
+            raise QueueFullError(f"Scoring queue is full ({total} pending, {per_job} for this job)")
+
+        app_id = storage.insert_app(dict(app_row, Status="Scoring"), conn=conn)
+        payload = dict(payload, app_id=app_id)
+        conn.execute(
+            "INSERT INTO scoring_tasks (App_ID, Job_ID, Payload, Enqueued_At) VALUES (?, ?, ?, ?)",
+            (app_id, job_id, json.dumps(payload), time.time()),
+        )
+    if _queue is not None: _queue.wake()
+    return app_id
+
+# ---------------- Worker Pool ----------------
+class ScoringQueue:
+    """Claims tasks from the SQLite table and runs `handler(payload) -> dict` on a pool.
+    The returned dict is written back to the application row by App_ID."""
+
+    def __init__(self, handler, workers=NUM_WORKERS, mode=WORKER_MODE):
+        if mode == "process" and getattr(handler, "__module__", "") == "__main__":
+            # Streamlit runs the app as __main__, which child processes can't import
+            print("⚠️ Process pool needs an importable handler; falling back to threads.")
+            mode = "thread"
+        self.handler = handler
+        self.workers = int(workers)
+        self.mode = mode
+        pool_cls = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+        self.pool = pool_cls(max_workers=self.workers)
+        self.inflight = 0
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.thread = threading.Thread(target=self._dispatch_loop, name="scoring-dispatcher", daemon=True)
+
+    def start(self):
+        # Crash recovery: anything left 'running' by a dead process goes back on the queue
+        conn = _conn()
+        with conn:
+            conn.execute("UPDATE scoring_tasks SET State = 'queued' WHERE State = 'running'")
+        self.thread.start()
+        print(f"✅ Scoring queue started ({self.workers} {self.mode} workers)")
+
+    def wake(self):
+        self.wake_event.set()
+
+    def _claim(self, limit):
+        conn = _conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT Task_ID, App_ID, Payload FROM scoring_tasks WHERE State = 'queued' ORDER BY Task_ID LIMIT ?",
+                (limit,),
+            ).fetchall()
+            now = time.time()
+            for r in rows:
+                conn.execute(
+                    "UPDATE scoring_tasks SET State = 'running', Attempts = Attempts + 1, Started_At = ? WHERE Task_ID = ?",
+                    (now, r["Task_ID"]),
+                )
+        return rows
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                with self.lock:
+                    free = self.workers - self.inflight
+                rows = self._claim(free) if free > 0 else []
+                for r in rows:
+                    with self.lock:
+                        self.inflight += 1
+                    fut = self.pool.submit(self.handler, json.loads(r["Payload"]))
+                    fut.add_done_callback(lambda f, tid=r["Task_ID"], aid=r["App_ID"]: self._finish(tid, aid, f))
+                if not rows:
+                    self.wake_event.wait(POLL_INTERVAL)
+                    self.wake_event.clear()
+            except Exception as e:
+                print(f"⚠️ Scoring dispatcher error: {e}")
+                time.sleep(POLL_INTERVAL)
+
+    def _finish(self, task_id, app_id, fut):
+        try:
+            conn = _conn()
+            try:
+                fields = fut.result() or {}
+                storage.update_app(app_id, fields)
+                with conn:
+                    conn.execute(
+                        "UPDATE scoring_tasks SET State = 'done', Error = NULL, Finished_At = ? WHERE Task_ID = ?",
+                        (time.time(), task_id),
+                    )
+            except Exception as e:
+                attempts = conn.execute("SELECT Attempts FROM scoring_tasks WHERE Task_ID = ?", (task_id,)).fetchone()[0]
+                failed = attempts >= MAX_ATTEMPTS
+                with conn:
+                    conn.execute(
+                        "UPDATE scoring_tasks SET State = ?, Error = ?, Finished_At = ? WHERE Task_ID = ?",
+                        ("failed" if failed else "queued", str(e), time.time() if failed else None, task_id),
+                    )
+                if failed:
+                    storage.update_app(app_id, {"Status": "Scoring Failed"})
+                print(f"❌ Scoring task {task_id} failed (attempt {attempts}): {e}")
+        finally:
+            with self.lock:
+                self.inflight -= 1
+            self.wake()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue(handler, workers=NUM_WORKERS, mode=WORKER_MODE):
+    """Process-wide queue singleton (Streamlit reruns must not spawn new pools)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ScoringQueue(handler, workers, mode)
+            _queue.start()
+        elif _queue.mode == "thread":
+            _queue.handler = handler # Pick up the latest definition after a script rerun
+    return _queue
+
+# ---------------- Metrics ----------------
+def _percentile(values, pct):
+    if not values: return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return round(values[k], 2)
+
+def queue_metrics(window_seconds=24 * 3600):
+    """Per-job queue depth and latency (seconds) over the recent window."""
+    conn = _conn()
+    since = time.time() - window_seconds
+    stats = {}
+    for r in conn.execute(
+        "SELECT Job_ID, State, COUNT(*) AS n FROM scoring_tasks "
+        "WHERE State IN ('queued', 'running') OR Enqueued_At >= ? GROUP BY Job_ID, State",
+        (since,),
+    ):
+        job = stats.setdefault(r["Job_ID"], {"Job_ID": r["Job_ID"], "queued": 0, "running": 0, "done": 0, "failed": 0})
+        job[r["State"]] = r["n"]
+
+    waits, latencies = {}, {}
+    for r in conn.execute(
+        "SELECT Job_ID, Started_At - Enqueued_At AS wait, Finished_At - Enqueued_At AS total "
+        "FROM scoring_tasks WHERE State = 'done' AND Enqueued_At >= ?",
+        (since,),
+    ):
+        waits.setdefault(r["Job_ID"], []).append(r["wait"])
+        latencies.setdefault(r["Job_ID"], []).append(r["total"])
+
+    for job_id, job in stats.items():
+        lat = latencies.get(job_id, [])
+        job["depth"] = job["queued"] + job["running"]
+        job["avg_wait_s"] = round(sum(waits.get(job_id, [])) / len(lat), 2) if lat else None
+        job["p50_latency_s"] = _percentile(lat, 50)
+        job["p95_latency_s"] = _percentile(lat, 95)
+    return list(stats.values())
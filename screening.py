@@ -0,0 +1,339 @@
+# screening.py
+# Resume screening shared by the Streamlit app and the bulk_ingest CLI: local pre-screen,
+# Gemini scoring (single and batched, behind the score cache), status/token assignment
+# and result emails. Importing it runs no page code; settings come from st.secrets.
+import re
+import json
+import time
+import random
+import datetime
+import functools
+import streamlit as st
+import google.generativeai as genai
+import storage
+import score_cache
+import prescreen
+import resume_store
+import mailer
+import email_templates
+
+# ---------------- Config ----------------
+# Bump SCORING_PROMPT_VERSION whenever the prompt changes; it invalidates cached scores
+SCORING_MODEL = 'gemini-flash-latest'
+SCORING_PROMPT_VERSION = "v1"
+SCORING_CHARS = 2000
+RESUME_CHARS = 4 * SCORING_CHARS # Prefix of the stored text scored: the LLM reads 2000, the pre-screen the rest
+SCORING_TOKEN_BUDGET = 24000  # prompt tokens per batch request (rough 4 chars/token estimate)
+SCORING_MAX_BATCH = 20
+BATCH_PROMPT_VARIANT = "batch" # batch replies are cached apart from single-call scores
+
+class ScoringError(Exception):
+    """Gemini could not score a resume (API failure or no score in the reply).
+    Raised rather than scored as 0 so the queue retries the task instead of rejecting."""
+
+@functools.lru_cache(maxsize=1)
+def configure_gemini():
+    """Sets the API key once per process (the app configures it too; the CLI relies on this)."""
+    try:
+        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+        return True
+    except Exception as e:
+        print(f"⚠️ GEMINI_API_KEY not configured: {e}")
+        return False
+
+def generate_token():
+    chars = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+    return "".join(random.choices(chars, k=6))
+
+# ---------------- Email Notification ----------------
+@functools.lru_cache(maxsize=1)
+def mail_settings():
+    """(sender, password, base_url) read from secrets once per process, or None if unset."""
+    try:
+        sender_email = st.secrets["EMAIL_ADDRESS"]
+        password = st.secrets["EMAIL_PASSWORD"]
+    except Exception:
+        return None
+    try:
+        base_url = st.secrets.get("BASE_URL", email_templates.DEFAULT_BASE_URL).rstrip("/")
+    except Exception:
+        base_url = email_templates.DEFAULT_BASE_URL
+    return sender_email, password, base_url
+
+def send_email(candidate_email, score, company, role, email_type="success", token=None, app_id=None):
+    """Renders the pre-compiled template and queues it on the outbox. Only enqueues: the app's
+    mail dispatcher delivers it (see mailer.py)."""
+    settings = mail_settings()
+    if settings is None:
+        st.warning("⚠️ Email secrets not found. Skipping email.")
+        return ""
+    sender_email, _, base_url = settings
+
+    # Use provided token or generate backup (though caller should provide it)
+    if email_type == "success" and not token:
+        token = generate_token()
+
+    try:
+        raw = email_templates.build_message(sender_email, candidate_email, email_type, {
+            "company": company, "role": role, "base_url": base_url, "score": score, "token": token,
+        })
+        mailer.enqueue(candidate_email, raw, app_id=app_id, kind=email_type)
+        print(f"📨 {email_type.capitalize()} email queued for {candidate_email}")
+        return token
+    except Exception as e:
+        st.error(f"❌ Email Queueing Failed: {e}")
+        print(f"❌ Failed to queue email: {e}")
+        return ""
+
+# ---------------- Scoring ----------------
+SCORING_RUBRIC = """
+            SCORING ALGORITHM (Base + Merit):
+            
+            1. **BASE SCORE (40 Points)**: 
+               - If the text is a valid resume with Contact, Education, and Experience sections, AUTOMATICALLY AWARD 40 POINTS.
+               - If it is gibberish or empty, award 0.
+            
+            2. **MERIT SCORE (0-60 Points)**:
+               - **Keywords & Skills (25)**: Exact matches for Key Technical Skills in JD.
+               - **Experience Relevance (25)**: Similar Job Titles, Industy, and Seniority.
+               - **Formatting & Impact (10)**: Quantifiable results (numbers/%) and clear structure.
+            
+            TOTAL = BASE (40) + MERIT (0-60). Max 100.
+            
+            INSTRUCTIONS:
+            - Most decent candidates should score between 50-70.
+            - Only perfect matches should exceed 85."""
+
+def calculate_score(resume_text, jd_text, use_cache=True, with_stage=False):
+    """Resume score 0-100. Results are cached by content hash + prompt version + model.
+    With with_stage=True returns (score, "cache" | "llm") for auditing."""
+    key = score_cache.make_key(resume_text[:SCORING_CHARS], jd_text[:SCORING_CHARS], SCORING_PROMPT_VERSION, SCORING_MODEL)
+    if use_cache:
+        score_cache.ensure_prompt_version(SCORING_PROMPT_VERSION)
+        cached = score_cache.get(key)
+        if cached is not None:
+            return (cached, "cache") if with_stage else cached
+
+    score, cacheable = _score_with_gemini(resume_text, jd_text)
+    if cacheable:
+        score_cache.put(key, score, SCORING_MODEL, SCORING_PROMPT_VERSION)
+    return (score, "llm") if with_stage else score
+
+def prescreen_settings():
+    try:
+        floor = float(st.secrets.get("PRESCREEN_FLOOR", prescreen.DEFAULT_FLOOR))
+        mode = st.secrets.get("PRESCREEN_MODE", prescreen.DEFAULT_MODE)
+    except Exception:
+        floor, mode = prescreen.DEFAULT_FLOOR, prescreen.DEFAULT_MODE
+    return floor, mode
+
+def _score_with_gemini(resume_text, jd_text):
+    """Returns (score, cacheable); a score guessed from a malformed reply is not cacheable.
+    Raises ScoringError when the API keeps failing or the reply holds no number."""
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            configure_gemini()
+            model = genai.GenerativeModel(SCORING_MODEL)
+            prompt = f"""
+            Act as a calibrated ATS. Compare the Resume to the JD.
+            
+            JD: {jd_text[:SCORING_CHARS]}...
+            RESUME: {resume_text[:SCORING_CHARS]}...
+            
+{SCORING_RUBRIC}
+            - OUTPUT FORMAT: "Final Score: <number>"
+            """
+            generation_config = {"temperature": 0.0, "top_p": 0.1, "top_k": 1}
+            response = model.generate_content(prompt, generation_config=generation_config)
+            
+            # Robust Parsing
+            text = response.text
+            match = re.search(r"Final Score:\s*(\d+)", text, re.IGNORECASE)
+            if match:
+                score = int(match.group(1))
+                return min(100, max(0, score)), True # Clamp between 0-100
+            else:
+                # Fallback: try to find any double digit number at the end
+                digits = re.findall(r"\d+", text)
+                if digits: 
+                    return min(100, int(digits[-1])), False
+                raise ScoringError(f"No score in reply: {text[:80]!r}")
+                
+        except ScoringError:
+            raise
+        except Exception as e:
+            if "429" in str(e) and attempt < max_retries - 1:
+                time.sleep(2 ** attempt)
+                continue
+            elif attempt == max_retries - 1:
+                raise ScoringError(f"AI Error: {e}") from e
+
+# ---------------- Batched Scoring ----------------
+def _estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def _plan_batches(jd_text, items):
+    """Greedy packing of (id, text) items under the prompt token budget."""
+    fixed = _estimate_tokens(SCORING_RUBRIC) + _estimate_tokens(jd_text[:SCORING_CHARS]) + 200
+    batches, current, used = [], [], fixed
+    for cid, text in items:
+        cost = _estimate_tokens(text[:SCORING_CHARS]) + 20
+        if current and (used + cost > SCORING_TOKEN_BUDGET or len(current) >= SCORING_MAX_BATCH):
+            batches.append(current)
+            current, used = [], fixed
+        current.append((cid, text))
+        used += cost
+    if current: batches.append(current)
+    return batches
+
+def _score_batch_with_gemini(jd_text, batch):
+    """One request for several resumes. Returns {id: score} for well-formed entries only."""
+    candidates = "\n".join(
+        f"--- CANDIDATE id={cid} ---\n{text[:SCORING_CHARS]}..." for cid, text in batch
+    )
+    prompt = f"""
+            Act as a calibrated ATS. Score EACH candidate Resume against the same JD independently.
+            
+            JD: {jd_text[:SCORING_CHARS]}...
+            
+            {candidates}
+            {SCORING_RUBRIC}
+            - OUTPUT FORMAT (JSON): [{{"id": "<candidate id>", "score": <number>}}] with one entry per candidate.
+            """
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            configure_gemini()
+            model = genai.GenerativeModel(SCORING_MODEL)
+            generation_config = {"temperature": 0.0, "top_p": 0.1, "top_k": 1, "response_mime_type": "application/json"}
+            response = model.generate_content(prompt, generation_config=generation_config)
+            entries = json.loads(response.text)
+            break
+        except Exception as e:
+            if "429" in str(e) and attempt < max_retries - 1:
+                time.sleep(2 ** attempt)
+                continue
+            print(f"⚠️ Batch scoring failed, falling back to single calls: {e}")
+            return {}
+
+    wanted = {str(cid): cid for cid, _ in batch}
+    scores = {}
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            cid = wanted[str(entry["id"])]
+            scores[cid] = min(100, max(0, int(entry["score"])))
+        except (KeyError, TypeError, ValueError):
+            continue # Malformed entry -> scored singly below
+    return scores
+
+def calculate_scores_batch(jd_text, resumes, use_cache=True, progress=None):
+    """Scores many resumes for one JD. `resumes` is {id: text} or [(id, text)].
+    Cached batch scores are reused, the rest are packed into as few requests as the
+    token budget allows, and any candidate missing from a reply is scored singly.
+    Candidates that still cannot be scored are missing from the result."""
+    items = list(resumes.items()) if isinstance(resumes, dict) else list(resumes)
+    if use_cache: score_cache.ensure_prompt_version(SCORING_PROMPT_VERSION)
+    results, pending, keys = {}, [], {}
+    for cid, text in items:
+        keys[cid] = score_cache.make_key(text[:SCORING_CHARS], jd_text[:SCORING_CHARS], SCORING_PROMPT_VERSION, SCORING_MODEL,
+                                         BATCH_PROMPT_VARIANT)
+        cached = score_cache.get(keys[cid]) if use_cache else None
+        if cached is not None:
+            results[cid] = cached
+        else:
+            pending.append((cid, text))
+
+    batches = _plan_batches(jd_text, pending)
+    for n, batch in enumerate(batches, 1):
+        scores = _score_batch_with_gemini(jd_text, batch)
+        for cid, text in batch:
+            if cid in scores:
+                results[cid] = scores[cid]
+                score_cache.put(keys[cid], scores[cid], SCORING_MODEL, SCORING_PROMPT_VERSION)
+            else:
+                try:
+                    results[cid] = calculate_score(text, jd_text, use_cache=False)
+                except ScoringError as e:
+                    print(f"⚠️ Could not score {cid}: {e}") # left out of the results; caller keeps the old score
+        if progress: progress(n, len(batches))
+    return results
+
+def rescore_job(job_id, progress=None):
+    """Re-scores every application for a job in batches. Updates Score only (status/emails untouched).
+    Applications with no resume text (file missing or unreadable) are skipped, not zeroed."""
+    job = storage.get_job(job_id)
+    if job is None: return 0
+    apps = storage.load_apps_df("Job_ID = ?", (job_id,))
+    floor, _ = prescreen_settings()
+    resumes, updates = {}, {}
+    for app_id, text in resume_store.texts_for_apps(apps).items(): # Stored text, no PDF parsing
+        if not text or not text.strip():
+            print(f"⚠️ No resume text for application {app_id}; keeping its score")
+            continue
+        text = text[:RESUME_CHARS]
+        pre = prescreen.prescreen(text, job["JD"], floor=floor, threshold=job["ResumeThreshold"])
+        if pre.passed:
+            resumes[app_id] = text
+            updates[app_id] = {"Score_Stage": "llm", "Prescreen_Score": round(pre.relevance, 3)}
+        else:
+            updates[app_id] = {"Score": pre.provisional_score, "Score_Stage": "prescreen", "Prescreen_Score": round(pre.relevance, 3)}
+    scores = calculate_scores_batch(job["JD"], resumes, progress=progress)
+    for app_id in resumes:
+        if app_id in scores:
+            updates[app_id]["Score"] = scores[app_id]
+        else:
+            del updates[app_id] # Gemini failed: keep the previous score rather than zeroing it
+    storage.update_apps(updates)
+    return len(updates)
+
+# ---------------- Background Scoring ----------------
+RESULT_FIELDS = ("Score", "Status", "TestPassword", "TokenTime", "Score_Stage", "Prescreen_Score")
+
+def process_application(task):
+    """Queue worker: extract, score, assign status/token and email. Returns the row update.
+    A ScoringError propagates so the queue retries the task (and marks it "Scoring Failed"
+    after the last attempt) without emailing the candidate. The decision is saved before
+    the email is queued, and a retry of an already-notified application keeps it, so the
+    candidate never gets a second email with a different token."""
+    app_id = task["app_id"]
+    if mailer.has_message(app_id):
+        app = storage.get_app(app_id) or {}
+        return {k: app[k] for k in RESULT_FIELDS if k in app}
+    job = storage.get_job(task["job_id"])
+    if job is None:
+        raise ValueError(f"Job {task['job_id']} no longer exists")
+    path = task["resume_path"]
+    try:
+        # Extracted once per distinct file; re-uploads of the same resume reuse the stored text
+        text = resume_store.text_for_file(task.get("resume_hash") or resume_store.file_hash(path), path)
+    except Exception as e:
+        print(f"⚠️ Could not read resume {path}: {e}")
+        text = ""
+
+    fields = assess_resume(text, job)
+    if fields["Status"] != "Provisional": # Provisional = held for admin review, no email
+        storage.update_app(app_id, fields) # the token the email carries is stored first
+        email_type = "success" if fields["Status"] == "Shortlisted" else "rejection"
+        send_email(task["email"], fields["Score"], job["Company"], job["Role"], email_type, token=fields["TestPassword"], app_id=app_id)
+    return fields
+
+def assess_resume(text, job):
+    """Pre-screen + LLM score + status/token for one resume. Returns the application fields (sends nothing)."""
+    text = text[:RESUME_CHARS] # the stored text is the whole document
+    # Stage 1: local keyword screen. Only plausible resumes go on to Gemini.
+    floor, mode = prescreen_settings()
+    pre = prescreen.prescreen(text, job["JD"], floor=floor, threshold=job["ResumeThreshold"])
+    if not pre.passed:
+        print(f"ℹ️ Prescreen decided ({job['Job_ID']}): {pre.reason}")
+        status = "Provisional" if mode == "provisional" else "Rejected"
+        return {"Score": pre.provisional_score, "Status": status, "TestPassword": "",
+                "Score_Stage": "prescreen", "Prescreen_Score": round(pre.relevance, 3)}
+
+    # Stage 2: LLM scoring (served from the score cache when possible)
+    score, stage = calculate_score(text, job["JD"], with_stage=True)
+
+    status = "Shortlisted" if score >= int(job["ResumeThreshold"]) else "Rejected"
+    token = generate_token() if status == "Shortlisted" else ""
+    return {"Score": score, "Status": status, "TestPassword": token, "TokenTime": datetime.datetime.now(),
+            "Score_Stage": stage, "Prescreen_Score": round(pre.relevance, 3)}
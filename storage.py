@@ -0,0 +1,373 @@
+# storage.py
+# SQLite storage backend for Auto Hire Pro (replaces whole-file XLSX rewrites)
+import os
+import sqlite3
+import threading
+import datetime
+import pandas as pd
+
+# ---------------- Config ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DB_FILE = os.path.join(DATA_DIR, "autohire.db")
+APPS_XLSX = os.path.join(DATA_DIR, "applications.csv.xlsx")
+JOBS_XLSX = os.path.join(DATA_DIR, "companies.xlsx")
+
+APP_COLUMNS = ["Name", "Email", "Score", "Company", "Role", "Status", "Resume_Text", "TestPassword", "TokenTime", "TestScore", "TestStatus", "Resume_Path", "Timestamp", "Job_ID", "ApplicantName", "Score_Stage", "Prescreen_Score", "Resume_Hash", "Email_Status"]
+# Columns added after the first release; existing databases get them via ALTER TABLE
+APP_COLUMN_TYPES = {"Score_Stage": "TEXT", "Prescreen_Score": "REAL", "Resume_Hash": "TEXT", "Email_Status": "TEXT"}
+APP_COLUMN_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_apps_resume_hash ON applications(Resume_Hash);
+CREATE INDEX IF NOT EXISTS idx_apps_email_norm ON applications(LOWER(TRIM(Email))); -- credential_index lookups
+"""
+NUMERIC_APP_COLUMNS = ("Score", "TestScore", "Prescreen_Score")
+
+APPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    App_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT, Email TEXT, Score INTEGER, Company TEXT, Role TEXT, Status TEXT,
+    Resume_Text TEXT, TestPassword TEXT, TokenTime TEXT, TestScore INTEGER, TestStatus TEXT,
+    Resume_Path TEXT, Timestamp TEXT, Job_ID TEXT, ApplicantName TEXT,
+    Score_Stage TEXT, Prescreen_Score REAL, Resume_Hash TEXT, Email_Status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_apps_email ON applications(Email);
+CREATE INDEX IF NOT EXISTS idx_apps_job ON applications(Job_ID);
+CREATE INDEX IF NOT EXISTS idx_apps_status ON applications(Status);
+CREATE INDEX IF NOT EXISTS idx_apps_password ON applications(TestPassword);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Typed job schema (column -> (type, default)); replaces the old fillna("") / "Pending" padding
+JOB_SCHEMA = {
+    "Company": (str, ""),
+    "Role": (str, ""),
+    "JD": (str, ""),
+    "JD_File_Path": (str, ""),
+    "ResumeThreshold": (int, 60),
+    "AptitudeThreshold": (int, 25),
+    "Job_ID": (str, ""),
+    "HasQuestions": (str, "Pending"),
+}
+JOB_COLUMNS = list(JOB_SCHEMA)
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    Job_ID TEXT PRIMARY KEY,
+    Company TEXT NOT NULL DEFAULT '',
+    Role TEXT NOT NULL DEFAULT '',
+    JD TEXT NOT NULL DEFAULT '',
+    JD_File_Path TEXT NOT NULL DEFAULT '',
+    ResumeThreshold INTEGER NOT NULL DEFAULT 60,
+    AptitudeThreshold INTEGER NOT NULL DEFAULT 25,
+    HasQuestions TEXT NOT NULL DEFAULT 'Pending'
+);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schemas_ready = set()
+
+# ---------------- Connection Handling ----------------
+def get_conn():
+    """One connection per thread (Streamlit runs each session on its own thread)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        _local.conn = conn
+    ensure_schema("applications", APPS_SCHEMA, conn)
+    ensure_schema("jobs", JOBS_SCHEMA, conn)
+    if "app_columns" not in _schemas_ready:
+        _add_missing_app_columns(conn)
+    return conn
+
+def _add_missing_app_columns(conn):
+    with _schema_lock:
+        existing = {r["name"] for r in conn.execute("PRAGMA table_info(applications)")}
+        for col, typ in APP_COLUMN_TYPES.items():
+            if col not in existing:
+                conn.execute(f"ALTER TABLE applications ADD COLUMN {col} {typ}")
+        conn.commit()
+        conn.executescript(APP_COLUMN_INDEXES)
+        _schemas_ready.add("app_columns")
+
+def ensure_schema(name, ddl, conn=None):
+    """Runs a module's CREATE statements once per process."""
+    if name in _schemas_ready: return
+    with _schema_lock:
+        if name in _schemas_ready: return
+        (conn or get_conn()).executescript(ddl)
+        _schemas_ready.add(name)
+
+def get_meta(key, default=None):
+    row = get_conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+def set_meta(key, value, conn=None):
+    (conn or get_conn()).execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+def _to_db(value):
+    """Normalizes pandas/numpy values into something sqlite3 can bind."""
+    if value is None: return None
+    if isinstance(value, (datetime.datetime, datetime.date, pd.Timestamp)):
+        return None if pd.isna(value) else value.isoformat()
+    if isinstance(value, float) and value != value: return None  # NaN
+    if isinstance(value, (str, bytes, int, float)):
+        return value
+    try:
+        if pd.isna(value): return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "item"): return value.item()  # numpy scalars
+    return str(value)
+
+def _clean_fields(fields, allowed):
+    unknown = [k for k in fields if k not in allowed]
+    if unknown: raise KeyError(f"Unknown column(s): {', '.join(unknown)}")
+    return {k: _to_db(v) for k, v in fields.items()}
+
+# ---------------- Applications ----------------
+_app_listeners = []
+
+def add_app_listener(fn):
+    """Registers fn(app_id, fields) to be called after an application row is inserted or updated."""
+    if fn not in _app_listeners:
+        _app_listeners.append(fn)
+
+def notify_app_listeners(changes):
+    """[(app_id, fields)]; called by writers here, or by callers that wrote with `conn` once they commit."""
+    for app_id, fields in changes:
+        for fn in list(_app_listeners):
+            try:
+                fn(app_id, fields)
+            except Exception as e:
+                print(f"⚠️ Application listener failed: {e}")
+
+def insert_app(row, conn=None):
+    """Inserts one application row and returns its App_ID.
+    Pass `conn` to take part in a caller's open transaction instead of committing here
+    (listeners are not notified then; the caller's commit may still roll back)."""
+    fields = _clean_fields(row, APP_COLUMNS)
+    cols = ", ".join(fields)
+    marks = ", ".join("?" for _ in fields)
+    sql = f"INSERT INTO applications ({cols}) VALUES ({marks})"
+    if conn is not None:
+        return conn.execute(sql, list(fields.values())).lastrowid
+    conn = get_conn()
+    with conn:
+        cur = conn.execute(sql, list(fields.values()))
+    notify_app_listeners([(cur.lastrowid, fields)])
+    return cur.lastrowid
+
+def _insert_rows(conn, table, rows):
+    for r in rows:
+        cols = ", ".join(r)
+        marks = ", ".join("?" for _ in r)
+        conn.execute(f"INSERT INTO {table} ({cols}) VALUES ({marks})", list(r.values()))
+
+def insert_apps(rows):
+    """Bulk insert in a single transaction. Returns the number of rows written."""
+    rows = [_clean_fields(r, APP_COLUMNS) for r in rows]
+    if not rows: return 0
+    conn = get_conn()
+    with conn:
+        _insert_rows(conn, "applications", rows)
+    return len(rows)
+
+def update_app(app_id, fields, conn=None):
+    """Row-level update by App_ID. With `conn` it runs inside the caller's transaction and
+    returns the change for notify_app_listeners() after the caller commits."""
+    fields = _clean_fields(fields, APP_COLUMNS)
+    if not fields: return
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    if conn is not None:
+        conn.execute(f"UPDATE applications SET {sets} WHERE App_ID = ?", list(fields.values()) + [int(app_id)])
+        return [(int(app_id), fields)]
+    conn = get_conn()
+    with conn:
+        conn.execute(f"UPDATE applications SET {sets} WHERE App_ID = ?", list(fields.values()) + [int(app_id)])
+    notify_app_listeners([(int(app_id), fields)])
+
+def update_apps(updates):
+    """Applies {App_ID: fields} in a single transaction."""
+    changes = []
+    conn = get_conn()
+    with conn:
+        for app_id, fields in updates.items():
+            fields = _clean_fields(fields, APP_COLUMNS)
+            if not fields: continue
+            sets = ", ".join(f"{k} = ?" for k in fields)
+            conn.execute(f"UPDATE applications SET {sets} WHERE App_ID = ?", list(fields.values()) + [int(app_id)])
+            changes.append((int(app_id), fields))
+    notify_app_listeners(changes)
+    return len(updates)
+
+def get_app(app_id):
+    row = get_conn().execute("SELECT * FROM applications WHERE App_ID = ?", (int(app_id),)).fetchone()
+    return dict(row) if row else None
+
+def load_apps_df(where="", params=()):
+    """Applications as a DataFrame (App_ID + APP_COLUMNS). `where` is an optional SQL filter."""
+    sql = "SELECT * FROM applications" + (f" WHERE {where}" if where else "") + " ORDER BY App_ID"
+    df = pd.read_sql_query(sql, get_conn(), params=params)
+    text_cols = [c for c in APP_COLUMNS if c not in NUMERIC_APP_COLUMNS]
+    df[text_cols] = df[text_cols].fillna("")
+    return df
+
+# ---------------- Jobs ----------------
+_jobs_lock = threading.Lock()
+_jobs_snapshot = {"version": None, "df": None}
+_job_listeners = []
+
+def add_job_listener(fn):
+    """Registers fn(action, job_id, version) to be called after a job is inserted, updated or deleted."""
+    if fn not in _job_listeners:
+        _job_listeners.append(fn)
+
+def _notify_job_listeners(action, job_id, version):
+    for fn in list(_job_listeners):
+        try:
+            fn(action, job_id, version)
+        except Exception as e:
+            print(f"⚠️ Job listener failed: {e}")
+
+def _coerce_job(row, partial=False):
+    """Casts a job dict to JOB_SCHEMA types, filling defaults unless partial."""
+    out = {}
+    for col, (typ, default) in JOB_SCHEMA.items():
+        if col not in row:
+            if not partial: out[col] = default
+            continue
+        val = _to_db(row[col])
+        if val is None or val == "":
+            out[col] = default
+        elif typ is int:
+            try:
+                out[col] = int(float(val))
+            except (TypeError, ValueError):
+                out[col] = default # e.g. the "Pending" filler older versions wrote into every missing cell
+        else:
+            out[col] = str(val)
+    unknown = [k for k in row if k not in JOB_SCHEMA]
+    if unknown: raise KeyError(f"Unknown column(s): {', '.join(unknown)}")
+    return out
+
+def _bump_jobs_version(conn):
+    """Increments jobs_version inside the caller's transaction and returns the new value."""
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('jobs_version', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    return conn.execute("SELECT value FROM meta WHERE key = 'jobs_version'").fetchone()[0]
+
+def jobs_version():
+    return get_meta("jobs_version", "0")
+
+def insert_job(job):
+    """Adds a job. Raises sqlite3.IntegrityError if the Job_ID already exists."""
+    job = _coerce_job(job)
+    if not job["Job_ID"]: raise ValueError("Job_ID is required")
+    conn = get_conn()
+    with conn:
+        _insert_rows(conn, "jobs", [job])
+        version = _bump_jobs_version(conn)
+    _notify_job_listeners("insert", job["Job_ID"], version)
+    return job
+
+def update_job(job_id, fields):
+    fields = _coerce_job(fields, partial=True)
+    fields.pop("Job_ID", None)
+    if not fields: return
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    conn = get_conn()
+    with conn:
+        conn.execute(f"UPDATE jobs SET {sets} WHERE Job_ID = ?", list(fields.values()) + [job_id])
+        version = _bump_jobs_version(conn)
+    _notify_job_listeners("update", job_id, version)
+
+def delete_job(job_id):
+    conn = get_conn()
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE Job_ID = ?", (job_id,))
+        version = _bump_jobs_version(conn)
+    _notify_job_listeners("delete", job_id, version)
+
+def get_job(job_id):
+    row = get_conn().execute("SELECT * FROM jobs WHERE Job_ID = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def load_jobs_df():
+    """Process-wide jobs snapshot; only re-queried when jobs_version has moved."""
+    version = jobs_version()
+    with _jobs_lock:
+        if _jobs_snapshot["df"] is None or _jobs_snapshot["version"] != version:
+            df = pd.read_sql_query("SELECT * FROM jobs ORDER BY rowid", get_conn())
+            _jobs_snapshot["df"] = df[JOB_COLUMNS]
+            _jobs_snapshot["version"] = version
+        return _jobs_snapshot["df"].copy()
+
+# ---------------- Migration / Export ----------------
+def migrate_apps_from_xlsx(path=APPS_XLSX):
+    """One-time import of the legacy applications workbook. Returns rows imported."""
+    if get_meta("apps_migrated") or not os.path.exists(path):
+        return 0
+    df = pd.read_excel(path)
+    rows = [_clean_fields({k: v for k, v in rec.items() if k in APP_COLUMNS}, APP_COLUMNS) for rec in df.to_dict("records")]
+    conn = get_conn()
+    with conn:
+        # Re-check under the write lock so two sessions can't both import
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'apps_migrated'").fetchone():
+            return 0
+        _insert_rows(conn, "applications", rows)
+        set_meta("apps_migrated", datetime.datetime.now().isoformat(), conn)
+    print(f"✅ Migrated {len(rows)} applications from {os.path.basename(path)}")
+    return len(rows)
+
+def migrate_jobs_from_xlsx(path=JOBS_XLSX):
+    """One-time import of the legacy companies workbook. Returns rows imported."""
+    if get_meta("jobs_migrated") or not os.path.exists(path):
+        return 0
+    df = pd.read_excel(path)
+    rows = []
+    for rec in df.to_dict("records"):
+        job = _coerce_job({k: v for k, v in rec.items() if k in JOB_SCHEMA})
+        if not job["Job_ID"] or job["Job_ID"] == "Pending": # "Pending" was filler, not a real ID
+            job["Job_ID"] = f"{job['Company']}_{job['Role']}".replace(" ", "_")
+        rows.append(job)
+    conn = get_conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'jobs_migrated'").fetchone():
+            return 0
+        imported = 0
+        for job in rows:
+            # Legacy sheets could hold the same Company+Role twice; keep the first
+            cols = ", ".join(job)
+            marks = ", ".join("?" for _ in job)
+            cur = conn.execute(f"INSERT OR IGNORE INTO jobs ({cols}) VALUES ({marks})", list(job.values()))
+            if cur.rowcount:
+                imported += 1
+            else:
+                print(f"⚠️ Skipped duplicate job '{job['Job_ID']}' ({job['Role']} @ {job['Company']})")
+        set_meta("jobs_migrated", datetime.datetime.now().isoformat(), conn)
+        _bump_jobs_version(conn)
+    print(f"✅ Migrated {imported} jobs from {os.path.basename(path)}")
+    return imported
+
+def export_apps_to_xlsx(path_or_buffer, text_lookup=None):
+    """Writes the applications table to XLSX for HR (file path or BytesIO).
+    `text_lookup(hashes) -> {hash: text}` fills Resume_Text from the resume text store."""
+    df = load_apps_df()
+    if text_lookup is not None and not df.empty:
+        texts = text_lookup([h for h in df["Resume_Hash"].unique() if h])
+        df["Resume_Text"] = df["Resume_Hash"].map(lambda h: texts.get(h, ""))
+    df.to_excel(path_or_buffer, index=False)
+    return len(df)
@@ -0,0 +1,38 @@
+# Partial-credit grading: a question's "credit" list must survive validation and the
+# .qbank compile, and a candidate is marked from it under the partial scheme.
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import grading
+import question_bank
+import question_gen
+
+RESPONSE = json.dumps([
+    {"q": "Best index for WHERE LOWER(Email) = ?", "options": ["Expression index", "Index on Email", "No index"],
+     "answer": "A", "credit": [1, 0.5, 0]},
+    {"q": "Default isolation of SQLite", "options": ["Serializable", "Read committed"], "answer": "Serializable"},
+    {"q": "Python GIL scope", "options": ["Per process", "Per thread", "Per machine"],
+     "answer": "Per process", "credit": [1, "half"]},
+])
+
+def test_partial_credit_survives_compile_and_grades_one_candidate(tmp_path):
+    questions, rejected = question_gen.validate_batch(RESPONSE, "Technical")
+    assert rejected == 0
+    assert questions[0]["credit"] == [1.0, 0.5, 0.0]
+    assert "credit" not in questions[1] and "credit" not in questions[2] # missing / malformed
+
+    path = str(tmp_path / "J1.qbank")
+    question_bank.compile_bank(questions, path)
+    bank = question_bank.QuestionBank(path)
+    try:
+        exam = [bank.get("Technical", i) for i in range(bank.count("Technical"))]
+    finally:
+        bank.close()
+    assert exam[0]["credit"] == [1.0, 0.5, 0.0]
+
+    # partly right on Q1, right on Q2, wrong on Q3
+    answered = {exam[0]["id"]: (1, None), exam[1]["id"]: (0, None), exam[2]["id"]: (2, None)}
+    assert grading.grade_attempt(exam, answered, "partial") == 1.5
+    assert grading.grade_attempt(exam, answered, "standard") == 1.0
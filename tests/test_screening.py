@@ -0,0 +1,73 @@
+# Scoring worker behaviour when Gemini fails: the task must be retried and end
+# "Scoring Failed", never stored as a 0 / Rejected score with a rejection email.
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+import mailer
+import resume_store
+import scoring_queue
+import screening
+
+JD = "Senior Python developer. Django, PostgreSQL, REST APIs, Docker, Kubernetes, AWS, CI/CD pipelines, unit testing."
+RESUME = ("Jane Doe - jane@example.com\nEducation: B.Tech Computer Science\n"
+          "Experience: Python developer building Django REST APIs on PostgreSQL, shipped with Docker and "
+          "Kubernetes on AWS, CI/CD pipelines and unit testing for every service. ") * 3
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "DB_FILE", str(tmp_path / "test.db"))
+    monkeypatch.setattr(storage, "_local", threading.local())
+    monkeypatch.setattr(storage, "_schemas_ready", set())
+    monkeypatch.setattr(mailer, "_mailer", None)
+    yield tmp_path
+
+class FailingModel:
+    calls = 0
+
+    def __init__(self, name):
+        pass
+
+    def generate_content(self, prompt, generation_config=None):
+        FailingModel.calls += 1
+        raise RuntimeError("503 Service Unavailable")
+
+def test_failed_gemini_call_retries_task_without_email(db, monkeypatch):
+    FailingModel.calls = 0
+    monkeypatch.setattr(screening.genai, "GenerativeModel", FailingModel)
+    monkeypatch.setattr(screening, "configure_gemini", lambda: True)
+    monkeypatch.setattr(screening, "mail_settings", lambda: ("hr@example.com", "secret", "http://localhost"))
+    monkeypatch.setattr(screening.time, "sleep", lambda s: None)
+    monkeypatch.setattr(mailer, "get_mailer", lambda *a, **k: None)
+
+    storage.insert_job({"Job_ID": "J1", "Company": "Acme", "Role": "Dev", "JD": JD, "ResumeThreshold": 60})
+    resume_hash = resume_store.file_hash(RESUME.encode())
+    resume_store.put_text(resume_hash, RESUME)
+    app_id = scoring_queue.enqueue_application(
+        {"Job_ID": "J1", "Company": "Acme", "Role": "Dev", "Name": "Jane", "Email": "jane@example.com"},
+        {"job_id": "J1", "resume_path": "missing.pdf", "resume_hash": resume_hash, "email": "jane@example.com"},
+    )
+
+    queue = scoring_queue.ScoringQueue(screening.process_application, workers=1, mode="thread")
+    try:
+        for attempt in range(1, scoring_queue.MAX_ATTEMPTS + 1):
+            (row,) = queue._claim(1)
+            fut = queue.pool.submit(queue.handler, scoring_queue.json.loads(row["Payload"]))
+            with pytest.raises(screening.ScoringError):
+                fut.result()
+            queue._finish(row["Task_ID"], row["App_ID"], fut)
+            state = storage.get_conn().execute("SELECT State, Attempts FROM scoring_tasks").fetchone()
+            assert state["Attempts"] == attempt
+            assert state["State"] == ("failed" if attempt == scoring_queue.MAX_ATTEMPTS else "queued")
+    finally:
+        queue.pool.shutdown(wait=True)
+
+    assert FailingModel.calls == 3 * scoring_queue.MAX_ATTEMPTS # 3 API tries per task attempt
+    app = storage.get_app(app_id)
+    assert app["Status"] == "Scoring Failed"
+    assert not app["Score"]
+    assert mailer.outbox_stats() == {"queued": 0, "sending": 0, "sent": 0, "failed": 0}
@@ -0,0 +1,348 @@
+# warning_channel.py
+# Push channel for proctoring warnings: a small long-poll HTTP endpoint (one threaded
+# server per process) that the candidate's page polls from an embedded widget. Warning
+# counts and termination reach the browser without re-running the Streamlit script, and
+# termination is decided (and saved) on the server side. Each session has its own random
+# token, required on every poll; the endpoint binds to loopback unless configured otherwise.
+#
+# Browsers reach it at a public base URL. For remote or HTTPS pages put it behind the
+# same reverse proxy / origin as Streamlit and give the path, e.g. "/warnings" with
+#   location /warnings/ { proxy_pass http://127.0.0.1:8765/; proxy_read_timeout 60s; }
+# (any path ending in /poll is served, so the prefix may be kept or stripped). With no URL
+# the widget polls http(s)://<page host>:PORT, which only works for local plain-HTTP use.
+# A session whose widget never gets through is reported (see unreachable()) and keeps
+# the rerun fallback.
+#
+#   python warning_channel.py --bench 50 --seconds 30 --warn-per-min 2
+#
+# The benchmark reports server CPU per active candidate for the long-poll channel and
+# for the old approach (one full script rerun per warning).
+import os
+import sys
+import hmac
+import json
+import time
+import secrets
+import argparse
+import threading
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ---------------- Config ----------------
+PORT = 8765
+HOST = "127.0.0.1"      # "0.0.0.0" to serve browsers directly; keep loopback behind a reverse proxy
+MAX_WARNINGS = 5        # warnings before the test is terminated
+POLL_TIMEOUT = 25.0     # seconds a poll is held open when nothing changes
+STATE_TTL = 3600        # ended sessions are forgotten after this long
+UNREACHABLE_AFTER = 20.0 # seconds without a confirmed poll before a session's browser is reported as cut off
+
+class _State:
+    __slots__ = ("app_id", "token", "warnings", "status", "terminated", "version", "updated", "ended",
+                 "confirmed", "opened", "reported")
+
+    def __init__(self, app_id):
+        self.app_id = app_id
+        self.token = secrets.token_urlsafe(16)
+        self.warnings = 0
+        self.status = ""
+        self.terminated = False
+        self.version = 0
+        self.updated = time.time()
+        self.ended = False
+        self.confirmed = False # the widget has received at least one poll reply
+        self.opened = time.time()
+        self.reported = False  # unreachable() has logged this session
+
+    def as_dict(self):
+        return {"warnings": self.warnings, "max": MAX_WARNINGS, "status": self.status,
+                "terminated": self.terminated, "version": self.version}
+
+class WarningChannel:
+    """Per-session warning state. publish() wakes every poll waiting on that session."""
+
+    def __init__(self):
+        self.states = {}
+        self.cond = threading.Condition()
+        self.terminate_listeners = []
+        self.stats = {"polls": 0, "published": 0, "terminated": 0}
+
+    def add_terminate_listener(self, fn):
+        """fn(session_id, app_id); called once per session, outside the channel lock."""
+        self.terminate_listeners.append(fn)
+
+    def open(self, session_id, app_id=None):
+        """State of a session (created on first call), plus its poll token and whether
+        the browser widget has confirmed it can reach the endpoint."""
+        with self.cond:
+            state = self.states.get(session_id)
+            if state is None:
+                self.states[session_id] = state = _State(app_id)
+            elif app_id is not None:
+                state.app_id = app_id
+            return dict(state.as_dict(), token=state.token, confirmed=state.confirmed)
+
+    def publish(self, session_id, warnings, status=""):
+        with self.cond:
+            state = self.states.get(session_id)
+            if state is None or warnings <= state.warnings and status == state.status:
+                return
+            state.warnings = max(state.warnings, warnings)
+            state.status = status
+            state.version += 1
+            state.updated = time.time()
+            newly_terminated = not state.terminated and state.warnings >= MAX_WARNINGS
+            state.terminated = state.terminated or newly_terminated
+            self.stats["published"] += 1
+            app_id = state.app_id
+            self.cond.notify_all()
+        if newly_terminated:
+            self.stats["terminated"] += 1
+            for fn in self.terminate_listeners:
+                try:
+                    fn(session_id, app_id)
+                except Exception as e:
+                    print(f"⚠️ Termination listener error ({session_id}): {e}")
+
+    def close(self, session_id):
+        with self.cond:
+            state = self.states.get(session_id)
+            if state: state.ended = True
+            now = time.time()
+            for sid in [s for s, st in self.states.items() if st.ended and now - st.updated > STATE_TTL]:
+                del self.states[sid]
+
+    def state(self, session_id):
+        with self.cond:
+            state = self.states.get(session_id)
+            return state.as_dict() if state else None
+
+    def confirmed(self, session_id):
+        with self.cond:
+            state = self.states.get(session_id)
+            return bool(state and state.confirmed)
+
+    def unreachable(self, session_id, after=UNREACHABLE_AFTER):
+        """True if the session's widget has not completed a poll within `after` seconds of
+        opening (mixed content, firewall, wrong public URL). Logged once per session."""
+        with self.cond:
+            state = self.states.get(session_id)
+            if state is None or state.confirmed or time.time() - state.opened < after:
+                return False
+            first, state.reported = not state.reported, True
+        if first:
+            print(f"⚠️ Warning channel unreachable from the browser of session {session_id} after {after:.0f}s; "
+                  f"using reruns. Check WARNING_CHANNEL_URL (the widget logs the URL it tried to the browser console)")
+        return True
+
+    def wait(self, session_id, since_version, token, timeout=POLL_TIMEOUT):
+        """Blocks until the session's version passes since_version (or timeout).
+        None if the session is unknown or the token does not match."""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            self.stats["polls"] += 1
+            state = self.states.get(session_id)
+            if state is None or not hmac.compare_digest(state.token, token): return None
+            if since_version >= 0:
+                state.confirmed = True # only a client that parsed an earlier reply sends a version
+            while True:
+                state = self.states.get(session_id)
+                if state is None: return None
+                remaining = deadline - time.monotonic()
+                if state.version > since_version or state.terminated or remaining <= 0:
+                    return state.as_dict()
+                self.cond.wait(remaining)
+
+# ---------------- HTTP Endpoint ----------------
+class _Handler(BaseHTTPRequestHandler):
+    channel = None
+
+    def _send(self, code, body=b""):
+        self.send_response(code)
+        self.send_header("Access-Control-Allow-Origin", "*") # the widget is served from Streamlit's origin; polls need the token
+        self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.send_header("Cache-Control", "no-store")
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body: self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self._send(204)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("/poll"): # "/poll", or "/<proxy prefix>/poll" if the proxy keeps it
+            return self._send(404)
+        query = parse_qs(url.query)
+        try:
+            session_id = query["s"][0]
+            token = query["t"][0]
+            since = int(query.get("v", ["-1"])[0])
+        except (KeyError, ValueError):
+            return self._send(400)
+        state = self.channel.wait(session_id, since, token)
+        if state is None:
+            return self._send(404) # same answer for an unknown session and a wrong token
+        self._send(200, json.dumps(state).encode("utf-8"))
+
+    def log_message(self, *args):
+        pass # one line per poll would flood the console
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def serve(channel, port=PORT, host=HOST):
+    handler = type("Handler", (_Handler,), {"channel": channel})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="warning-channel", daemon=True).start()
+    return server
+
+_channel = None
+_server = None
+_channel_lock = threading.Lock()
+
+def get_channel(port=PORT, host=HOST):
+    """Process-wide channel; the HTTP endpoint is started on first use.
+    If the port is taken the channel still works server-side (see serving())."""
+    global _channel, _server
+    with _channel_lock:
+        if _channel is None:
+            _channel = WarningChannel()
+            try:
+                _server = serve(_channel, port, host)
+                print(f"✅ Warning channel listening on {host}:{port}")
+            except OSError as e:
+                print(f"⚠️ Warning channel could not bind {host}:{port} ({e}); falling back to reruns")
+        return _channel
+
+def serving():
+    """True if the endpoint is up. Whether a browser can reach it is only known once its
+    widget has polled (WarningChannel.confirmed); keep the rerun fallback until then."""
+    return _server is not None
+
+# ---------------- Browser Widget ----------------
+WIDGET = """
+<div id="wc" style="font-family:sans-serif;display:none;">
+  <div style="font-size:0.85rem;color:#64748B;">Warnings</div>
+  <div id="wc-count" style="font-size:2rem;font-weight:700;color:#0F172A;">$WARNINGS/$MAX</div>
+  <div id="wc-status" style="font-size:0.8rem;color:#991b1b;"></div>
+</div>
+<script>
+(function() {
+  var sid = "$SESSION", token = "$TOKEN", v = -1, base = "$URL", failures = 0;
+  var loc = window.parent.location;
+  if (!base) {
+    base = loc.protocol + "//" + loc.hostname + ":$PORT";
+  } else if (base.charAt(0) === "/") {
+    base = loc.origin + base; // a path on Streamlit's own origin (reverse proxy)
+  }
+  while (base.slice(-1) === "/") base = base.slice(0, -1);
+  function render(s) {
+    document.getElementById("wc").style.display = "block"; // hidden until the endpoint is reachable
+    document.getElementById("wc-count").textContent = s.warnings + "/" + s.max;
+    document.getElementById("wc-count").style.color = s.warnings >= 3 ? "#dc2626" : "#0F172A";
+    document.getElementById("wc-status").textContent = s.warnings >= 3 ? "⚠️ CRITICAL WARNING" : "";
+    if (s.terminated) {
+      document.getElementById("wc-status").textContent = "Test terminated";
+      // One rerun to show the termination page: click the page's hidden sync button, else reload
+      var sync = window.parent.document.querySelector(".st-key-$SYNC_KEY button");
+      if (sync) { sync.click(); } else { try { window.parent.location.reload(); } catch (e) {} }
+    }
+  }
+  function poll() {
+    fetch(base + "/poll?s=" + sid + "&t=" + encodeURIComponent(token) + "&v=" + v, {cache: "no-store"})
+      .then(function(r) { if (!r.ok) throw r.status; return r.json(); })
+      .then(function(s) { v = s.version; render(s); if (!s.terminated) poll(); })
+      .catch(function(e) {
+        if (++failures === 3) console.warn("Proctoring warnings: cannot reach " + base + "/poll (" + e + "); the page falls back to reruns");
+        setTimeout(poll, 3000);
+      });
+  }
+  poll();
+})();
+</script>
+"""
+
+def widget_html(session_id, token, warnings=0, url="", port=PORT, sync_key="proctor_sync"):
+    """Warnings counter for components.html(); keeps itself up to date by long-polling.
+    url is the public base URL: absolute, a path on the page's origin, or "" for the
+    page host at port. It stays hidden until a poll succeeds. On termination it clicks the st.button with
+    key=sync_key (keep it hidden) to rerun once."""
+    return (WIDGET.replace("$SESSION", session_id).replace("$TOKEN", token).replace("$URL", url or "").replace("$PORT", str(port))
+            .replace("$WARNINGS", str(warnings)).replace("$MAX", str(MAX_WARNINGS)).replace("$SYNC_KEY", sync_key))
+
+# ---------------- Benchmark ----------------
+def _poll_clients(base, sessions, seconds):
+    """Runs in a separate process so only server-side CPU is measured in the parent.
+    sessions: {session_id: token}."""
+    stop_at = time.time() + seconds
+    def client(sid):
+        v = -1
+        while time.time() < stop_at:
+            try:
+                with urllib.request.urlopen(f"{base}/poll?s={sid}&t={sessions[sid]}&v={v}", timeout=POLL_TIMEOUT + 5) as r:
+                    v = json.load(r)["version"]
+            except Exception:
+                time.sleep(0.5)
+    threads = [threading.Thread(target=client, args=(sid,), daemon=True) for sid in sessions]
+    for t in threads: t.start()
+    for t in threads: t.join(POLL_TIMEOUT + 10)
+
+def _rerun_cpu_ms(script, runs):
+    """CPU ms of one full script execution, which is what every warning cost before."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(script, default_timeout=120)
+    at.run() # warm-up (imports, caches)
+    started = time.process_time()
+    for _ in range(runs): at.run()
+    return (time.process_time() - started) / runs * 1000
+
+def benchmark(candidates=50, seconds=30, warn_per_min=2.0, port=PORT + 1, script=None, runs=5):
+    import multiprocessing
+    channel = WarningChannel()
+    server = serve(channel, port, host="127.0.0.1")
+    sessions = [f"bench{i}" for i in range(candidates)]
+    tokens = {sid: channel.open(sid)["token"] for sid in sessions}
+    clients = multiprocessing.get_context("spawn").Process(
+        target=_poll_clients, args=(f"http://127.0.0.1:{port}", tokens, seconds), daemon=True)
+    clients.start()
+    time.sleep(1.0)
+    interval = 60.0 / warn_per_min / candidates # one publish every `interval` seconds across all candidates
+    started_cpu, started = time.process_time(), time.monotonic()
+    i = 0
+    while time.monotonic() - started < seconds:
+        sid = sessions[i % candidates]
+        channel.publish(sid, 1, f"LOOKING AWAY #{i}") # a new status is a push without nearing termination
+        i += 1
+        time.sleep(interval)
+    cpu = time.process_time() - started_cpu
+    elapsed = time.monotonic() - started
+    clients.join(POLL_TIMEOUT + 15)
+    server.shutdown()
+    per_min = cpu / elapsed * 60 / candidates * 1000
+    print(f"📡 {candidates} candidates, {warn_per_min:g} warnings/min each, {elapsed:.0f}s")
+    print(f"   long-poll channel : {per_min:.1f} CPU ms per candidate-minute "
+          f"({channel.stats['polls']} polls, {channel.stats['published']} pushes)")
+    if script:
+        rerun_ms = _rerun_cpu_ms(script, runs)
+        print(f"   rerun per warning : {rerun_ms * warn_per_min:.1f} CPU ms per candidate-minute "
+              f"({rerun_ms:.0f} ms per full script run, {warn_per_min:g} runs/min)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the proctoring warning channel.")
+    parser.add_argument("--bench", type=int, metavar="N", default=50, help="Simulated active candidates")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warn-per-min", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=PORT + 1)
+    parser.add_argument("--script", help="Streamlit script to time a full rerun of (the 'before' number)",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "AUTO_HIRE_PRO.py"))
+    parser.add_argument("--no-script", action="store_true", help="Skip the rerun measurement")
+    args = parser.parse_args(argv)
+    benchmark(args.bench, args.seconds, args.warn_per_min, args.port, None if args.no_script else args.script)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())